@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""Fixtures for the benchmarks of Bio2BEL OmniPath.
+
+Run the benchmarks by ``tox -e benchmark`` or ``python -m pytest benchmarks --scale 100k``.
+"""
+
+import pytest
+
+from bio2bel_omnipath import Manager
+from tests.synthetic import SCALES, generate
+
+
+def pytest_addoption(parser):
+    """Add the ``--scale`` option for the size of the synthetic data."""
+    parser.addoption(
+        '--scale',
+        default='10k',
+        help='Number of interactions in the synthetic data, one of %s or a number' % ', '.join(SCALES),
+    )
+
+
+@pytest.fixture(scope='session')
+def dataset(request, tmp_path_factory):
+    """Write synthetic interactions and PTMs and return their paths by query type."""
+    scale = request.config.getoption('--scale')
+    return generate(str(tmp_path_factory.mktemp('data')), SCALES.get(scale) or int(scale))
+
+
+@pytest.fixture
+def make_manager(tmp_path_factory):
+    """Return a function creating managers with an empty database in a new temporary file."""
+
+    def _make_manager() -> Manager:
+        path = tmp_path_factory.mktemp('database') / 'omnipath.db'
+        return Manager(connection='sqlite:///%s' % path)
+
+    return _make_manager
+
+
+@pytest.fixture(scope='session')
+def populated_manager(dataset, tmp_path_factory):
+    """Return a manager with a database populated with the synthetic data."""
+    path = tmp_path_factory.mktemp('populated') / 'omnipath.db'
+    manager = Manager(connection='sqlite:///%s' % path)
+    manager.populate_interactions(interactions=dataset['interactions'])
+    manager.populate_ptms(ptms=dataset['ptms'])
+    return manager
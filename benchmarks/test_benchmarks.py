@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmarks of parsing, populating and querying Bio2BEL OmniPath on synthetic data.
+
+Besides the times measured by :mod:`pytest_benchmark`, the number of rows and the memory use are saved into the
+``extra_info`` of the benchmarks, hence they are also available in the JSON output (``--benchmark-json``).
+"""
+
+import tracemalloc
+
+import pytest
+import sqlalchemy.orm
+
+from bio2bel_omnipath import models, parser
+from bio2bel_omnipath.profiling import peak_rss
+
+
+def traced_peak(func, *args, **kwargs) -> float:
+    """Call ``func`` and return the peak of the memory allocated during the call in MiB."""
+    tracemalloc.start()
+
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / (1 << 20)
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('query_type', ['interactions', 'ptms'])
+def test_parse(benchmark, dataset, query_type):
+    """Benchmark parsing a tab separated file, without the columnar cache."""
+    kwargs = dict(url=dataset[query_type], columnar_cache=False)
+    df = benchmark(parser.get, query_type, **kwargs)
+
+    benchmark.extra_info['rows'] = len(df)
+    benchmark.extra_info['data_frame_mb'] = df.memory_usage(deep=True).sum() / (1 << 20)
+    benchmark.extra_info['peak_memory_mb'] = traced_peak(parser.get, query_type, **kwargs)
+
+
+@pytest.mark.parametrize('query_type', ['interactions', 'ptms'])
+def test_read_columnar(benchmark, dataset, query_type):
+    """Benchmark reading a data frame from the columnar cache."""
+    pytest.importorskip('pyarrow')
+    # creates the cache
+    parser.get(query_type, url=dataset[query_type])
+    df = benchmark(parser.get, query_type, url=dataset[query_type])
+
+    benchmark.extra_info['rows'] = len(df)
+
+
+def _benchmark_populate(benchmark, dataset, make_manager, rounds: int = 3, **kwargs):
+    """Benchmark populating an empty database with the interactions and PTMs, and save the stages of the last round."""
+    managers = []
+
+    def setup():
+        managers.append(make_manager())
+        return (managers[-1],), {}
+
+    def populate(manager):
+        manager.populate_interactions(interactions=dataset['interactions'], **kwargs)
+        manager.populate_ptms(ptms=dataset['ptms'], **kwargs)
+
+    benchmark.pedantic(populate, setup=setup, rounds=rounds)
+
+    manager = managers[-1]
+    stages = manager.profiler.report()
+    benchmark.extra_info['rows'] = sum(stage['rows'] for stage in stages if stage['stage'].endswith('.read'))
+    benchmark.extra_info['process_peak_rss_mb'] = peak_rss()
+    benchmark.extra_info['stages'] = stages
+    benchmark.extra_info['summary'] = manager.summarize()
+
+
+@pytest.mark.parametrize('chunksize', [None, 10000])
+def test_populate(benchmark, dataset, make_manager, chunksize):
+    """Benchmark populating an empty database in bulk mode."""
+    _benchmark_populate(benchmark, dataset, make_manager, chunksize=chunksize)
+
+
+@pytest.mark.benchmark(group='populate_orm_bulk')
+@pytest.mark.parametrize('bulk', [False, True], ids=['orm', 'bulk'])
+def test_populate_orm_bulk(benchmark, dataset, make_manager, bulk):
+    """Benchmark populating an empty database by the ORM against the bulk mode, in one group to compare their times."""
+    _benchmark_populate(benchmark, dataset, make_manager, rounds=1, bulk=bulk)
+
+
+def _hub(manager) -> str:
+    """Return the primary ID of the entity with the most interactions."""
+    return manager.session.query(
+        models.MolecularEntity.primary_id,
+    ).join(
+        models.Interaction,
+        models.Interaction.source_id == models.MolecularEntity.id,
+    ).group_by(
+        models.MolecularEntity.id,
+    ).order_by(
+        sqlalchemy.func.count(models.Interaction.id).desc(),
+    ).limit(1).scalar()
+
+
+def test_query_interactions_of_entity(benchmark, populated_manager):
+    """Benchmark retrieving the interactions of the most connected entity with their partners and references."""
+    primary_id = _hub(populated_manager)
+    source = sqlalchemy.orm.aliased(models.MolecularEntity)
+
+    def query():
+        return populated_manager.session.query(
+            models.Interaction,
+        ).join(
+            source,
+            models.Interaction.source_id == source.id,
+        ).filter(
+            source.primary_id == primary_id,
+        ).options(
+            sqlalchemy.orm.joinedload(models.Interaction.target),
+            sqlalchemy.orm.selectinload(models.Interaction.references),
+        ).all()
+
+    interactions = benchmark(query)
+    benchmark.extra_info['rows'] = len(interactions)
+
+
+def test_query_ptms_on_target(benchmark, populated_manager):
+    """Benchmark retrieving the PTMs on the most connected entity."""
+    primary_id = _hub(populated_manager)
+    target = sqlalchemy.orm.aliased(models.MolecularEntity)
+
+    def query():
+        return populated_manager.session.query(
+            models.Ptm,
+        ).join(
+            target,
+            models.Ptm.target_id == target.id,
+        ).filter(
+            target.primary_id == primary_id,
+        ).all()
+
+    ptms = benchmark(query)
+    benchmark.extra_info['rows'] = len(ptms)
+
+
+def test_summarize(benchmark, populated_manager):
+    """Benchmark summarizing the database."""
+    benchmark(populated_manager.summarize)
+
+
+def test_query_interactions_of_many(benchmark, populated_manager):
+    """Benchmark retrieving the interactions of a thousand entities by the batched query API, without the cache."""
+    entity_ids = [entity_id for entity_id, in populated_manager.session.query(models.MolecularEntity.id).limit(1000)]
+
+    def query():
+        populated_manager.clear_query_cache()
+        return populated_manager.get_interactions_of(entity_ids)
+
+    interactions = benchmark(query)
+    benchmark.extra_info['rows'] = sum(map(len, interactions.values()))
+
+
+def test_build_graph_index(benchmark, populated_manager):
+    """Benchmark building the graph index from the database."""
+    index = benchmark(populated_manager.build_graph_index, save=False)
+    benchmark.extra_info['rows'] = index.n_edges
+
+
+@pytest.mark.parametrize('k', [1, 3])
+def test_graph_neighborhood(benchmark, populated_manager, k):
+    """Benchmark the k-hop neighborhood of the most connected entity in the graph index."""
+    index = populated_manager.build_graph_index(save=False)
+    hub = populated_manager.get_entities([_hub(populated_manager)]).popitem()[1].id
+
+    nodes = benchmark(index.neighborhood, [hub], k=k, direction='both')
+    benchmark.extra_info['rows'] = len(nodes)
+
+
+def test_export_bel_nodelink(benchmark, populated_manager, tmp_path):
+    """Benchmark writing the whole database as node-link JSON by batches."""
+    path = str(tmp_path / 'omnipath.bel.nodelink.json')
+    edges = benchmark.pedantic(populated_manager.to_bel, kwargs=dict(path=path), rounds=1, iterations=1)
+
+    benchmark.extra_info['rows'] = edges
+    benchmark.extra_info['peak_memory_mb'] = traced_peak(populated_manager.to_bel, path=path)
@@ -3,9 +3,17 @@
 """Comprehensive database of literature curated signaling pathways"""
 
 from .constants import get_version
-from .manager import Manager
 
 __all__ = [
     'Manager',
     'get_version',
 ]
+
+
+def __getattr__(name):
+    """Import the manager at its first use, as it imports Bio2BEL, PyBEL and pandas."""
+    if name == 'Manager':
+        from .manager import Manager
+        return Manager
+
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -0,0 +1,834 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+
+"""
+Conversion of the Bio2BEL OmniPath database to BEL by batches of
+streamed rows, into a :py:class:`pybel.BELGraph` or incrementally into
+node-link JSON or BEL script files, optionally by partitions of the
+records in parallel processes.
+"""
+
+import os
+import json
+import logging
+import operator
+import itertools
+import concurrent.futures
+
+import sqlalchemy
+import sqlalchemy.orm
+import pybel
+import pybel.dsl
+import pybel.constants as pc
+from pybel.language import amino_acid_dict
+# the statements of a BEL script without its header and footer, private in PyBEL
+# so its version is pinned to the range tested with in setup.cfg
+from pybel.canonicalize import _to_bel_lines_body
+
+from .constants import (
+    BEL_BATCH_SIZE,
+    MIRNA_NAMESPACE,
+    PROTEIN_NAMESPACE,
+    VERSION,
+)
+from . import models
+
+__all__ = [
+    'BelExporter',
+]
+
+log = logging.getLogger(__name__)
+
+FORMATS = ('nodelink', 'bel')
+PARTITIONS = ('resource', 'taxon')
+# statements making the connections of the worker processes read only
+READ_ONLY = {
+    'sqlite': 'PRAGMA query_only = ON',
+    'postgresql': 'SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY',
+}
+EVIDENCE = 'From OmniPath'
+# citation of the records without literature references
+OMNIPATH_CITATION = ('url', 'http://omnipathdb.org/')
+RESOURCE_ANNOTATION = 'OmniPathResource'
+SPECIES_ANNOTATION = 'Species'
+
+
+
+class _CachedBel(object):
+    """
+    Mixin of PyBEL nodes memoizing their BEL string. PyBEL builds the
+    string at each hash and comparison of the nodes, i.e. several times
+    for adding each edge; the nodes must not be changed once created.
+    """
+    
+    def as_bel(self, use_identifiers = True):
+        
+        if not use_identifiers:
+            
+            return super().as_bel(use_identifiers = False)
+        
+        if getattr(self, '_bel', None) is None:
+            
+            self._bel = super().as_bel()
+        
+        return self._bel
+
+
+class Protein(_CachedBel, pybel.dsl.Protein):
+    pass
+
+
+class MicroRna(_CachedBel, pybel.dsl.MicroRna):
+    pass
+
+
+NODE_FUNCTIONS = {
+    'protein': (Protein, PROTEIN_NAMESPACE),
+    'mirna': (MicroRna, MIRNA_NAMESPACE),
+}
+
+# BEL modification and relation of the enzyme to the modified substrate
+# by PTM type, other types are not converted
+PTM_MODIFICATIONS = {
+    'phosphorylation': ('Ph', pc.INCREASES),
+    'dephosphorylation': ('Ph', pc.DECREASES),
+    'acetylation': ('Ac', pc.INCREASES),
+    'deacetylation': ('Ac', pc.DECREASES),
+    'ubiquitination': ('Ub', pc.INCREASES),
+    'deubiquitination': ('Ub', pc.DECREASES),
+    'sumoylation': ('Sumo', pc.INCREASES),
+    'desumoylation': ('Sumo', pc.DECREASES),
+    'methylation': ('Me', pc.INCREASES),
+    'demethylation': ('Me', pc.DECREASES),
+    'glycosylation': ('Glyco', pc.INCREASES),
+    'deglycosylation': ('Glyco', pc.DECREASES),
+    'hydroxylation': ('Hy', pc.INCREASES),
+    'myristoylation': ('Myr', pc.INCREASES),
+    'palmitoylation': ('Palm', pc.INCREASES),
+    'neddylation': ('Nedd', pc.INCREASES),
+    'farnesylation': ('Farn', pc.INCREASES),
+    'sulfation': ('Sulf', pc.INCREASES),
+}
+
+
+def _grouped(rows):
+    """
+    Groups the ``(key, value)`` rows ordered by key, yields each key
+    with the list of its values.
+    """
+    
+    for key, group in itertools.groupby(rows, key = operator.itemgetter(0)):
+        
+        yield key, [value for _, value in group]
+
+
+def _join_grouped(rows, *associations):
+    """
+    Joins rows ordered by their first column, the key, to the values of
+    associations, streams of ``(key, value)`` rows also ordered by key.
+    Yields each row with a list of values for each association.
+    """
+    
+    groups = [_grouped(association) for association in associations]
+    heads = [next(group, None) for group in groups]
+    
+    for row in rows:
+        
+        values = []
+        
+        for i, group in enumerate(groups):
+            
+            while heads[i] is not None and heads[i][0] < row[0]:
+                
+                heads[i] = next(group, None)
+            
+            values.append(
+                heads[i][1]
+                    if heads[i] is not None and heads[i][0] == row[0] else
+                []
+            )
+        
+        yield row, values
+
+
+def read_only_engine(url):
+    """
+    Creates an engine for ``url`` with read only connections in SQLite
+    and PostgreSQL.
+    """
+    
+    engine = sqlalchemy.create_engine(url)
+    statement = READ_ONLY.get(engine.dialect.name)
+    
+    if statement:
+        
+        @sqlalchemy.event.listens_for(engine, 'connect')
+        def connect(dbapi_connection, connection_record):
+            
+            cursor = dbapi_connection.cursor()
+            cursor.execute(statement)
+            cursor.close()
+            # otherwise the setting is rolled back by PostgreSQL
+            dbapi_connection.commit()
+    
+    return engine
+
+
+def _export_partition(url, partition, batch_size):
+    """
+    Converts one partition of the records to a :py:class:`pybel.BELGraph`
+    in a worker process, by its own read only session.
+    """
+    
+    engine = read_only_engine(url)
+    session = sqlalchemy.orm.Session(bind = engine)
+    
+    try:
+        
+        exporter = BelExporter(
+            session,
+            batch_size = batch_size,
+            partition = partition,
+        )
+        
+        return exporter.to_graph()
+        
+    finally:
+        
+        session.close()
+        engine.dispose()
+
+
+class BelExporter(object):
+    """
+    Converts the interactions and PTMs of the database to BEL edges by
+    batches. The rows are streamed from the database by ``yield_per``,
+    hence only one batch of edges is in the memory at once. The nodes
+    are created once and cached: per :py:class:`models.MolecularEntity`
+    and per modified protein, i.e. substrate, residue, offset and PTM
+    type.
+    
+    Interactions are ``increases`` (stimulation), ``decreases``
+    (inhibition) or ``regulates`` (neither) edges if directed, and
+    ``association`` edges in both directions otherwise. PTMs are edges
+    from the enzyme to the modified form of the substrate. Each record
+    has one edge for each of its PubMed references, annotated by the
+    resources and the taxon of the source.
+    
+    The records can be split into disjoint partitions, converted in
+    parallel processes by :py:meth:`partitioned_batches`: by resource,
+    the first one of each record in the resource association tables,
+    or by taxon, the one of the source entity.
+    """
+    
+    def __init__(self, session, batch_size = BEL_BATCH_SIZE, partition = None):
+        """
+        :param session:
+            A SQLAlchemy session of the database.
+        :param int batch_size:
+            Number of interactions or PTMs converted in one batch.
+        :param tuple partition:
+            Convert only the records of a partition: ``resource`` or
+            ``taxon``, and the key of the :py:class:`models.Resource` or
+            :py:class:`models.Taxonomy`. The ``resource`` partitions
+            contain the records by their resource with the smallest key,
+            and the key ``None`` stands for the records without
+            resources.
+        """
+        
+        self.session = session
+        self.batch_size = batch_size
+        self.partition = partition
+        self._nodes = {}
+        self._pmod_nodes = {}
+        self._entities = None
+        self.skipped = {}
+    
+    
+    def new_graph(self):
+        """
+        Returns an empty BEL graph with the metadata, namespaces and
+        annotations of the export.
+        """
+        
+        graph = pybel.BELGraph(
+            name = 'OmniPath',
+            version = VERSION,
+            description = (
+                'Literature curated signaling pathways and post '
+                'translational modifications from OmniPath'
+            ),
+        )
+        
+        for _, namespace in NODE_FUNCTIONS.values():
+            
+            graph.namespace_pattern[namespace] = '.*'
+        
+        graph.annotation_pattern[RESOURCE_ANNOTATION] = '.*'
+        graph.annotation_pattern[SPECIES_ANNOTATION] = r'\d+'
+        
+        return graph
+    
+    
+    def to_graph(self, batches = None):
+        """
+        Returns all edges in one :py:class:`pybel.BELGraph`.
+        
+        :param batches:
+            Graphs to merge, by default those of :py:meth:`batches`.
+        """
+        
+        graph = self.new_graph()
+        
+        for batch in self.batches() if batches is None else batches:
+            
+            graph.add_edges_from(batch.edges(keys = True, data = True))
+        
+        return graph
+    
+    
+    def write(self, file, fmt = 'nodelink', batches = None):
+        """
+        Writes the edges batch by batch into ``file``.
+        
+        :param file:
+            A file-like object open for writing text.
+        :param str fmt:
+            ``nodelink`` for PyBEL node-link JSON, or ``bel`` for BEL
+            script.
+        :param batches:
+            Graphs to write, by default those of :py:meth:`batches`.
+        
+        :return:
+            The number of edges written.
+        """
+        
+        if fmt not in FORMATS:
+            
+            raise ValueError(
+                'Unknown format `%s`, available: %s.' % (
+                    fmt,
+                    ', '.join(FORMATS),
+                )
+            )
+        
+        return getattr(self, 'write_%s' % fmt)(
+            file,
+            self.batches() if batches is None else batches,
+        )
+    
+    
+    def write_nodelink(self, file, batches):
+        """
+        Writes node-link JSON as :py:func:`pybel.to_nodelink_file`: the
+        links are written by batches, the nodes, known only at the end,
+        after them. The ``hasVariant`` edges are omitted, PyBEL adds them
+        when reading the nodes.
+        
+        :return:
+            The number of edges written.
+        """
+        
+        file.write('{"directed": true, "multigraph": true, "graph": ')
+        json.dump(pybel.to_nodelink(self.new_graph())['graph'], file)
+        file.write(', "links": [')
+        nodes = {}
+        n_edges = 0
+        
+        for batch in batches:
+            
+            for u, v, key, data in batch.edges(keys = True, data = True):
+                
+                if pc.CITATION not in data:
+                    
+                    continue
+                
+                for node in (u, v):
+                    
+                    nodes.setdefault(node, len(nodes))
+                
+                # `dumps` has a C implementation, unlike `dump`
+                file.write(', ' if n_edges else '')
+                file.write(
+                    json.dumps(
+                        dict(data, source = nodes[u], target = nodes[v], key = key)
+                    )
+                )
+                n_edges += 1
+        
+        file.write('], "nodes": [')
+        
+        for i, node in enumerate(nodes):
+            
+            file.write(', ' if i else '')
+            file.write(
+                json.dumps(dict(node, id = node.md5, bel = node.as_bel()))
+            )
+        
+        file.write(']}')
+        
+        return n_edges
+    
+    
+    def write_bel(self, file, batches):
+        """
+        Writes a BEL script as :py:func:`pybel.to_bel_script`: the header
+        once, then the statements of each batch. The ``hasVariant``
+        edges are omitted, PyBEL adds them when parsing the statements.
+        
+        :return:
+            The number of edges written.
+        """
+        
+        n_edges = 0
+        
+        for line in pybel.to_bel_script_lines(self.new_graph()):
+            
+            print(line, file = file)
+        
+        for batch in batches:
+            
+            for line in _to_bel_lines_body(batch, use_identifiers = True):
+                
+                print(line, file = file)
+            
+            n_edges += sum(
+                pc.CITATION in data
+                for _, _, data in batch.edges(data = True)
+            )
+        
+        return n_edges
+    
+    
+    def batches(self):
+        """
+        Yields the edges of the interactions, then of the PTMs, in
+        :py:class:`pybel.BELGraph` objects of ``batch_size`` records.
+        """
+        
+        for records, add in (
+            (self._interactions(), self._add_interaction),
+            (self._ptms(), self._add_ptm),
+        ):
+            
+            while True:
+                
+                batch = list(itertools.islice(records, self.batch_size))
+                
+                if not batch:
+                    
+                    break
+                
+                graph = self.new_graph()
+                
+                for row, (references, resources) in batch:
+                    
+                    add(graph, row, references, resources)
+                
+                log.debug(
+                    'Converted %u records to %u BEL edges.',
+                    len(batch),
+                    graph.number_of_edges(),
+                )
+                
+                yield graph
+        
+        for ptm_type, count in self.skipped.items():
+            
+            log.info(
+                'Skipped %u PTMs of type `%s` without BEL equivalent.',
+                count,
+                ptm_type,
+            )
+    
+    
+    def partitions(self, partition_by):
+        """
+        Returns the keys of the partitions of the records.
+        
+        :param str partition_by:
+            ``resource`` or ``taxon``.
+        """
+        
+        if partition_by not in PARTITIONS:
+            
+            raise ValueError(
+                'Unknown partitioning `%s`, available: %s.' % (
+                    partition_by,
+                    ', '.join(PARTITIONS),
+                )
+            )
+        
+        model = models.Resource if partition_by == 'resource' else models.Taxonomy
+        keys = [key for key, in self.session.query(model.id).order_by(model.id)]
+        
+        return keys + [None] if partition_by == 'resource' else keys
+    
+    
+    def partitioned_batches(self, partition_by, workers = None):
+        """
+        Converts the partitions of the records in a pool of processes,
+        each with its own read only connection, and yields their graphs
+        as they are ready.
+        
+        :param str partition_by:
+            ``resource`` or ``taxon``.
+        :param int workers:
+            Number of processes, by default the number of CPUs.
+        """
+        
+        keys = self.partitions(partition_by)
+        url = self.session.get_bind().url
+        
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            
+            raise ValueError(
+                'In memory SQLite databases can not be shared by processes.'
+            )
+        
+        # the workers can not read uncommitted data
+        self.session.commit()
+        
+        def graphs():
+            
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers = workers or os.cpu_count(),
+            ) as executor:
+                
+                futures = dict(
+                    (
+                        executor.submit(
+                            _export_partition,
+                            url,
+                            (partition_by, key),
+                            self.batch_size,
+                        ),
+                        key,
+                    )
+                    for key in keys
+                )
+                
+                for future in concurrent.futures.as_completed(futures):
+                    
+                    graph = future.result()
+                    log.info(
+                        'Converted the %s `%s` partition to %u BEL edges.',
+                        partition_by,
+                        futures[future],
+                        graph.number_of_edges(),
+                    )
+                    
+                    yield graph
+        
+        return graphs()
+    
+    
+    def node(self, entity_id):
+        """
+        Returns the node of a molecular entity, created at first use.
+        """
+        
+        if entity_id not in self._nodes:
+            
+            entity_type, primary_id, secondary_id, _ = (
+                self._get_entities()[entity_id]
+            )
+            function, namespace = NODE_FUNCTIONS[entity_type]
+            self._nodes[entity_id] = function(
+                namespace = namespace,
+                identifier = primary_id,
+                name = secondary_id or primary_id,
+            )
+        
+        return self._nodes[entity_id]
+    
+    
+    def pmod_node(self, target_id, residue, offset, ptm_type):
+        """
+        Returns the node of a protein with a modification, created at
+        first use.
+        """
+        
+        key = (target_id, residue, offset, ptm_type)
+        
+        if key not in self._pmod_nodes:
+            
+            self._pmod_nodes[key] = self.node(target_id).with_variants(
+                pybel.dsl.ProteinModification(
+                    PTM_MODIFICATIONS[ptm_type][0],
+                    code = amino_acid_dict.get(residue),
+                    position = offset,
+                )
+            )
+        
+        return self._pmod_nodes[key]
+    
+    
+    def _get_entities(self):
+        """
+        Returns the type, the IDs and the NCBI Taxonomy ID of each
+        molecular entity by its key, read from the database at first use.
+        """
+        
+        if self._entities is None:
+            
+            entity = models.MolecularEntity
+            
+            self._entities = dict(
+                (key, values)
+                for key, *values in self.session.query(
+                    entity.id,
+                    models.EntityType.entity_type,
+                    entity.primary_id,
+                    entity.secondary_id,
+                    models.Taxonomy.ncbi_taxonomy_id,
+                ).
+                join(models.EntityType, entity.type_id == models.EntityType.id).
+                outerjoin(models.Taxonomy, entity.taxon_id == models.Taxonomy.id)
+            )
+        
+        return self._entities
+    
+    
+    def _stream(self, query):
+        """
+        Streams the rows of ``query`` by batches.
+        """
+        
+        return iter(query.yield_per(self.batch_size))
+    
+    
+    def _condition(self, model, assoc_res, key):
+        """
+        Returns the condition selecting the records of ``model`` in the
+        partition, or ``None`` if all records are converted.
+        """
+        
+        if self.partition is None:
+            
+            return None
+        
+        partition_by, partition_key = self.partition
+        
+        if partition_by == 'taxon':
+            
+            return model.source_id.in_(
+                sqlalchemy.select([models.MolecularEntity.id]).
+                where(models.MolecularEntity.taxon_id == partition_key)
+            )
+        
+        record_id = assoc_res.c[key]
+        
+        if partition_key is None:
+            
+            return ~model.id.in_(sqlalchemy.select([record_id]))
+        
+        # each record in the partition of its first resource only
+        return model.id.in_(
+            sqlalchemy.select([record_id]).
+            group_by(record_id).
+            having(sqlalchemy.func.min(assoc_res.c.resource_id) == partition_key)
+        )
+    
+    
+    def _records(self, query, model, assoc_ref, assoc_res, key):
+        """
+        Streams the rows of ``query``, records ordered by key, each with
+        the PubMed IDs of its references and the names of its resources.
+        Only the records in the partition are streamed.
+        
+        :param query:
+            Query of rows starting with the key of the records.
+        :param model:
+            The model of the records.
+        :param assoc_ref:
+            The association table of the records and the references.
+        :param assoc_res:
+            The association table of the records and the resources.
+        :param str key:
+            Name of the key of the records in the association tables.
+        """
+        
+        reference = models.Reference
+        resource_names = dict(
+            self.session.query(models.Resource.id, models.Resource.resource_name)
+        )
+        references = (
+            self.session.query(assoc_ref.c[key], reference.pubmed_id).
+            join(reference, assoc_ref.c.reference_id == reference.id).
+            order_by(assoc_ref.c[key], reference.pubmed_id)
+        )
+        resources = (
+            self.session.query(assoc_res.c[key], assoc_res.c.resource_id).
+            order_by(assoc_res.c[key], assoc_res.c.resource_id)
+        )
+        condition = self._condition(model, assoc_res, key)
+        
+        if condition is not None:
+            
+            in_partition = sqlalchemy.select([model.id]).where(condition)
+            query = query.filter(condition)
+            references = references.filter(assoc_ref.c[key].in_(in_partition))
+            resources = resources.filter(assoc_res.c[key].in_(in_partition))
+        
+        return _join_grouped(
+            self._stream(query),
+            self._stream(references),
+            (
+                (record_id, resource_names[resource_id])
+                for record_id, resource_id in self._stream(resources)
+            ),
+        )
+    
+    
+    def _interactions(self):
+        """
+        Streams the interactions with their references and resources.
+        """
+        
+        interaction = models.Interaction
+        
+        return self._records(
+            self.session.query(
+                interaction.id,
+                interaction.source_id,
+                interaction.target_id,
+                interaction.is_directed,
+                interaction.is_stimulation,
+                interaction.is_inhibition,
+            ).order_by(interaction.id),
+            interaction,
+            models.assoc_int_ref,
+            models.assoc_int_res,
+            'interaction_id',
+        )
+    
+    
+    def _ptms(self):
+        """
+        Streams the PTMs with their references and resources.
+        """
+        
+        ptm = models.Ptm
+        
+        return self._records(
+            self.session.query(
+                ptm.id,
+                ptm.source_id,
+                ptm.target_id,
+                ptm.residue_type,
+                ptm.sequence_offset,
+                models.PtmType.ptm_type,
+            ).
+            join(models.PtmType, ptm.modification_type_id == models.PtmType.id).
+            order_by(ptm.id),
+            ptm,
+            models.assoc_ptm_ref,
+            models.assoc_ptm_res,
+            'ptm_id',
+        )
+    
+    
+    def _add_interaction(self, graph, row, references, resources):
+        """
+        Adds the edges of an interaction to ``graph``.
+        """
+        
+        _, source_id, target_id, directed, stimulation, inhibition = row
+        source = self.node(source_id)
+        target = self.node(target_id)
+        
+        if not directed:
+            
+            edges = [
+                (source, target, pc.ASSOCIATION),
+                (target, source, pc.ASSOCIATION),
+            ]
+            
+        else:
+            
+            edges = [
+                (source, target, relation)
+                for relation, present in (
+                    (pc.INCREASES, stimulation),
+                    (pc.DECREASES, inhibition),
+                )
+                if present
+            ] or [(source, target, pc.REGULATES)]
+        
+        self._add_edges(graph, edges, source_id, references, resources)
+    
+    
+    def _add_ptm(self, graph, row, references, resources):
+        """
+        Adds the edges of a PTM to ``graph``, if its type has a BEL
+        equivalent.
+        """
+        
+        _, source_id, target_id, residue, offset, ptm_type = row
+        
+        if ptm_type not in PTM_MODIFICATIONS:
+            
+            self.skipped[ptm_type] = self.skipped.get(ptm_type, 0) + 1
+            return
+        
+        edges = [(
+            self.node(source_id),
+            self.pmod_node(target_id, residue, offset, ptm_type),
+            PTM_MODIFICATIONS[ptm_type][1],
+        )]
+        
+        self._add_edges(graph, edges, source_id, references, resources)
+    
+    
+    def _add_edges(self, graph, edges, source_id, references, resources):
+        """
+        Adds the ``(source, target, relation)`` edges of a record to
+        ``graph``, one for each reference, annotated by the resources
+        and the taxon of the source entity.
+        """
+        
+        annotations = {}
+        taxon = self._get_entities()[source_id][3]
+        
+        if resources:
+            
+            annotations[RESOURCE_ANNOTATION] = resources
+        
+        if taxon is not None:
+            
+            annotations[SPECIES_ANNOTATION] = str(taxon)
+        
+        citations = (
+            [str(pubmed_id) for pubmed_id in references] or
+            [OMNIPATH_CITATION]
+        )
+        
+        for citation in citations:
+            
+            for source, target, relation in edges:
+                
+                graph.add_qualified_edge(
+                    source,
+                    target,
+                    relation = relation,
+                    citation = citation,
+                    evidence = EVIDENCE,
+                    annotations = annotations,
+                )
@@ -0,0 +1,529 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Bulk loading of records by SQLAlchemy Core for Bio2BEL OmniPath.
+"""
+
+import io
+import logging
+import contextlib
+
+import sqlalchemy
+
+from .constants import BULK_BATCH_SIZE, FAST_LOAD_CACHE_SIZE
+from . import models
+from . import stats
+
+__all__ = [
+    'BulkLoader',
+    'fast_load',
+]
+
+log = logging.getLogger(__name__)
+
+# marks NULLs in the CSV of PostgreSQL COPY, distinct from empty strings
+COPY_NULL = r'\N'
+
+
+class BulkLoader(object):
+    """
+    Writes table records with primary keys assigned in Python by
+    SQLAlchemy Core ``executemany`` in large batches.
+    
+    The records are provided as data frames by table name, as created by
+    :py:class:`tables.TableBuilder`, with columns named after the table
+    columns. The statistics depending on the written tables are
+    invalidated, see :py:mod:`stats`.
+    """
+    
+    def __init__(self, connection, batch_size = BULK_BATCH_SIZE, copy = False):
+        """
+        :param connection:
+            A SQLAlchemy connection or engine to write the records to.
+        :param int batch_size:
+            Number of records written by one ``executemany`` call.
+        :param bool copy:
+            Insert records by ``COPY FROM STDIN`` into PostgreSQL
+            databases accessed by psycopg2. Ignored for other databases.
+        """
+        
+        self.connection = connection
+        self.batch_size = batch_size
+        self.copy = (
+            copy and
+            connection.dialect.name == 'postgresql' and
+            connection.dialect.driver == 'psycopg2'
+        )
+    
+    
+    def first_ids(self):
+        """
+        Returns the first free primary key of each table with an ``id``
+        column, i.e. new keys continue from the largest one already in
+        the database.
+        """
+        
+        return dict(
+            (
+                table.name,
+                (
+                    self.connection.execute(
+                        sqlalchemy.select([sqlalchemy.func.max(table.c.id)])
+                    ).scalar() or 0
+                ) + 1,
+            )
+            for table in models.Base.metadata.sorted_tables
+            if 'id' in table.c
+        )
+    
+    
+    def write(self, tables):
+        """
+        Writes records into the database, tables in the order of their
+        dependencies, each by batches of ``executemany``.
+        
+        :param dict tables:
+            Data frames of records by table name.
+        """
+        
+        for table in models.Base.metadata.sorted_tables:
+            
+            records = tables.get(table.name)
+            
+            if records is None or not len(records):
+                
+                continue
+            
+            log.info(
+                'Writing %u records into `%s`.',
+                len(records),
+                table.name,
+            )
+            
+            self.write_records(table, records)
+    
+    
+    def write_records(self, table, records):
+        """
+        Inserts ``records``, a data frame, into ``table`` by batches.
+        """
+        
+        stats.invalidate(self.connection, [table.name])
+        
+        if self.copy:
+            
+            self._copy_batches(table, records)
+            
+        else:
+            
+            self._execute_batches(table.insert(), records)
+    
+    
+    def update_records(self, table, records):
+        """
+        Updates the records of ``table`` by their primary keys. The
+        ``records`` data frame contains the ``id`` and the columns to
+        update.
+        """
+        
+        stats.invalidate(self.connection, [table.name])
+        columns = [c for c in records.columns if c != 'id']
+        update = (
+            table.update().
+            where(table.c.id == sqlalchemy.bindparam('_id')).
+            values(
+                dict(
+                    (column, sqlalchemy.bindparam('_%s' % column))
+                    for column in columns
+                )
+            )
+        )
+        
+        self._execute_batches(
+            update,
+            records.rename(columns = lambda c: '_%s' % c),
+        )
+    
+    
+    def delete_records(self, table, records):
+        """
+        Deletes records from ``table``. Records are identified by their
+        primary key, or by all their columns in association tables.
+        """
+        
+        stats.invalidate(self.connection, [table.name])
+        columns = ['id'] if 'id' in table.c else list(table.c.keys())
+        delete = table.delete().where(
+            sqlalchemy.and_(*(
+                table.c[column] == sqlalchemy.bindparam('_%s' % column)
+                for column in columns
+            ))
+        )
+        
+        self._execute_batches(
+            delete,
+            records[columns].rename(columns = lambda c: '_%s' % c),
+        )
+    
+    
+    def delete_in(self, table, column, values):
+        """
+        Deletes the records of ``table`` with ``column`` having any of
+        ``values``, by batches of ``IN`` clauses.
+        
+        :return:
+            The number of deleted records.
+        """
+        
+        stats.invalidate(self.connection, [table.name])
+        values = [int(value) for value in values]
+        deleted = 0
+        
+        for i in range(0, len(values), self.batch_size):
+            
+            deleted += self.connection.execute(
+                table.delete().where(
+                    table.c[column].in_(values[i:i + self.batch_size])
+                )
+            ).rowcount
+        
+        return deleted
+    
+    
+    def link_ptms(self):
+        """
+        Links the PTMs to the PPIs between the same partners: directed
+        interactions from the enzyme to the substrate, and undirected
+        interactions in either orientation. The links are created by one
+        ``INSERT ... SELECT`` statement, from the records already in the
+        database, hence it does not matter if the interactions and PTMs
+        were loaded by different processes. Existing links are kept.
+        
+        :return:
+            The number of new links.
+        """
+        
+        interaction = models.Interaction.__table__
+        interaction_type = models.InteractionType.__table__
+        ptm = models.Ptm.__table__
+        assoc = models.assoc_int_ptm
+        
+        def partners(swap):
+            
+            source, target = (
+                (interaction.c.target_id, interaction.c.source_id)
+                    if swap else
+                (interaction.c.source_id, interaction.c.target_id)
+            )
+            on = sqlalchemy.and_(
+                source == ptm.c.source_id,
+                target == ptm.c.target_id,
+            )
+            
+            if swap:
+                
+                on = sqlalchemy.and_(on, interaction.c.is_directed == 0)
+            
+            return sqlalchemy.select([
+                interaction.c.id.label('interaction_id'),
+                ptm.c.id.label('ptm_id'),
+            ]).select_from(
+                interaction.
+                join(
+                    interaction_type,
+                    interaction.c.type_id == interaction_type.c.id,
+                ).
+                join(ptm, on)
+            ).where(interaction_type.c.interaction_type == 'PPI')
+        
+        links = sqlalchemy.union(partners(False), partners(True)).alias()
+        new_links = sqlalchemy.select([
+            links.c.interaction_id,
+            links.c.ptm_id,
+        ]).where(
+            ~sqlalchemy.exists().where(
+                sqlalchemy.and_(
+                    assoc.c.interaction_id == links.c.interaction_id,
+                    assoc.c.ptm_id == links.c.ptm_id,
+                )
+            )
+        )
+        
+        linked = self.connection.execute(
+            assoc.insert().from_select(['interaction_id', 'ptm_id'], new_links)
+        ).rowcount
+        
+        log.info('Linked %u PTMs to interactions.', linked)
+        
+        if linked:
+            
+            stats.invalidate(self.connection, [assoc.name])
+        
+        return linked
+    
+    
+    @staticmethod
+    def secondary_indexes(names = None):
+        """
+        Returns the indexes of the tables not enforcing uniqueness, i.e.
+        those needed only by queries, not for the integrity of the data.
+        
+        :param names:
+            Names of the tables, by default all tables.
+        """
+        
+        return [
+            index
+            for table in models.Base.metadata.sorted_tables
+            if names is None or table.name in names
+            for index in sorted(table.indexes, key = lambda i: i.name)
+            if not index.unique
+        ]
+    
+    
+    def drop_indexes(self, indexes):
+        """
+        Drops ``indexes`` if they exist in the database.
+        
+        :return:
+            The list of dropped indexes.
+        """
+        
+        existing = self._existing_indexes()
+        dropped = []
+        
+        for index in indexes:
+            
+            if index.name in existing.get(index.table.name, ()):
+                
+                log.info('Dropping index `%s`.', index.name)
+                index.drop(self.connection)
+                dropped.append(index)
+        
+        return dropped
+    
+    
+    def create_indexes(self, indexes):
+        """
+        Creates ``indexes`` if they do not exist in the database.
+        
+        :return:
+            The list of created indexes.
+        """
+        
+        existing = self._existing_indexes()
+        created = []
+        
+        for index in indexes:
+            
+            if index.name not in existing.get(index.table.name, ()):
+                
+                log.info('Creating index `%s`.', index.name)
+                index.create(self.connection)
+                created.append(index)
+        
+        return created
+    
+    
+    def revise_indexes(self):
+        """
+        Brings the indexes of an existing database to the current
+        schema: drops the indexes not defined in :py:mod:`models`
+        anymore, e.g. those on single boolean columns, and creates the
+        missing ones, e.g. the composite indexes.
+        
+        :return:
+            Dict with the names of the dropped and created indexes.
+        """
+        
+        tables = models.Base.metadata.tables
+        reflected = sqlalchemy.MetaData()
+        reflected.reflect(
+            bind = self.connection,
+            only = lambda name, _: name in tables,
+        )
+        dropped = []
+        
+        for name, table in reflected.tables.items():
+            
+            current = set(index.name for index in tables[name].indexes)
+            
+            for index in table.indexes:
+                
+                if index.name not in current:
+                    
+                    log.info('Dropping index `%s`.', index.name)
+                    index.drop(self.connection)
+                    dropped.append(index.name)
+        
+        created = self.create_indexes(
+            index
+            for name in reflected.tables
+            for index in tables[name].indexes
+        )
+        
+        return {
+            'dropped': dropped,
+            'created': [index.name for index in created],
+        }
+    
+    
+    def _existing_indexes(self):
+        """
+        Returns the names of the indexes in the database by table name.
+        """
+        
+        inspector = sqlalchemy.inspect(self.connection)
+        
+        return dict(
+            (
+                name,
+                set(index['name'] for index in inspector.get_indexes(name)),
+            )
+            for name in inspector.get_table_names()
+            if name in models.Base.metadata.tables
+        )
+    
+    
+    @staticmethod
+    def copy_csv(records):
+        """
+        Returns the rows of the ``records`` data frame as CSV for
+        PostgreSQL ``COPY``. NULLs are written as :py:data:`COPY_NULL`,
+        as an unquoted empty field would be a NULL in the default CSV
+        format, hence empty strings would become NULLs.
+        """
+        
+        return records.to_csv(
+            index = False,
+            header = False,
+            na_rep = COPY_NULL,
+        )
+    
+    
+    def _copy_batches(self, table, records):
+        """
+        Inserts the rows of the ``records`` data frame by batches of
+        PostgreSQL ``COPY FROM STDIN`` in CSV format, in the transaction
+        of the connection.
+        """
+        
+        preparer = self.connection.dialect.identifier_preparer
+        statement = (
+            "COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '%s')" % (
+                preparer.format_table(table),
+                ', '.join(
+                    preparer.quote(column) for column in records.columns
+                ),
+                COPY_NULL,
+            )
+        )
+        # the DBAPI connection of the SQLAlchemy connection
+        cursor = self.connection.connection.cursor()
+        
+        try:
+            
+            for i in range(0, len(records), self.batch_size):
+                
+                buffer = io.StringIO(
+                    self.copy_csv(records.iloc[i:i + self.batch_size])
+                )
+                cursor.copy_expert(statement, buffer)
+                
+        finally:
+            
+            cursor.close()
+    
+    
+    def _execute_batches(self, statement, records):
+        """
+        Executes ``statement`` with the parameters from the rows of the
+        ``records`` data frame, by batches of ``executemany``.
+        """
+        
+        for i in range(0, len(records), self.batch_size):
+            
+            self.connection.execute(
+                statement,
+                records.iloc[i:i + self.batch_size].to_dict('records'),
+            )
+
+
+@contextlib.contextmanager
+def fast_load(connection, cache_size = FAST_LOAD_CACHE_SIZE):
+    """
+    Context manager running a load in one transaction on ``connection``,
+    with settings of the database for speed instead of durability. The
+    transaction is committed at exit, or rolled back at errors, and the
+    previous settings are restored.
+    
+    SQLite: write ahead log (``journal_mode=WAL``), no syncing of the
+    file to the disk (``synchronous=OFF``) and a larger page cache.
+    PostgreSQL: no waiting for the WAL to be flushed at commit
+    (``synchronous_commit``) and deferrable constraints checked only at
+    commit. The records are written faster by ``COPY``, see
+    :py:class:`BulkLoader`.
+    
+    :param connection:
+        A SQLAlchemy connection, not in a transaction.
+    :param int cache_size:
+        Size of the page cache of SQLite in KiB.
+    """
+    
+    dialect = connection.dialect.name
+    previous = []
+    
+    if dialect == 'sqlite':
+        
+        # the journal mode can not be changed within a transaction
+        for pragma, value in (
+            ('journal_mode', 'WAL'),
+            ('synchronous', 'OFF'),
+            ('cache_size', -cache_size),
+        ):
+            
+            previous.append(
+                (pragma, connection.execute('PRAGMA %s' % pragma).scalar())
+            )
+            connection.execute('PRAGMA %s = %s' % (pragma, value))
+    
+    transaction = connection.begin()
+    
+    try:
+        
+        if dialect == 'postgresql':
+            
+            # both are reset at the end of the transaction
+            connection.execute('SET LOCAL synchronous_commit TO OFF')
+            connection.execute('SET CONSTRAINTS ALL DEFERRED')
+        
+        yield connection
+        
+        transaction.commit()
+        
+    except Exception:
+        
+        transaction.rollback()
+        raise
+        
+    finally:
+        
+        for pragma, value in reversed(previous):
+            
+            connection.execute('PRAGMA %s = %s' % (pragma, value))
@@ -0,0 +1,521 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Content addressed cache of the downloaded files of Bio2BEL OmniPath.
+
+The files are stored in the ``blobs`` directory named by the hash of
+their contents, hence identical downloads are stored once, and an
+index records the URL, time of download and last access, size and HTTP
+validators of each. Files derived from a blob, e.g. its columnar cache,
+are named after the blob and removed along with it. Files are written
+under temporary names and moved to their place by :py:func:`os.replace`,
+and the index is modified only while holding a file lock, hence the
+cache can be shared by concurrent processes. If a maximum size is set,
+the least recently used blobs are evicted to keep the cache within it.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import hashlib
+import threading
+import contextlib
+
+try:
+    
+    import fcntl
+
+except ImportError:
+    
+    # no file locks e.g. on Windows, the cache is safe only within one
+    # process
+    fcntl = None
+
+from .constants import get_cache_max_size, get_data_dir
+
+__all__ = [
+    'DownloadCache',
+    'get_cache',
+    'parse_size',
+    'content_hash',
+    'temp_path',
+]
+
+log = logging.getLogger(__name__)
+
+# multipliers of the suffixes of sizes
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+# the files downloaded by earlier versions into the data directory
+LEGACY_FILE = re.compile(r'^[0-9a-f]{32}(\.|$)')
+
+_lock = threading.Lock()
+_cache = None
+
+
+def temp_path(path):
+    """
+    Returns a temporary file name next to ``path``, unique for the
+    current process and thread. Files are written under such names
+    and renamed to ``path`` by :py:func:`os.replace`, which is atomic,
+    hence concurrent readers never see incomplete files.
+    """
+    
+    return '%s.%u.%u.tmp' % (path, os.getpid(), threading.get_ident())
+
+
+def content_hash(path):
+    """
+    Returns the MD5 hex digest of the contents of a file.
+    """
+    
+    md5 = hashlib.md5()
+    
+    with open(path, 'rb') as fp:
+        
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            
+            md5.update(block)
+    
+    return md5.hexdigest()
+
+
+def parse_size(size):
+    """
+    Returns the number of bytes from a size as a number or a string
+    with an optional binary unit, e.g. `500M` or `2G`. None means no
+    limit.
+    """
+    
+    if size is None or isinstance(size, int):
+        
+        return size
+    
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*$', size.upper())
+    
+    if not match:
+        
+        raise ValueError('Invalid size: `%s`.' % size)
+    
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def get_cache():
+    """
+    Returns the cache in the data directory, with the maximum size from
+    the configuration, see :py:func:`constants.get_cache_max_size`.
+    """
+    
+    global _cache
+    
+    with _lock:
+        
+        if _cache is None:
+            
+            _cache = DownloadCache()
+        
+        return _cache
+
+
+class DownloadCache(object):
+    """
+    Content addressed cache of downloaded files, with an index by URL
+    and least recently used eviction above a maximum size.
+    """
+    
+    def __init__(self, directory = None, max_size = None):
+        """
+        :param str directory:
+            The directory of the cache, by default ``cache`` in the
+            data directory.
+        :param max_size:
+            Maximum size of the blobs in bytes, or as a string with a
+            unit, see :py:func:`parse_size`. By default the
+            `cache_max_size` of the configuration, unlimited if missing.
+        """
+        
+        self.directory = directory or os.path.join(get_data_dir(), 'cache')
+        self.max_size = parse_size(
+            get_cache_max_size() if max_size is None else max_size
+        )
+        self.blob_dir = os.path.join(self.directory, 'blobs')
+        self.partial_dir = os.path.join(self.directory, 'partial')
+        self.lock_dir = os.path.join(self.directory, 'locks')
+        self.index_path = os.path.join(self.directory, 'index.json')
+        
+        for directory in (self.blob_dir, self.partial_dir, self.lock_dir):
+            
+            os.makedirs(directory, exist_ok = True)
+    
+    
+    @staticmethod
+    def key(url):
+        """
+        Returns the key of ``url`` in the names of its partial download
+        and lock.
+        """
+        
+        return hashlib.md5(url.encode('utf-8')).hexdigest()
+    
+    
+    def blob_path(self, digest):
+        """
+        Returns the path of the blob with contents hash ``digest``.
+        """
+        
+        return os.path.join(self.blob_dir, digest)
+    
+    
+    def partial_path(self, url):
+        """
+        Returns the path for downloading ``url`` before its contents
+        are hashed and stored.
+        """
+        
+        return os.path.join(self.partial_dir, self.key(url))
+    
+    
+    @contextlib.contextmanager
+    def lock(self, name = 'index'):
+        """
+        Context holding an exclusive lock on ``name`` among all threads
+        and processes using the cache.
+        """
+        
+        with open(os.path.join(self.lock_dir, '%s.lock' % name), 'a') as fp:
+            
+            if fcntl is not None:
+                
+                fcntl.flock(fp, fcntl.LOCK_EX)
+            
+            try:
+                
+                yield
+                
+            finally:
+                
+                if fcntl is not None:
+                    
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+    
+    
+    def url_lock(self, url):
+        """
+        Context holding an exclusive lock on downloading ``url``.
+        """
+        
+        return self.lock(self.key(url))
+    
+    
+    def _read_index(self):
+        """
+        Returns the index: dict of entries by URL.
+        """
+        
+        if not os.path.exists(self.index_path):
+            
+            return {}
+        
+        with open(self.index_path, 'r') as fp:
+            
+            return json.load(fp)
+    
+    
+    def _write_index(self, index):
+        """
+        Replaces the index, atomically.
+        """
+        
+        tmp_path = temp_path(self.index_path)
+        
+        with open(tmp_path, 'w') as fp:
+            
+            json.dump(index, fp, indent = 1, sort_keys = True)
+        
+        os.replace(tmp_path, self.index_path)
+    
+    
+    def entry(self, url):
+        """
+        Returns the index entry of ``url``, None if it is not in the
+        cache or its blob has been removed.
+        """
+        
+        entry = self._read_index().get(url)
+        
+        if entry is not None and os.path.exists(self.blob_path(entry['hash'])):
+            
+            return entry
+    
+    
+    def get(self, url):
+        """
+        Returns the path of the blob downloaded from ``url`` and records
+        its access, None if it is not in the cache.
+        """
+        
+        with self.lock():
+            
+            index = self._read_index()
+            entry = index.get(url)
+            
+            if entry is None:
+                
+                return None
+            
+            path = self.blob_path(entry['hash'])
+            
+            if not os.path.exists(path):
+                
+                return None
+            
+            entry['accessed'] = time.time()
+            self._write_index(index)
+        
+        return path
+    
+    
+    def touch(self, url):
+        """
+        Records that the blob of ``url`` has been found up to date.
+        """
+        
+        with self.lock():
+            
+            index = self._read_index()
+            
+            if url in index:
+                
+                index[url]['fetched'] = index[url]['accessed'] = time.time()
+                self._write_index(index)
+    
+    
+    def store(self, url, path, meta = None):
+        """
+        Moves the file at ``path``, downloaded from ``url``, into the
+        cache, and evicts the least recently used blobs if the cache
+        exceeds its maximum size.
+        
+        :param dict meta:
+            HTTP validators of the download, kept in the index.
+        
+        :return:
+            The path of the blob.
+        """
+        
+        digest = content_hash(path)
+        blob_path = self.blob_path(digest)
+        size = os.path.getsize(path)
+        now = time.time()
+        
+        with self.lock():
+            
+            if os.path.exists(blob_path):
+                
+                os.remove(path)
+                
+            else:
+                
+                os.replace(path, blob_path)
+            
+            index = self._read_index()
+            index[url] = dict(
+                meta or {},
+                hash = digest,
+                size = size,
+                fetched = now,
+                accessed = now,
+            )
+            self._evict(index, self.max_size, keep = digest)
+            self._write_index(index)
+        
+        log.info('cached %s as %s', url, blob_path)
+        
+        return blob_path
+    
+    
+    def _blob_sizes(self):
+        """
+        Returns the size of each blob along with its derived files, by
+        hash.
+        """
+        
+        sizes = {}
+        
+        for name in os.listdir(self.blob_dir):
+            
+            if name.endswith('.tmp'):
+                
+                continue
+            
+            digest = name.split('.', 1)[0]
+            sizes[digest] = (
+                sizes.get(digest, 0) +
+                os.path.getsize(os.path.join(self.blob_dir, name))
+            )
+        
+        return sizes
+    
+    
+    def _remove_blob(self, digest):
+        """
+        Removes a blob and the files derived from it.
+        """
+        
+        for name in os.listdir(self.blob_dir):
+            
+            if name == digest or name.startswith('%s.' % digest):
+                
+                with contextlib.suppress(FileNotFoundError):
+                    
+                    os.remove(os.path.join(self.blob_dir, name))
+    
+    
+    def _evict(self, index, max_size, keep = None):
+        """
+        Removes the blobs not in ``index``, the entries of ``index``
+        without blob, and the least recently used blobs until the total
+        size is at most ``max_size``. Never removes the blob ``keep``.
+        
+        :return:
+            The number of bytes freed.
+        """
+        
+        sizes = self._blob_sizes()
+        accessed = dict.fromkeys(sizes, 0.)
+        
+        for url, entry in list(index.items()):
+            
+            if entry['hash'] not in sizes:
+                
+                del index[url]
+                
+            else:
+                
+                accessed[entry['hash']] = max(
+                    accessed[entry['hash']],
+                    entry['accessed'],
+                )
+        
+        referenced = set(entry['hash'] for entry in index.values())
+        total = sum(sizes.values())
+        freed = 0
+        
+        for digest in sorted(accessed, key = accessed.get):
+            
+            if digest == keep:
+                
+                continue
+            
+            if (
+                digest in referenced and
+                (max_size is None or total - freed <= max_size)
+            ):
+                
+                break
+            
+            log.info('evicting %s from the cache', digest)
+            self._remove_blob(digest)
+            freed += sizes[digest]
+            
+            for url in [u for u, e in index.items() if e['hash'] == digest]:
+                
+                del index[url]
+        
+        return freed
+    
+    
+    def entries(self):
+        """
+        Returns the entries of the index, each with its ``url``, from
+        the least to the most recently used.
+        """
+        
+        return sorted(
+            (
+                dict(entry, url = url)
+                for url, entry in self._read_index().items()
+            ),
+            key = lambda entry: entry['accessed'],
+        )
+    
+    
+    def size(self):
+        """
+        Returns the total size of the blobs and their derived files.
+        """
+        
+        return sum(self._blob_sizes().values())
+    
+    
+    def prune(self, max_size = None, legacy = False):
+        """
+        Removes the blobs of no URL, and the least recently used blobs
+        until the cache is within ``max_size``.
+        
+        :param max_size:
+            Maximum size of the cache in bytes, or as a string with a
+            unit, by default that of the cache.
+        :param bool legacy:
+            Remove also the files downloaded into the data directory
+            by earlier versions, named by the hash of their URL.
+        
+        :return:
+            The number of bytes freed.
+        """
+        
+        max_size = self.max_size if max_size is None else parse_size(max_size)
+        
+        with self.lock():
+            
+            index = self._read_index()
+            freed = self._evict(index, max_size)
+            self._write_index(index)
+        
+        if legacy:
+            
+            data_dir = get_data_dir()
+            
+            for name in os.listdir(data_dir):
+                
+                path = os.path.join(data_dir, name)
+                
+                if LEGACY_FILE.match(name) and os.path.isfile(path):
+                    
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+        
+        return freed
+    
+    
+    def clear(self):
+        """
+        Removes all files from the cache.
+        """
+        
+        with self.lock():
+            
+            for directory in (self.blob_dir, self.partial_dir):
+                
+                shutil.rmtree(directory, ignore_errors = True)
+                os.makedirs(directory)
+            
+            self._write_index({})
@@ -32,11 +32,267 @@ later, but that will cause problems - the code will get executed twice:
   there's no ``bio2bel_omnipath.__main__`` in ``sys.modules``.
 
 Also see (1) from http://click.pocoo.org/5/setuptools/#setuptools-integration
+
+The commands are those of :py:meth:`manager.Manager.get_cli`, which
+imports Bio2BEL, PyBEL, pandas and builds the manager, taking seconds.
+Hence the main group is built without them: the help is listed from
+:py:data:`COMMANDS`, ``summarize`` reads the statistics by SQLAlchemy
+only, ``cache`` manages the download cache without database, and the
+other commands are loaded at their invocation.
 """
 
-from .manager import Manager
+import sys
+import logging
+
+import click
+from more_click import verbose_option
+
+from .constants import MODULE_NAME, get_connection
+
+__all__ = [
+    'main',
+]
+
+# the commands of the manager's CLI with their short help
+COMMANDS = {
+    'bel': 'Manage BEL.',
+    'cache': 'Manage cached data.',
+    'drop': 'Drop the database.',
+    'populate': 'Populate the database.',
+    'summarize': 'Summarize the contents of the database.',
+}
+# commands run without loading the manager
+FAST_COMMANDS = ('cache', 'summarize')
+
+
+class LazyGroup(click.Group):
+    """
+    The main group of the CLI, loading the commands of the manager only
+    when one of them is invoked.
+    """
+    
+    def list_commands(self, ctx):
+        """
+        Returns the names of the commands, without loading them.
+        """
+        
+        return sorted(COMMANDS)
+    
+    
+    def get_command(self, ctx, name):
+        """
+        Returns the fast commands, or loads the command of the manager.
+        """
+        
+        if name in self.commands:
+            
+            return self.commands[name]
+        
+        if name not in COMMANDS:
+            
+            return None
+        
+        from .manager import Manager
+        
+        return Manager.get_cli().get_command(ctx, name)
+    
+    
+    def format_commands(self, ctx, formatter):
+        """
+        Lists the commands with their short help from
+        :py:data:`COMMANDS`.
+        """
+        
+        with formatter.section('Commands'):
+            
+            formatter.write_dl(sorted(COMMANDS.items()))
+
+
+@click.group(cls = LazyGroup, help = 'Bio2BEL OmniPath.')
+@click.option(
+    '-c', '--connection',
+    default = get_connection,
+    help = 'SQLAlchemy connection string, by default from the PyBEL '
+        'configuration',
+)
+@click.pass_context
+def main(ctx, connection):
+    """
+    Bio2BEL CLI.
+    """
+    
+    if ctx.invoked_subcommand in FAST_COMMANDS:
+        
+        ctx.obj = connection
+        return
+    
+    from .manager import Manager
+    
+    logging.basicConfig(
+        level = logging.INFO,
+        format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
+    logging.getLogger('bio2bel.utils').setLevel(logging.WARNING)
+    ctx.obj = Manager(connection = connection)
+
+
+@main.command()
+@verbose_option
+@click.pass_obj
+def summarize(connection):
+    """
+    Summarize the contents of the database.
+    """
+    
+    import sqlalchemy
+    from . import models
+    from . import stats
+    
+    engine = sqlalchemy.create_engine(connection)
+    
+    with engine.connect() as conn:
+        
+        # read only, the schema is not created
+        existing = set(sqlalchemy.inspect(conn).get_table_names())
+        counts = (
+            None
+                if any(
+                    table_name not in existing
+                    for _, table_name in models.SUMMARY_TABLE_NAMES
+                ) else
+            stats.summary(conn)
+                if models.STATISTIC_TABLE_NAME in existing else
+            stats.count_summary(conn)
+        )
+    
+    engine.dispose()
+    
+    if not (counts and counts['interactions'] and counts['ptms']):
+        
+        click.secho('%s has not been populated' % MODULE_NAME, fg = 'red')
+        sys.exit(1)
+    
+    for name, count in sorted(counts.items()):
+        
+        click.echo('%s: %s' % (name.capitalize(), count))
+
+
+def _format_size(size):
+    """
+    Returns a human readable size in binary units.
+    """
+    
+    for unit in ('B', 'K', 'M', 'G'):
+        
+        if size < 1024:
+            
+            break
+        
+        size /= 1024.
+        
+    else:
+        
+        unit = 'T'
+    
+    return ('%u %s' if unit == 'B' else '%.1f %s') % (size, unit)
+
+
+@main.group()
+def cache():
+    """
+    Manage cached data.
+    """
+
+
+@cache.command()
+@verbose_option
+def locate():
+    """
+    Print the location of the download cache.
+    """
+    
+    from .cache import get_cache
+    
+    click.echo(get_cache().directory)
+
+
+@cache.command()
+@verbose_option
+def ls():
+    """
+    List the cached downloads, least recently used first.
+    """
+    
+    import datetime
+    from .cache import get_cache
+    
+    download_cache = get_cache()
+    
+    for entry in download_cache.entries():
+        
+        click.echo(
+            '%s  %10s  %s  %s' % (
+                entry['hash'][:12],
+                _format_size(entry['size']),
+                datetime.datetime.fromtimestamp(entry['accessed']).
+                isoformat(' ', 'seconds'),
+                entry['url'],
+            )
+        )
+    
+    click.echo(
+        'Total: %s%s' % (
+            _format_size(download_cache.size()),
+            (
+                ''
+                    if download_cache.max_size is None else
+                ' of %s' % _format_size(download_cache.max_size)
+            ),
+        )
+    )
+
+
+@cache.command()
+@click.option(
+    '-s', '--max-size',
+    help = 'Evict the least recently used files to this size, e.g. 500M, '
+        'by default the configured maximum size',
+)
+@click.option(
+    '-l', '--legacy',
+    is_flag = True,
+    help = 'Remove also the files downloaded by earlier versions',
+)
+@verbose_option
+def prune(max_size, legacy):
+    """
+    Remove unused and least recently used downloads.
+    """
+    
+    from .cache import get_cache
+    
+    try:
+        
+        freed = get_cache().prune(max_size = max_size, legacy = legacy)
+        
+    except ValueError as e:
+        
+        raise click.BadParameter(str(e), param_hint = '--max-size')
+    
+    click.echo('Freed %s' % _format_size(freed))
+
+
+@cache.command()
+@verbose_option
+def clear():
+    """
+    Clear all files from the download cache.
+    """
+    
+    from .cache import get_cache
+    
+    get_cache().clear()
 
-main = Manager.get_cli()
 
 if __name__ == '__main__':
     main()
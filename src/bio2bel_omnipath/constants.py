@@ -22,35 +22,155 @@ Constants for Bio2BEL OmniPath.
 
 import os
 
-import bio2bel
-
 
 __all__ = [
     'VERSION',
     'MODULE_NAME',
-    'DATA_DIR',
+    # resolved lazily by the module `__getattr__`
+    'DATA_DIR',  # noqa: F822
     'get_version',
+    'get_url',
+    'get_data_dir',
+    'get_connection',
+    'get_cache_max_size',
 ]
 
 VERSION = '0.0.1'
 MODULE_NAME = 'omnipath'
-DATA_DIR = bio2bel.get_data_dir(MODULE_NAME)
-DEFAULT_CONNECTION = bio2bel.get_connection(MODULE_NAME)
+
+# the cache of PyBEL, the default database of the Bio2BEL managers
+PYBEL_CACHE_NAME = 'pybel_0.14.0_cache.db'
+
+
+def get_data_dir():
+    """
+    Returns the data directory of Bio2BEL OmniPath, creating it if
+    necessary. The same as :py:func:`bio2bel.get_data_dir`, without
+    importing Bio2BEL, which imports PyBEL and pandas.
+    """
+    
+    import pystow
+    
+    return str(pystow.join('bio2bel', MODULE_NAME))
+
+
+def get_connection():
+    """
+    Returns the default SQLAlchemy connection string: the `connection`
+    of the `pybel` configuration, or the PyBEL cache. The same as
+    :py:func:`bio2bel.utils.get_connection`, without importing PyBEL.
+    """
+    
+    import pystow
+    
+    return pystow.get_config(
+        'pybel',
+        'connection',
+        default = 'sqlite:///%s' % (
+            pystow.join('pybel', name = PYBEL_CACHE_NAME).as_posix()
+        ),
+    )
+
+
+def get_cache_max_size():
+    """
+    Returns the maximum size of the download cache: the
+    `cache_max_size` of the `omnipath` configuration, e.g. `10G`, also
+    from the ``OMNIPATH_CACHE_MAX_SIZE`` environment variable. None if
+    not configured, the cache is then unlimited.
+    """
+    
+    import pystow
+    
+    return pystow.get_config(MODULE_NAME, 'cache_max_size')
+
+
+# constants resolved at their first use, not at import, as resolving
+# them creates directories and reads the configuration
+LAZY_CONSTANTS = {
+    'DATA_DIR': get_data_dir,
+    'GRAPH_INDEX_DIR': lambda: os.path.join(get_data_dir(), 'graph_index'),
+    'DEFAULT_CONNECTION': get_connection,
+}
+
+
+def __getattr__(name):
+    """
+    Resolves the constants in :py:data:`LAZY_CONSTANTS` at their first
+    access.
+    """
+    
+    if name not in LAZY_CONSTANTS:
+        
+        raise AttributeError(
+            'module `%s` has no attribute `%s`' % (__name__, name)
+        )
+    
+    value = LAZY_CONSTANTS[name]()
+    globals()[name] = value
+    
+    return value
+
 
 PROTEIN_NAMESPACE = 'UNIPROT'
+MIRNA_NAMESPACE = 'MIRBASE.MATURE'
 
-OMNIPATH_URL = (
-    'http://omnipathdb.org/%s/?'
-    'fields=sources,references%s,ncbi_tax_id&gensymbols=1'
-)
-INTERACTIONS_URL = OMNIPATH_URL % (',type', 'interactions')
-PTMS_URL = OMNIPATH_URL % ('', 'ptms')
+OMNIPATH_URL = 'http://omnipathdb.org/%s/?fields=%s&genesymbols=1'
+
+# fields requested from the web service in addition to the default ones,
+# only those used for building the database
+FIELDS = {
+    'interactions': ('sources', 'references', 'type', 'ncbi_tax_id'),
+    'ptms': ('sources', 'references', 'ncbi_tax_id'),
+    'complexes': (),
+    'annotations': (),
+}
+
+
+def get_url(query_type, fields = None):
+    """
+    Returns the URL of a web service query.
+    
+    :param str query_type:
+        The web service query type, e.g. `interactions` or `ptms`.
+    :param list fields:
+        Fields to request; by default those in :py:data:`FIELDS`.
+    """
+    
+    return OMNIPATH_URL % (
+        query_type,
+        ','.join(FIELDS[query_type] if fields is None else fields),
+    )
+
+
+INTERACTIONS_URL = get_url('interactions')
+PTMS_URL = get_url('ptms')
+COMPLEXES_URL = get_url('complexes')
+ANNOTATIONS_URL = get_url('annotations')
 
 URLS = {
     'interactions': INTERACTIONS_URL,
     'ptms': PTMS_URL,
+    'complexes': COMPLEXES_URL,
+    'annotations': ANNOTATIONS_URL,
 }
 
+# the complexes and annotations have no taxon, their entities are human
+DEFAULT_TAXID = 9606
+
+# number of records written by one `executemany` call in bulk mode
+BULK_BATCH_SIZE = 50000
+# page cache of SQLite in KiB while loading in fast mode
+FAST_LOAD_CACHE_SIZE = 1 << 19
+# number of values in one `IN` clause of the query API
+QUERY_CHUNK_SIZE = 500
+# number of query results kept in the cache of the query API
+QUERY_CACHE_SIZE = 100000
+# number of interactions or PTMs converted to BEL edges in one batch
+BEL_BATCH_SIZE = 10000
+# number of chunks waiting between two stages of the loading pipeline
+PIPELINE_QUEUE_SIZE = 2
+
 
 def get_version() -> str:
     """
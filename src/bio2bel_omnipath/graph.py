@@ -0,0 +1,509 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Compressed sparse row (CSR) adjacency of the interactions for network
+queries without SQL in Bio2BEL OmniPath.
+"""
+
+import os
+import json
+import logging
+import itertools
+
+import numpy as np
+import sqlalchemy
+
+from . import models
+
+__all__ = [
+    'GraphIndex',
+]
+
+log = logging.getLogger(__name__)
+
+DIRECTIONS = ('out', 'both')
+
+
+def _fetch_array(connection, query):
+    """
+    Returns the integer values of all rows of ``query`` in a flat array.
+    Much faster than creating the array from the list of rows.
+    """
+    
+    return np.fromiter(
+        itertools.chain.from_iterable(connection.execute(query)),
+        dtype = np.int64,
+    )
+
+
+class GraphIndex(object):
+    """
+    Adjacency of the molecular entities by their interactions in NumPy
+    arrays, in compressed sparse row (CSR) format.
+    
+    The nodes are the keys of :py:class:`models.MolecularEntity` records,
+    in ascending order, at ``node_ids``. Each interaction is an edge with
+    its attributes in arrays of the length of the number of edges:
+    ``interaction_ids``, ``sources`` and ``targets`` (node indices),
+    ``directed``, ``sign`` (1: stimulation, -1: inhibition, 0: unknown or
+    both) and ``types`` (keys of :py:class:`models.InteractionType`,
+    names in ``type_names``).
+    
+    Each edge has two entries in the adjacency: one in the row of the
+    source and one in the row of the target. The neighbors of the node
+    ``i`` are ``indices[indptr[i]:indptr[i + 1]]``, the edges leading to
+    them are at ``entry_edges``, and ``forward`` tells if the entry
+    follows the direction of the edge, or the edge is undirected.
+    """
+    
+    ARRAYS = (
+        'node_ids',
+        'indptr',
+        'indices',
+        'entry_edges',
+        'forward',
+        'interaction_ids',
+        'sources',
+        'targets',
+        'directed',
+        'sign',
+        'types',
+    )
+    
+    def __init__(self, type_names = None, **arrays):
+        """
+        :param dict type_names:
+            Names of the interaction types by key.
+        :param arrays:
+            The arrays listed in ``ARRAYS``.
+        """
+        
+        self.type_names = type_names or {}
+        
+        for name in self.ARRAYS:
+            
+            setattr(self, name, arrays[name])
+    
+    
+    @classmethod
+    def from_edges(
+            cls,
+            node_ids,
+            interaction_ids,
+            sources,
+            targets,
+            directed,
+            sign,
+            types,
+            type_names = None,
+        ):
+        """
+        Builds the adjacency from arrays of edges.
+        
+        :param node_ids:
+            Keys of all molecular entities, also those without edges.
+        :param interaction_ids:
+            Keys of the interactions.
+        :param sources:
+            Keys of the source entities of the interactions.
+        :param targets:
+            Keys of the target entities of the interactions.
+        :param directed:
+            1 for directed interactions, 0 for undirected ones.
+        :param sign:
+            1 for stimulation, -1 for inhibition, 0 otherwise.
+        :param types:
+            Keys of the interaction types.
+        :param dict type_names:
+            Names of the interaction types by key.
+        """
+        
+        node_ids = np.unique(np.asarray(node_ids, dtype = np.int64))
+        directed = np.asarray(directed, dtype = np.int8)
+        sources = np.searchsorted(node_ids, sources).astype(np.int32)
+        targets = np.searchsorted(node_ids, targets).astype(np.int32)
+        n_edges = len(sources)
+        edges = np.arange(n_edges, dtype = np.int32)
+        
+        # each edge from both ends
+        rows = np.concatenate([sources, targets])
+        order = np.argsort(rows, kind = 'stable')
+        indptr = np.zeros(len(node_ids) + 1, dtype = np.int64)
+        np.cumsum(
+            np.bincount(rows, minlength = len(node_ids)),
+            out = indptr[1:],
+        )
+        
+        return cls(
+            type_names = type_names,
+            node_ids = node_ids,
+            indptr = indptr,
+            indices = np.concatenate([targets, sources])[order],
+            entry_edges = np.concatenate([edges, edges])[order],
+            forward = np.concatenate([
+                np.ones(n_edges, dtype = bool),
+                directed == 0,
+            ])[order],
+            interaction_ids = np.asarray(interaction_ids, dtype = np.int64),
+            sources = sources,
+            targets = targets,
+            directed = directed,
+            sign = np.asarray(sign, dtype = np.int8),
+            types = np.asarray(types, dtype = np.int16),
+        )
+    
+    
+    @classmethod
+    def from_database(cls, connection):
+        """
+        Builds the adjacency of all molecular entities and interactions
+        in the database.
+        
+        :param connection:
+            A SQLAlchemy connection or engine.
+        """
+        
+        entity = models.MolecularEntity.__table__
+        interaction = models.Interaction.__table__
+        interaction_type = models.InteractionType.__table__
+        
+        node_ids = _fetch_array(
+            connection,
+            sqlalchemy.select([entity.c.id]),
+        ).reshape(-1)
+        
+        edges = _fetch_array(
+            connection,
+            sqlalchemy.select([
+                interaction.c.id,
+                interaction.c.source_id,
+                interaction.c.target_id,
+                interaction.c.is_directed,
+                interaction.c.is_stimulation - interaction.c.is_inhibition,
+                interaction.c.type_id,
+            ]).order_by(interaction.c.id),
+        ).reshape(-1, 6)
+        
+        type_names = dict(
+            connection.execute(
+                sqlalchemy.select([
+                    interaction_type.c.id,
+                    interaction_type.c.interaction_type,
+                ])
+            ).fetchall()
+        )
+        
+        log.info(
+            'Building graph index of %u entities and %u interactions.',
+            len(node_ids),
+            len(edges),
+        )
+        
+        return cls.from_edges(
+            node_ids = node_ids,
+            interaction_ids = edges[:, 0],
+            sources = edges[:, 1],
+            targets = edges[:, 2],
+            directed = edges[:, 3],
+            sign = edges[:, 4],
+            types = edges[:, 5],
+            type_names = type_names,
+        )
+    
+    
+    def save(self, directory, meta = None):
+        """
+        Saves the arrays into ``.npy`` files in ``directory``, which can
+        be memory mapped by :py:meth:`load`, and the type names and
+        ``meta`` into a JSON file. The JSON file is written last, hence
+        an index is complete if it exists.
+        
+        :param dict meta:
+            Any data to be saved along with the index, e.g. to check if
+            it is up to date with the database.
+        """
+        
+        os.makedirs(directory, exist_ok = True)
+        meta_path = os.path.join(directory, 'meta.json')
+        
+        if os.path.exists(meta_path):
+            
+            os.remove(meta_path)
+        
+        for name in self.ARRAYS:
+            
+            np.save(os.path.join(directory, '%s.npy' % name), getattr(self, name))
+        
+        with open(meta_path, 'w') as fp:
+            
+            json.dump(
+                {
+                    'type_names': self.type_names,
+                    'meta': meta or {},
+                },
+                fp,
+            )
+        
+        log.info('Graph index saved to `%s`.', directory)
+    
+    
+    @classmethod
+    def load(cls, directory, mmap = True):
+        """
+        Loads an index saved by :py:meth:`save`.
+        
+        :param bool mmap:
+            Memory map the arrays instead of reading them, i.e. the data
+            is read from the disk only when accessed, and shared by the
+            processes using the same index.
+        
+        :return:
+            The index and the ``meta`` saved with it, or None and None
+            if there is no complete index in ``directory``.
+        """
+        
+        meta_path = os.path.join(directory, 'meta.json')
+        
+        if not os.path.exists(meta_path):
+            
+            return None, None
+        
+        with open(meta_path, 'r') as fp:
+            
+            meta = json.load(fp)
+        
+        index = cls(
+            # JSON keys are strings
+            type_names = dict(
+                (int(key), name)
+                for key, name in meta['type_names'].items()
+            ),
+            **dict(
+                (
+                    name,
+                    np.load(
+                        os.path.join(directory, '%s.npy' % name),
+                        mmap_mode = 'r' if mmap else None,
+                    ),
+                )
+                for name in cls.ARRAYS
+            )
+        )
+        
+        return index, meta['meta']
+    
+    
+    @property
+    def n_nodes(self):
+        
+        return len(self.node_ids)
+    
+    
+    @property
+    def n_edges(self):
+        
+        return len(self.interaction_ids)
+    
+    
+    def neighborhood(self, entity_ids, k = 1, direction = 'out', types = None):
+        """
+        Returns the entities within ``k`` steps from any of ``entity_ids``,
+        including themselves.
+        
+        :param entity_ids:
+            Keys of molecular entities.
+        :param int k:
+            Maximum number of steps.
+        :param str direction:
+            `out`: follow directed interactions from the source to the
+            target, and undirected ones both ways; `both`: follow all
+            interactions both ways.
+        :param types:
+            Names of interaction types to follow, by default all.
+        
+        :return:
+            Array of entity keys in ascending order.
+        """
+        
+        mask = self._entry_mask(direction, types)
+        visited = np.zeros(self.n_nodes, dtype = bool)
+        frontier = np.unique(self._nodes(entity_ids))
+        visited[frontier] = True
+        
+        for _ in range(k):
+            
+            if not len(frontier):
+                
+                break
+            
+            _, neighbors = self._expand(frontier, mask)
+            frontier = np.unique(neighbors[~visited[neighbors]])
+            visited[frontier] = True
+        
+        return self.node_ids[visited]
+    
+    
+    def shortest_path(self, source, target, direction = 'out', types = None):
+        """
+        Finds a shortest path between two entities by breadth first
+        search.
+        
+        :param int source:
+            Key of the entity to start from.
+        :param int target:
+            Key of the entity to arrive to.
+        :param str direction:
+            Which interactions to follow, see :py:meth:`neighborhood`.
+        :param types:
+            Names of interaction types to follow, by default all.
+        
+        :return:
+            List of entity keys from ``source`` to ``target``, or None
+            if ``target`` can not be reached.
+        """
+        
+        mask = self._entry_mask(direction, types)
+        source, target = self._nodes([source, target])
+        parents = np.full(self.n_nodes, -1, dtype = np.int64)
+        visited = np.zeros(self.n_nodes, dtype = bool)
+        visited[source] = True
+        frontier = np.array([source])
+        
+        while len(frontier) and not visited[target]:
+            
+            origins, neighbors = self._expand(frontier, mask)
+            new = ~visited[neighbors]
+            frontier, first = np.unique(neighbors[new], return_index = True)
+            visited[frontier] = True
+            parents[frontier] = origins[new][first]
+        
+        if not visited[target]:
+            
+            return None
+        
+        path = [target]
+        
+        while path[-1] != source:
+            
+            path.append(parents[path[-1]])
+        
+        return self.node_ids[path[::-1]].tolist()
+    
+    
+    def subgraph(self, entity_ids):
+        """
+        Returns the subgraph induced by ``entity_ids``: the entities and
+        the interactions between them, as a new index.
+        """
+        
+        nodes = np.unique(self._nodes(entity_ids))
+        member = np.zeros(self.n_nodes, dtype = bool)
+        member[nodes] = True
+        edges = member[self.sources] & member[self.targets]
+        
+        return type(self).from_edges(
+            node_ids = self.node_ids[nodes],
+            interaction_ids = self.interaction_ids[edges],
+            sources = self.node_ids[self.sources[edges]],
+            targets = self.node_ids[self.targets[edges]],
+            directed = self.directed[edges],
+            sign = self.sign[edges],
+            types = self.types[edges],
+            type_names = self.type_names,
+        )
+    
+    
+    def _nodes(self, entity_ids):
+        """
+        Returns the node indices of entity keys.
+        """
+        
+        entity_ids = np.asarray(entity_ids, dtype = np.int64).reshape(-1)
+        nodes = np.searchsorted(self.node_ids, entity_ids)
+        unknown = (
+            (nodes == self.n_nodes) |
+            (self.node_ids[np.minimum(nodes, self.n_nodes - 1)] != entity_ids)
+        )
+        
+        if unknown.any():
+            
+            raise KeyError(
+                'Unknown entities: %s' % ', '.join(
+                    map(str, entity_ids[unknown][:10])
+                )
+            )
+        
+        return nodes
+    
+    
+    def _entry_mask(self, direction, types):
+        """
+        Returns a boolean array of the adjacency entries to follow, or
+        None if all of them can be followed.
+        """
+        
+        if direction not in DIRECTIONS:
+            
+            raise ValueError(
+                'Direction must be one of %s, not `%s`.' % (
+                    ', '.join(DIRECTIONS),
+                    direction,
+                )
+            )
+        
+        mask = np.asarray(self.forward) if direction == 'out' else None
+        
+        if types:
+            
+            type_ids = [
+                key
+                for key, name in self.type_names.items()
+                if name in set(types)
+            ]
+            of_type = np.isin(self.types, type_ids)[self.entry_edges]
+            mask = of_type if mask is None else mask & of_type
+        
+        return mask
+    
+    
+    def _expand(self, nodes, mask = None):
+        """
+        Returns the adjacency entries of ``nodes`` as two arrays: the
+        nodes and their neighbors.
+        
+        :param mask:
+            Boolean array of the entries to follow, by default all.
+        """
+        
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        # positions of all entries in the rows of the nodes
+        entries = (
+            np.repeat(starts - np.cumsum(counts) + counts, counts) +
+            np.arange(counts.sum())
+        )
+        origins = np.repeat(nodes, counts)
+        
+        if mask is not None:
+            
+            keep = mask[entries]
+            entries = entries[keep]
+            origins = origins[keep]
+        
+        return origins, self.indices[entries]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Bounded least recently used cache of query results for Bio2BEL OmniPath.
+"""
+
+import collections
+
+__all__ = [
+    'LruCache',
+]
+
+
+class LruCache(object):
+    """
+    Dict like cache keeping at most ``maxsize`` items: adding more
+    evicts the least recently used ones. Counts the hits and misses.
+    """
+    
+    def __init__(self, maxsize):
+        """
+        :param int maxsize:
+            Maximum number of items.
+        """
+        
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+    
+    
+    def get(self, key, default = None):
+        """
+        Returns the item at ``key`` and marks it as the most recently
+        used, or ``default`` if it is not in the cache.
+        """
+        
+        if key in self._items:
+            
+            self.hits += 1
+            self._items.move_to_end(key)
+            
+            return self._items[key]
+        
+        self.misses += 1
+        
+        return default
+    
+    
+    def set(self, key, value):
+        """
+        Adds an item, evicting the least recently used ones if the
+        cache is full.
+        """
+        
+        self._items[key] = value
+        self._items.move_to_end(key)
+        
+        while len(self._items) > self.maxsize:
+            
+            self._items.popitem(last = False)
+    
+    
+    def clear(self):
+        """
+        Removes all items and resets the counters.
+        """
+        
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    
+    def __contains__(self, key):
+        
+        return key in self._items
+    
+    
+    def __len__(self):
+        
+        return len(self._items)
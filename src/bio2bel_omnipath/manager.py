@@ -20,24 +20,101 @@
 Manager for Bio2BEL OmniPath.
 """
 
+import json
+import cProfile
+import logging
+import datetime
+import contextlib
 import collections
 
+import click
+from more_click import verbose_option
+
+import pandas as pd
+import sqlalchemy.orm
+from tqdm import tqdm
+
 import bio2bel
-from .constants import MODULE_NAME
-import .models
-import .parser
+from bio2bel.manager.bel_manager import BELManagerMixin, add_cli_to_bel
+from .constants import (
+    BEL_BATCH_SIZE,
+    MODULE_NAME,
+    PIPELINE_QUEUE_SIZE,
+    QUERY_CACHE_SIZE,
+    QUERY_CHUNK_SIZE,
+    get_version,
+)
+from . import constants
+from . import models
+from . import parser
+from . import stats
+from .bulk import BulkLoader, fast_load
+from .tables import TableBuilder
+from .profiling import Profiler
+from .pipeline import pipeline
+from .lru import LruCache
+from .graph import GraphIndex
+from .bel import FORMATS, PARTITIONS, BelExporter
 
 __all__ = [
     'Manager',
 ]
 
-class Manager(bio2bel.AbstractManager):
+log = logging.getLogger(__name__)
+
+# datasets in the order of loading
+DATASETS = ('interactions', 'ptms', 'complexes', 'annotations')
+DIRECTIONS = ('out', 'in', 'both')
+# tables written by loading the datasets, None for all tables
+DATASET_TABLES = {
+    'interactions': None,
+    'ptms': models.PTM_TABLE_NAMES + (models.ENTITY_TABLE_NAME,),
+    'complexes': models.COMPLEX_TABLE_NAMES + (
+        models.ENTITY_TABLE_NAME,
+        models.REFERENCE_TABLE_NAME,
+        models.RESOURCE_TABLE_NAME,
+    ),
+    'annotations': models.ANNOTATION_TABLE_NAMES + (
+        models.ENTITY_TABLE_NAME,
+        models.COMPLEX_TABLE_NAME,
+        models.RESOURCE_TABLE_NAME,
+    ),
+}
+# tables of the records loaded only from one dataset, deleted before
+# loading it again
+DATASET_OWN_TABLES = {
+    'ptms': models.PTM_TABLE_NAMES,
+    'complexes': models.COMPLEX_TABLE_NAMES,
+    'annotations': models.ANNOTATION_TABLE_NAMES,
+}
+# datasets referring to the records of other datasets, loaded again
+# along with those
+DEPENDENT_DATASETS = {
+    'complexes': ('annotations',),
+}
+# columns of semicolon separated lists, split into lists of Python
+# objects for loading by the ORM
+ROW_SPLITTERS = {
+    'sources': parser.explode,
+    'references': parser.explode_pubmed_ids,
+}
+
+
+class Manager(bio2bel.AbstractManager, BELManagerMixin):
     """
     Manages the Bio2BEL OmniPath database.
     """
-
+    
     module_name = MODULE_NAME
     _base = models.Base
+    edge_model = [models.Interaction, models.Ptm]
+    _fast_load = False
+    _pipelined = True
+    _progress = True
+    _fingerprints = None
+    pipeline_queue_size = PIPELINE_QUEUE_SIZE
+    query_chunk_size = QUERY_CHUNK_SIZE
+    query_cache_size = QUERY_CACHE_SIZE
     
     
     def is_populated(self):
@@ -45,39 +122,278 @@ class Manager(bio2bel.AbstractManager):
         Checks if the Bio2BEL OmniPath database is populated.
         """
         
-        return self.count_interactions() > 0 and self.count_ptms() > 0
+        summary = stats.summary(self.session.connection())
+        
+        return summary['interactions'] > 0 and summary['ptms'] > 0
     
     
-    def summarize(self):
+    def summarize(self, detailed = False):
         """
-        Summarizes the contents of the Bio2BEL OmniPath database.
+        Summarizes the contents of the Bio2BEL OmniPath database, from
+        the statistics computed after populating, by one query, see
+        :py:mod:`stats`.
+        
+        :param bool detailed:
+            Include the numbers of records by table, type, taxon and
+            resource, and the degree distributions, as dicts by category.
+            The missing statistics are computed first.
         """
         
-        return dict(
-            interactions = self.count_interactions(),
-            ptms = self.count_ptms(),
-            proteins = self.count_proteins(),
-        )
+        connection = self.session.connection()
+        
+        if not detailed:
+            
+            return stats.summary(connection)
+        
+        summary = stats.detailed_summary(connection)
+        self.session.commit()
+        
+        return summary
     
     
-    def populate(self):
+    def populate(
+            self,
+            bulk = True,
+            chunksize = None,
+            max_workers = None,
+            force = False,
+            rebuild_indexes = False,
+            fast_load = False,
+            pipelined = True,
+            progress = True,
+            revalidate = False,
+            datasets = None,
+        ):
         """
         Populates the Bio2BEL OmniPath database.
+        
+        The input data of each dataset is identified by a fingerprint:
+        the hash of the input file, the parser options and the version
+        of this module, recorded in :py:class:`models.Fingerprint`.
+        Datasets with fingerprints matching the recorded ones are not
+        loaded again. If only the PTMs, complexes or annotations
+        changed, in bulk mode only those are deleted and loaded again,
+        the interactions are kept; the annotations are also loaded again
+        along with the complexes. Entities referred only by the old
+        records are not deleted, use :py:meth:`update` to apply exactly
+        the differences.
+        
+        In bulk mode the number of input rows loaded is recorded in the
+        transaction of each chunk as a :py:class:`models.Checkpoint`. If
+        loading is interrupted, e.g. by a lost database connection, the
+        next call resumes the datasets with checkpoints for the same
+        input data after the rows committed, instead of loading them
+        again from the beginning. With ``fast_load`` all datasets are
+        loaded in one transaction, an interrupted load is rolled back
+        entirely along with its checkpoints, hence it can not be
+        resumed: the next call loads the same datasets from the
+        beginning.
+        
+        The time, rows and memory use of each stage of loading are
+        recorded by a new :py:class:`profiling.Profiler` at
+        ``profiler``, logged at the end, and available as a list of
+        dicts by ``profiler.report()``.
+        
+        :param bool bulk:
+            Assign the primary keys in Python and write the tables by
+            SQLAlchemy Core ``executemany`` instead of building ORM objects.
+        :param int chunksize:
+            Read and load the input data in chunks of this many rows.
+            In bulk mode each chunk is written and committed separately,
+            hence the memory use does not depend on the size of the
+            input. By default all data is loaded at once.
+        :param int max_workers:
+            Number of threads to download and parse the datasets
+            concurrently, by default one for each dataset.
+        :param bool force:
+            Load all datasets even if their fingerprints match, from the
+            beginning.
+        :param bool rebuild_indexes:
+            In bulk mode, drop the secondary indexes of the tables before
+            loading and create them again afterwards.
+        :param bool fast_load:
+            Load all datasets in one transaction with settings of the
+            database for speed instead of durability, see
+            :py:meth:`load_session`. An interrupted fast load can not be
+            resumed.
+        :param bool pipelined:
+            In bulk mode, read, build and write the chunks in concurrent
+            threads, see :py:meth:`_load_bulk`. Effective if the data is
+            loaded by chunks.
+        :param bool progress:
+            Show the progress of loading each dataset on a terminal.
+        :param bool revalidate:
+            Check if the downloaded input files are up to date by
+            conditional requests, and download again the ones changed on
+            the server. Otherwise cached files are used without checking.
+        :param list datasets:
+            Download and load only these of :py:data:`DATASETS`, along
+            with the ones depending on them, see
+            :py:meth:`_select_datasets`. By default all datasets.
         """
         
-        self.populate_interactions()
-        self.populate_ptms()
+        selected = self._select_datasets(datasets, bulk = bulk)
+        self.profiler = Profiler()
+        self.clear_query_cache()
+        
+        with self.profiler.stage('indexes'):
+            
+            self.revise_indexes()
+        
+        with self.profiler.stage('download'):
+            
+            paths = parser.fetch_all(
+                selected,
+                max_workers = max_workers,
+                parse = False,
+                revalidate = revalidate,
+            )
+        
+        with self.profiler.stage('fingerprint'):
+            
+            fingerprints = self.fingerprints(paths)
+        
+        datasets = self._stale_datasets(
+            fingerprints,
+            bulk = bulk,
+            force = force,
+        )
+        
+        if not datasets:
+            
+            log.info('Database is up to date with the input data.')
+            self._refresh_statistics()
+            self.profiler.log()
+            return
+        
+        log.info('Loading datasets: %s.', ', '.join(datasets))
+        
+        if chunksize is None:
+            
+            with self.profiler.stage('parse'):
+                
+                data = parser.fetch_all(datasets, max_workers = max_workers)
+                self.profiler.add_rows(
+                    'parse',
+                    sum(len(df) for df in data.values()),
+                )
+                
+        else:
+            
+            # in chunked mode the files are parsed at loading
+            data = paths
+        
+        resumed = (
+            self._resumable_datasets(datasets, fingerprints)
+                if bulk and not force else
+            {}
+        )
+        
+        for dataset, rows in resumed.items():
+            
+            log.info('Resuming `%s` after %u rows.', dataset, rows)
+        
+        self._pipelined = pipelined
+        self._progress = progress
+        self._fingerprints = fingerprints if bulk else None
+        
+        try:
+            
+            with self.load_session(fast = fast_load):
+                
+                with self.profiler.stage('clear'):
+                    
+                    self._clear([d for d in datasets if d not in resumed])
+                
+                for dataset in datasets:
+                    
+                    getattr(self, 'populate_%s' % dataset)(
+                        bulk = bulk,
+                        chunksize = chunksize,
+                        rebuild_indexes = rebuild_indexes,
+                        offset = resumed.get(dataset, 0),
+                        **{dataset: data[dataset]}
+                    )
+                    
+                    with self.profiler.stage('%s.commit' % dataset):
+                        
+                        self._store_fingerprint(
+                            dataset,
+                            fingerprints[dataset],
+                        )
+                        self._delete_checkpoint(dataset)
+                        self.session.commit()
+                        
+        finally:
+            
+            # back to the defaults of the class
+            del self._pipelined
+            del self._progress
+            del self._fingerprints
+        
+        self._refresh_statistics()
+        self.profiler.log()
     
     
-    def populate_interactions(self):
+    def populate_interactions(
+            self,
+            bulk = True,
+            chunksize = None,
+            interactions = None,
+            rebuild_indexes = False,
+            offset = 0,
+        ):
+        """
+        Populates the interactions and their references and resources.
+        
+        :param bool bulk:
+            Use the bulk loader instead of the ORM.
+        :param int chunksize:
+            Load the input data in chunks of this many rows.
+        :param interactions:
+            A data frame of interactions or path to the input file.
+            By default it is retrieved by :py:func:`parser.get`.
+        :param bool rebuild_indexes:
+            In bulk mode, drop the secondary indexes before loading and
+            create them again afterwards.
+        :param int offset:
+            Skip this many rows of the input, e.g. loaded before an
+            interruption, see :py:meth:`populate`.
+        
+        :return:
+            The report of the profiler, see :py:meth:`populate`.
+        """
         
         log.info('Populating database.')
         
-        interactions = parser.get_interactions()
+        self.clear_query_cache()
+        profiler = self._get_profiler()
+        interactions = profiler.iterate(
+            'interactions.read',
+            self._iter_chunks(
+                'interactions',
+                data = interactions,
+                chunksize = chunksize,
+                offset = offset,
+            ),
+        )
+        
+        if bulk:
+            
+            self._load_bulk(
+                'interactions',
+                interactions,
+                reset = True,
+                rebuild_indexes = rebuild_indexes,
+                offset = offset,
+            )
+            return profiler.report()
         
         
         log.info('Building models.')
         
+        self._init_load(reset = True)
+        
         int_type_to_entity_type = {
             'PPI': ('protein', 'protein'),
             'TF': ('protein', 'protein'),
@@ -85,23 +401,11 @@ class Manager(bio2bel.AbstractManager):
             'TFM': ('protein', 'mirna'),
         }
         
-        self.interactions_by_partners = collections.defaultdict(list)
-        self.interactions_d = {}
-        self.interaction_types_d = {}
-        self.entities_d = {}
-        self.entity_types_d = {}
-        self.references_d = {}
-        self.taxons_d = {}
-        self.resources_d = {}
-        self.ptms_d = {}
-        self.mod_types_d = {}
-
-        
         for (
             source, target, source_genesymbol, target_genesymbol,
             is_directed, is_stimulation, is_inhibition,
-            dip_url, resources, references, typ, source_taxid, target_taxid,
-        ) in interactions.itertuples():
+            resources, references, typ, source_taxid, target_taxid,
+        ) in self._iter_rows(interactions, stage = 'interactions.build'):
             
             source_type, target_type = int_type_to_entity_type[typ]
             
@@ -146,66 +450,94 @@ class Manager(bio2bel.AbstractManager):
                 type = interaction_type_i,
             )
             
-            partners = [source, target]
-            
-            if not is_directed:
-                
-                partners.sort()
-            
-            partners.append(typ)
-            
-            self.interactions_by_partners[tuple(partners)].append(
-                interaction_i
-            )
-            
             # creating references and resources
-            for pubmed_id in references.split(';'):
-                
-                reference_i = self.insert(
-                    d = self.references_d,
-                    key = pubmed_id,
-                    model = models.Reference,
-                    pubmed_id = pubmed_id,
-                )
-                
-                interaction.references.append(reference_i)
-            
-            for resource in resources.split(;):
-                
-                resource_i = self.insert(
-                    d = self.resources_d,
-                    key = resource,
-                    model = models.Resource,
-                    resource_name = resource,
-                )
-                
-                interaction.resources.append(resource_i)
+            self.insert_references(
+                record = interaction_i,
+                references = references,
+                resources = resources,
+            )
+        
+        self._finish_load('interactions')
+        
+        return profiler.report()
     
     
-    def populate_ptms(self):
+    def populate_ptms(
+            self,
+            bulk = True,
+            chunksize = None,
+            ptms = None,
+            rebuild_indexes = False,
+            offset = 0,
+        ):
+        """
+        Populates the enzyme-substrate relationships and their references
+        and resources, and links them to the interactions between the same
+        partners.
+        
+        :param bool bulk:
+            Use the bulk loader instead of the ORM.
+        :param int chunksize:
+            Load the input data in chunks of this many rows.
+        :param ptms:
+            A data frame of enzyme-substrate relationships or path to the
+            input file. By default it is retrieved by :py:func:`parser.get`.
+        :param bool rebuild_indexes:
+            In bulk mode, drop the secondary indexes before loading and
+            create them again afterwards.
+        :param int offset:
+            Skip this many rows of the input, e.g. loaded before an
+            interruption, see :py:meth:`populate`.
+        
+        :return:
+            The report of the profiler, see :py:meth:`populate`.
+        """
+        
+        self.clear_query_cache()
+        profiler = self._get_profiler()
+        ptms = profiler.iterate(
+            'ptms.read',
+            self._iter_chunks(
+                'ptms',
+                data = ptms,
+                chunksize = chunksize,
+                offset = offset,
+            ),
+        )
+        
+        if bulk:
+            
+            self._load_bulk(
+                'ptms',
+                ptms,
+                rebuild_indexes = rebuild_indexes,
+                offset = offset,
+            )
+            self.link_ptms()
+            return profiler.report()
         
-        ptms = parser.get_ptms()
+        self._init_load()
         
         for (
             source, target,
             source_genesymbol, target_genesymbol,
             residue_type, residue_offset, modification,
             resources, references, taxid,
-        ) in ptms.itertuples():
+        ) in self._iter_rows(ptms, stage = 'ptms.build'):
             
             # creating the entities
             source_entity_i = self.insert_entity(
                 primary_id = source,
                 secondary_id = source_genesymbol,
-                taxid = source_taxid,
-                entity_type = source_type,
+                taxid = taxid,
+                entity_type = 'protein',
             )
             
             target_entity_i = self.insert_entity(
                 primary_id = target,
                 secondary_id = target_genesymbol,
-                taxid = target_taxid,
-                entity_type = target_type,
+                taxid = taxid,
+                entity_type = 'protein',
             )
             
             mod_type_i = self.insert(
@@ -218,115 +550,1780 @@ class Manager(bio2bel.AbstractManager):
             ptm_key = (source, target, residue_type, residue_offset)
             
             ptm_i = self.insert(
-                d = ptms_d,
+                d = self.ptms_d,
                 key = ptm_key,
                 model = models.Ptm,
-                source_id = source_entity_i,
-                target_id = target_entity_i,
+                source = source_entity_i,
+                target = target_entity_i,
                 sequence_offset = residue_offset,
                 residue_type = residue_type,
                 modification_type = mod_type_i,
             )
             
-            # references to interactions
-            partners_key = (source, target, 'PPI')
+            # creating references and resources
+            self.insert_references(
+                record = ptm_i,
+                references = references,
+                resources = resources,
+            )
+        
+        self._finish_load('ptms')
+        self.link_ptms()
+        
+        return profiler.report()
+    
+    
+    def link_ptms(self):
+        """
+        Links the PTMs to the PPIs between the same partners, in the
+        database, by :py:meth:`bulk.BulkLoader.link_ptms`. The PTMs can
+        be loaded by a different process than the interactions.
+        
+        :return:
+            The number of new links.
+        """
+        
+        with self._get_profiler().stage('ptms.link'):
             
-            for interaction_i in self.interactions_by_partners[partners_key]:
-                
-                ptm.interactions.append(interaction_i)
+            linked = BulkLoader(self.session.connection()).link_ptms()
+            self.session.commit()
+        
+        self._get_profiler().add_rows('ptms.link', linked)
+        
+        return linked
+    
+    
+    def populate_complexes(
+            self,
+            bulk = True,
+            chunksize = None,
+            complexes = None,
+            rebuild_indexes = False,
+            offset = 0,
+        ):
+        """
+        Populates the protein complexes, their components, references
+        and resources. Always loaded by the bulk loader, after an ORM
+        mode load the loader is seeded from the database.
+        
+        :param bool bulk:
+            If False, the keys of the records loaded by the bulk loader
+            before are not reused.
+        :param int chunksize:
+            Load the input data in chunks of this many rows.
+        :param complexes:
+            A data frame of complexes or path to the input file.
+            By default it is retrieved by :py:func:`parser.get`.
+        :param bool rebuild_indexes:
+            Drop the secondary indexes before loading and create them
+            again afterwards.
+        :param int offset:
+            Skip this many rows of the input, e.g. loaded before an
+            interruption, see :py:meth:`populate`.
+        
+        :return:
+            The report of the profiler, see :py:meth:`populate`.
+        """
+        
+        self.clear_query_cache()
+        profiler = self._get_profiler()
+        complexes = profiler.iterate(
+            'complexes.read',
+            self._iter_chunks(
+                'complexes',
+                data = complexes,
+                chunksize = chunksize,
+                offset = offset,
+            ),
+        )
+        
+        self._load_bulk(
+            'complexes',
+            complexes,
+            reset = not bulk,
+            rebuild_indexes = rebuild_indexes,
+            offset = offset,
+        )
+        
+        return profiler.report()
+    
+    
+    def populate_annotations(
+            self,
+            bulk = True,
+            chunksize = None,
+            annotations = None,
+            rebuild_indexes = False,
+            offset = 0,
+        ):
+        """
+        Populates the annotations of the entities and complexes, as
+        key-value records referring to the distinct labels and values.
+        The annotations already in the database are replaced, unless
+        resuming from an ``offset``. Always
+        loaded by the bulk loader, arguments are the same as for
+        :py:meth:`populate_complexes`; ``rebuild_indexes`` is recommended
+        for loading all annotations, millions of records.
+        
+        :return:
+            The report of the profiler, see :py:meth:`populate`.
+        """
+        
+        self.clear_query_cache()
+        profiler = self._get_profiler()
+        annotations = profiler.iterate(
+            'annotations.read',
+            self._iter_chunks(
+                'annotations',
+                data = annotations,
+                chunksize = chunksize,
+                offset = offset,
+            ),
+        )
+        
+        if not offset:
             
-            # creating references and resources
-            for pubmed_id in references.split(';'):
+            with profiler.stage('annotations.clear'):
                 
-                reference_i = self.insert(
-                    d = self.references_d,
-                    key = pubmed_id,
-                    model = models.Reference,
-                    pubmed_id = pubmed_id,
+                connection = self.session.connection()
+                connection.execute(models.Annotation.__table__.delete())
+                stats.invalidate(
+                    connection,
+                    [models.Annotation.__tablename__],
                 )
+                self.session.commit()
+        
+        self._load_bulk(
+            'annotations',
+            annotations,
+            reset = not bulk,
+            rebuild_indexes = rebuild_indexes,
+            offset = offset,
+        )
+        
+        return profiler.report()
+    
+    
+    def update(
+            self,
+            chunksize = None,
+            max_workers = None,
+            revalidate = True,
+            datasets = None,
+        ):
+        """
+        Updates an already populated database to the current OmniPath
+        data, by applying only the differences: records missing from the
+        database are inserted, records not in the data any more deleted,
+        and records with changed values updated. Records are identified
+        by their natural keys, e.g. interactions by their partners,
+        direction, effect and type. The annotations have no natural
+        keys, all of them are replaced, while their labels and values
+        are updated as the other records. All changes are written in one
+        transaction, readers see the database either before or after
+        the update.
+        
+        :param int chunksize:
+            Process the input data in chunks of this many rows.
+        :param int max_workers:
+            Number of threads for retrieving the datasets.
+        :param bool revalidate:
+            Check if the downloaded input files are up to date by
+            conditional requests, and download again the ones changed on
+            the server. If False, cached files are used without checking,
+            hence a new OmniPath release is not noticed.
+        :param list datasets:
+            Update only these of :py:data:`DATASETS`, along with the ones
+            depending on them, see :py:meth:`_select_datasets`. Without
+            the interactions, records are updated and deleted only in
+            the tables of the selected datasets in
+            :py:data:`DATASET_OWN_TABLES`, records shared with other
+            datasets, e.g. entities, are only inserted. By default all
+            datasets.
+        
+        :return:
+            Dict with the number of inserted, updated and deleted
+            records by table name.
+        """
+        
+        selected = self._select_datasets(datasets)
+        # tables with records to update and delete, None for all tables
+        revised = None if 'interactions' in selected else set(
+            name
+            for dataset in selected
+            for name in DATASET_OWN_TABLES[dataset]
+        )
+        
+        self.revise_indexes()
+        
+        paths = parser.fetch_all(
+            selected,
+            max_workers = max_workers,
+            parse = False,
+            revalidate = revalidate,
+        )
+        fingerprints = self.fingerprints(paths)
+        data = (
+            paths
+                if chunksize is not None else
+            parser.fetch_all(selected, max_workers = max_workers)
+        )
+        
+        loader = BulkLoader(self.session.connection())
+        builder = TableBuilder(first_ids = loader.first_ids(), track = True)
+        builder.seed(loader.connection)
+        changes = collections.defaultdict(
+            lambda: {'inserted': 0, 'updated': 0, 'deleted': 0}
+        )
+        annotation = models.Annotation.__table__
+        
+        if 'annotations' in selected:
+            
+            changes[annotation.name]['deleted'] = loader.connection.execute(
+                annotation.delete()
+            ).rowcount
+            stats.invalidate(loader.connection, [annotation.name])
+        
+        for query_type in selected:
+            
+            chunks = self._iter_chunks(
+                query_type,
+                data = data[query_type],
+                chunksize = chunksize,
+            )
+            
+            for chunk in chunks:
+                
+                tables = getattr(builder, query_type)(chunk)
+                loader.write(tables)
+                
+                for name, records in tables.items():
+                    
+                    changes[name]['inserted'] += len(records)
+        
+        sorted_tables = models.Base.metadata.sorted_tables
+        
+        for table in sorted_tables:
+            
+            changed = (
+                builder.changed(table)
+                    if revised is None or table.name in revised else
+                None
+            )
+            
+            if changed is not None and len(changed):
                 
-                ptm.references.append(reference_i)
+                log.info(
+                    'Updating %u records in `%s`.',
+                    len(changed),
+                    table.name,
+                )
+                loader.update_records(table, changed)
+                changes[table.name]['updated'] = len(changed)
+        
+        # links of the removed interactions and PTMs
+        for model, column in (
+            (models.Interaction, 'interaction_id'),
+            (models.Ptm, 'ptm_id'),
+        ):
+            
+            removed = (
+                builder.removed(model.__table__)
+                    if revised is None or model.__tablename__ in revised else
+                None
+            )
             
-            for resource in resources.split(;):
+            if removed is not None and len(removed):
                 
-                resource_i = self.insert(
-                    d = self.resources_d,
-                    key = resource,
-                    model = models.Resource,
-                    resource_name = resource,
+                changes[models.assoc_int_ptm.name]['deleted'] += (
+                    loader.delete_in(
+                        models.assoc_int_ptm,
+                        column,
+                        removed['id'],
+                    )
                 )
+        
+        # dependent records first
+        for table in reversed(sorted_tables):
+            
+            removed = (
+                builder.removed(table)
+                    if revised is None or table.name in revised else
+                None
+            )
+            
+            if removed is not None and len(removed):
                 
-                ptm.resources.append(resource_i)
+                log.info(
+                    'Deleting %u records from `%s`.',
+                    len(removed),
+                    table.name,
+                )
+                loader.delete_records(table, removed)
+                changes[table.name]['deleted'] = len(removed)
+        
+        changes[models.assoc_int_ptm.name]['inserted'] += loader.link_ptms()
+        
+        for dataset, fingerprint in fingerprints.items():
+            
+            self._store_fingerprint(dataset, fingerprint)
+        
+        # only the statistics of the changed tables are missing
+        stats.refresh(loader.connection)
+        self.session.commit()
+        self.clear_query_cache()
+        
+        return dict(changes)
     
     
-    def insert_entity(self, primary_id, secondary_id, taxid, entity_type):
+    def _load_bulk(
+            self,
+            query_type,
+            chunks,
+            reset = False,
+            rebuild_indexes = False,
+            offset = 0,
+        ):
+        """
+        Builds integer keyed records from data frames by
+        :py:class:`tables.TableBuilder` and writes them by
+        :py:class:`bulk.BulkLoader`, committing after each data frame.
+        The keys of the records are kept between chunks and between the
+        loads of interactions and PTMs, unless ``reset``. A new builder
+        is seeded with the records already in the database.
         
-        entity_type_i = self.insert(
-            d = self.entity_types_d,
-            key = entity_type,
-            model = models.EntityType,
-            entity_type = entity_type,
-        )
+        By default the stages run in a :py:func:`pipeline.pipeline`:
+        the data frames are read in one thread and the records built in
+        another one, while the records of the previous data frame are
+        written and committed, with at most ``pipeline_queue_size``
+        data frames waiting between the stages. Errors of any stage are
+        raised here, after the transaction is rolled back and the builder
+        discarded, as its keys include records not committed.
         
-        taxon_i = self.insert(
-            d = self.taxons_d,
-            key = taxid,
-            model = models.Taxonomy,
-            ncbi_taxonomy_id = taxid,
+        During :py:meth:`populate` the number of input rows loaded is
+        recorded as a :py:class:`models.Checkpoint` in the transaction
+        of each data frame, hence it always matches the records
+        committed.
+        
+        :param str query_type:
+            One of :py:data:`DATASETS`.
+        :param chunks:
+            Iterable of data frames.
+        :param bool rebuild_indexes:
+            Drop the secondary indexes of the tables written before
+            loading and create them again after all chunks are written,
+            also if loading fails.
+        :param int offset:
+            Number of input rows loaded before ``chunks``.
+        """
+        
+        profiler = self._get_profiler()
+        
+        if reset or getattr(self, '_table_builder', None) is None:
+            
+            with profiler.stage('%s.seed' % query_type):
+                
+                loader = BulkLoader(self.session.connection())
+                self._table_builder = TableBuilder(
+                    first_ids = loader.first_ids()
+                )
+                self._table_builder.seed(loader.connection)
+        
+        build = getattr(self._table_builder, query_type)
+        indexes = (
+            BulkLoader.secondary_indexes(DATASET_TABLES[query_type])
+                if rebuild_indexes else
+            []
         )
         
-        entity_i = self.insert(
-            d = self.entities_d,
-            key = entity,
-            model = models.MolecularEntity,
-            primary_id = primary_id,
-            secondary_id = secondary_id,
-            taxon = taxon_i,
-            type = entity_type_i,
+        if indexes:
+            
+            with profiler.stage('%s.index' % query_type):
+                
+                BulkLoader(self.session.connection()).drop_indexes(indexes)
+                self.session.commit()
+        
+        fingerprint = (self._fingerprints or {}).get(query_type)
+        rows = offset
+        
+        def build_tables(chunk):
+            
+            with profiler.stage('%s.build' % query_type, rows = len(chunk)):
+                
+                return len(chunk), build(chunk)
+        
+        stages = (
+            pipeline(
+                chunks,
+                build_tables,
+                maxsize = self.pipeline_queue_size,
+                name = query_type,
+            )
+                if self._pipelined else
+            contextlib.nullcontext(map(build_tables, chunks))
         )
         
-        return entity_i
+        try:
+            
+            with stages as batches, tqdm(
+                desc = query_type,
+                unit = ' rows',
+                disable = None if self._progress else True,
+            ) as progress:
+                
+                for n_rows, tables in batches:
+                    
+                    log.info('Writing records to the database.')
+                    
+                    with profiler.stage(
+                        '%s.write' % query_type,
+                        rows = sum(len(records) for records in tables.values()),
+                    ):
+                        
+                        # the session releases its connection at each commit
+                        BulkLoader(
+                            self.session.connection(),
+                            copy = self._fast_load,
+                        ).write(tables)
+                    
+                    with profiler.stage('%s.commit' % query_type):
+                        
+                        rows += n_rows
+                        
+                        if fingerprint is not None:
+                            
+                            self._store_checkpoint(
+                                query_type,
+                                fingerprint,
+                                rows,
+                            )
+                        
+                        self.session.commit()
+                    
+                    progress.update(n_rows)
+                    
+        except Exception:
+            
+            self.session.rollback()
+            # the builder has assigned keys to records never committed
+            self._table_builder = None
+            raise
+            
+        finally:
+            
+            if indexes:
+                
+                with profiler.stage('%s.index' % query_type):
+                    
+                    loader = BulkLoader(self.session.connection())
+                    loader.create_indexes(indexes)
+                    self.session.commit()
     
     
-    @staticmethod
-    def insert(d, key, model, append = False, **kwargs):
+    @contextlib.contextmanager
+    def load_session(self, fast = True):
         """
-        Inserts a record into a table and returns the instance.
-        It also inserts the instance into the dict ``d`` with key ``key``.
-        If the record already exists does nothing but returns the instance.
-        Field names and values should be provided as ``**kwargs``.
-        The ``model`` is the ``sqlalchemy`` table model to use.
+        Context manager for loading the database. If ``fast``, the
+        ``session`` is replaced within the context by one running on a
+        single connection in one transaction, with the settings of
+        :py:func:`bulk.fast_load`: the commits within the context do not
+        end the transaction, all changes are committed at exit or none
+        of them at errors. Otherwise the session is used as it is.
         """
         
-        if key not in d:
+        if not fast:
             
-            d[key] = model(**kwargs)
+            yield self.session
+            return
         
-        return d[key]
+        session = self.session
+        # releases the connection of the session
+        session.commit()
+        connection = self.engine.connect()
+        
+        try:
+            
+            with fast_load(connection):
+                
+                self.session = sqlalchemy.orm.Session(bind = connection)
+                self._fast_load = True
+                
+                try:
+                    
+                    yield self.session
+                    self.session.commit()
+                    
+                finally:
+                    
+                    self.session.close()
+                    
+        finally:
+            
+            self.session = session
+            self._fast_load = False
+            connection.close()
     
     
-    def count_interactions(self):
+    def revise_indexes(self):
         """
-        Counts the number of interactions in the database.
+        Brings the indexes of a database created by an earlier version
+        to the current schema, see :py:meth:`bulk.BulkLoader.revise_indexes`.
         """
         
-        return self._count_model(Interaction)
+        revised = BulkLoader(self.session.connection()).revise_indexes()
+        self.session.commit()
+        
+        return revised
     
     
-    def count_ptms(self):
+    def _get_profiler(self):
         """
-        Counts the number of enzyme-substrate relationships in the database.
+        Returns the profiler of the current populate, or a new one if
+        a populate step is called on its own.
         """
         
-        return self._count_model(Ptm)
+        if getattr(self, 'profiler', None) is None:
+            
+            self.profiler = Profiler()
+        
+        return self.profiler
     
     
-    def count_proteins(self):
+    def fingerprints(self, paths):
         """
-        Counts the number of proteins in the database.
+        Creates the fingerprints of input files.
+        
+        :param dict paths:
+            Paths to the input files by dataset.
+        
+        :return:
+            Dict of dicts with the content hash, the parser options as
+            JSON and the module version, by dataset.
+        """
+        
+        return dict(
+            (
+                dataset,
+                {
+                    'content_hash': parser.content_hash(path),
+                    'options': json.dumps(
+                        parser.options(dataset),
+                        sort_keys = True,
+                    ),
+                    'version': get_version(),
+                },
+            )
+            for dataset, path in paths.items()
+        )
+    
+    
+    def get_fingerprints(self):
+        """
+        Returns the fingerprints of the datasets loaded into the
+        database, in the same format as :py:meth:`fingerprints`.
+        """
+        
+        return dict(
+            (
+                fingerprint.dataset,
+                {
+                    'content_hash': fingerprint.content_hash,
+                    'options': fingerprint.options,
+                    'version': fingerprint.version,
+                },
+            )
+            for fingerprint in self._list_model(models.Fingerprint)
+        )
+    
+    
+    def _store_fingerprint(self, dataset, fingerprint):
+        """
+        Records the fingerprint of a loaded dataset, replacing the
+        previous one. The session is not committed.
         """
         
-        return self._count_model(Protein)
+        self._get_query(models.Fingerprint).filter_by(
+            dataset = dataset,
+        ).delete()
+        self.session.add(
+            models.Fingerprint(
+                dataset = dataset,
+                loaded_at = datetime.datetime.now(),
+                **fingerprint
+            )
+        )
     
     
+    def get_checkpoints(self):
+        """
+        Returns the checkpoints of the datasets partially loaded by an
+        interrupted :py:meth:`populate`.
+        
+        :return:
+            Dict of dicts with the fingerprint of the input data, in the
+            same format as :py:meth:`fingerprints`, the number of input
+            rows loaded and the time of the last commit, by dataset.
+        """
+        
+        return dict(
+            (
+                checkpoint.dataset,
+                {
+                    'fingerprint': {
+                        'content_hash': checkpoint.content_hash,
+                        'options': checkpoint.options,
+                        'version': checkpoint.version,
+                    },
+                    'rows': checkpoint.rows,
+                    'updated_at': checkpoint.updated_at,
+                },
+            )
+            for checkpoint in self._list_model(models.Checkpoint)
+        )
+    
+    
+    def _store_checkpoint(self, dataset, fingerprint, rows):
+        """
+        Records that ``rows`` input rows of a dataset have been loaded,
+        replacing the previous checkpoint. The session is not committed.
+        """
+        
+        self._delete_checkpoint(dataset)
+        self.session.add(
+            models.Checkpoint(
+                dataset = dataset,
+                rows = rows,
+                updated_at = datetime.datetime.now(),
+                **fingerprint
+            )
+        )
+    
+    
+    def _delete_checkpoint(self, dataset):
+        """
+        Deletes the checkpoint of a dataset. The session is not
+        committed.
+        """
+        
+        self._get_query(models.Checkpoint).filter_by(
+            dataset = dataset,
+        ).delete()
+    
+    
+    def _resumable_datasets(self, datasets, fingerprints):
+        """
+        Returns the numbers of input rows already loaded, by dataset,
+        for the datasets of an interrupted load which can be resumed:
+        their checkpoint is for the same input data, and loading the
+        others does not delete their records.
+        """
+        
+        checkpoints = self.get_checkpoints()
+        resumable = dict(
+            (dataset, checkpoints[dataset]['rows'])
+            for dataset in datasets
+            if (
+                dataset in checkpoints and
+                checkpoints[dataset]['fingerprint'] == fingerprints[dataset]
+            )
+        )
+        
+        # clearing the interactions deletes all records
+        if 'interactions' in datasets and 'interactions' not in resumable:
+            
+            return {}
+        
+        return resumable
+    
+    
+    @staticmethod
+    def _select_datasets(datasets = None, bulk = True):
+        """
+        Returns the datasets to be loaded of the ones chosen, in the
+        order of loading: the chosen ones and those depending on them
+        in :py:data:`DEPENDENT_DATASETS`, and all if the interactions
+        are chosen, as the others refer to them. In ORM mode all
+        datasets are loaded, as the PTMs can be loaded only after the
+        interactions.
+        
+        :param list datasets:
+            Names of datasets in :py:data:`DATASETS`, None for all.
+        """
+        
+        datasets = set(DATASETS if datasets is None else datasets)
+        unknown = datasets - set(DATASETS)
+        
+        if unknown:
+            
+            raise ValueError(
+                'Unknown datasets: %s. Available: %s.' % (
+                    ', '.join(sorted(unknown)),
+                    ', '.join(DATASETS),
+                )
+            )
+        
+        datasets.update(
+            dependent
+            for dataset in list(datasets)
+            for dependent in DEPENDENT_DATASETS.get(dataset, ())
+        )
+        
+        if 'interactions' in datasets or not bulk:
+            
+            datasets = set(DATASETS)
+        
+        return [dataset for dataset in DATASETS if dataset in datasets]
+    
+    
+    def _stale_datasets(self, fingerprints, bulk = True, force = False):
+        """
+        Returns the datasets to be loaded of the ones in
+        ``fingerprints``: those with changed fingerprints and the ones
+        depending on them, and all if the interactions changed, as the
+        others refer to them. In ORM mode the PTMs can be loaded only
+        after the interactions.
+        
+        Staleness is decided only by the stored fingerprints, not by the
+        records in the database: a dataset interrupted before its first
+        chunk was committed has neither fingerprint nor records, while
+        the fully loaded datasets before it keep theirs.
+        """
+        
+        loaded = self.get_fingerprints()
+        datasets = [dataset for dataset in DATASETS if dataset in fingerprints]
+        stale = set(
+            dataset
+            for dataset in datasets
+            if force or loaded.get(dataset) != fingerprints[dataset]
+        )
+        stale.update(
+            dependent
+            for dataset in list(stale)
+            for dependent in DEPENDENT_DATASETS.get(dataset, ())
+        )
+        stale = [dataset for dataset in datasets if dataset in stale]
+        
+        if stale and ('interactions' in stale or not bulk):
+            
+            stale = datasets
+        
+        return stale
+    
+    
+    def _clear(self, datasets):
+        """
+        Deletes the records loaded from ``datasets``, all records if
+        the interactions are among them, and their fingerprints and
+        checkpoints.
+        """
+        
+        connection = self.session.connection()
+        names = None if 'interactions' in datasets else set(
+            name
+            for dataset in datasets
+            for name in DATASET_OWN_TABLES[dataset]
+        )
+        
+        # dependent records first
+        for table in reversed(models.Base.metadata.sorted_tables):
+            
+            if table.name in (
+                models.Fingerprint.__tablename__,
+                models.Checkpoint.__tablename__,
+            ):
+                
+                connection.execute(
+                    table.delete().where(table.c.dataset.in_(datasets))
+                )
+                
+            elif names is None or table.name in names:
+                
+                connection.execute(table.delete())
+        
+        stats.invalidate(connection, names)
+        self.session.commit()
+        # the keys of deleted records must not be reused
+        self._table_builder = None
+    
+    
+    def _refresh_statistics(self):
+        """
+        Computes the statistics missing after loading, see
+        :py:mod:`stats`, and commits.
+        """
+        
+        with self._get_profiler().stage('statistics'):
+            
+            stats.refresh(self.session.connection())
+            self.session.commit()
+    
+    
+    @staticmethod
+    def _iter_chunks(query_type, data = None, chunksize = None, offset = 0):
+        """
+        Iterates through data frames of the input data: ``data`` itself
+        if it is a data frame, otherwise the file at ``data`` or the
+        default input read by :py:func:`parser.iter_chunks`, without
+        the first ``offset`` rows.
+        """
+        
+        if isinstance(data, pd.DataFrame):
+            
+            return [data.iloc[offset:]]
+        
+        return parser.iter_chunks(
+            query_type,
+            chunksize = chunksize,
+            offset = offset,
+            url = data,
+        )
+    
+    
+    def _iter_rows(self, chunks, stage):
+        """
+        Iterates through the rows of data frames as tuples of Python
+        objects, also from categorical and nullable integer columns.
+        The semicolon separated lists of resources and references are
+        split into lists, the PubMed IDs converted to integers.
+        
+        :param str stage:
+            Name of the profiler stage timing the iteration including
+            the processing of the rows by the caller, and counting the
+            rows.
+        """
+        
+        profiler = self._get_profiler()
+        
+        with profiler.stage(stage):
+            
+            for chunk in chunks:
+                
+                profiler.add_rows(stage, len(chunk))
+                
+                for row in zip(*(
+                    parser.group_rows(*ROW_SPLITTERS[c](chunk[c]), len(chunk))
+                        if c in ROW_SPLITTERS else
+                    chunk[c].tolist()
+                    for c in chunk.columns
+                )):
+                    
+                    yield row
+    
+    
+    def _init_load(self, reset = False):
+        """
+        Prepares the dicts of records for loading by the ORM. The dicts
+        are kept between loads so the PTMs can refer to the entities,
+        references and resources of the interactions, unless ``reset``.
+        """
+        
+        for attr in (
+            'interactions_d',
+            'interaction_types_d',
+            'entities_d',
+            'entity_types_d',
+            'references_d',
+            'taxons_d',
+            'resources_d',
+            'ptms_d',
+            'mod_types_d',
+        ):
+            
+            if reset or not hasattr(self, attr):
+                
+                setattr(self, attr, {})
+    
+    
+    def _finish_load(self, query_type):
+        """
+        Adds the records built by the last populate step to the session,
+        flushes and commits.
+        """
+        
+        log.info('Writing records to the database.')
+        
+        profiler = self._get_profiler()
+        
+        with profiler.stage('%s.write' % query_type):
+            
+            for d in (self.interactions_d, self.ptms_d):
+                
+                self.session.add_all(d.values())
+            
+            profiler.add_rows('%s.write' % query_type, len(self.session.new))
+            self.session.flush()
+            stats.invalidate(self.session.connection())
+        
+        with profiler.stage('%s.commit' % query_type):
+            
+            self.session.commit()
+    
+    
+    def insert_entity(self, primary_id, secondary_id, taxid, entity_type):
+        
+        entity_type_i = self.insert(
+            d = self.entity_types_d,
+            key = entity_type,
+            model = models.EntityType,
+            entity_type = entity_type,
+        )
+        
+        taxon_i = self.insert(
+            d = self.taxons_d,
+            key = taxid,
+            model = models.Taxonomy,
+            ncbi_taxonomy_id = taxid,
+        )
+        
+        entity_i = self.insert(
+            d = self.entities_d,
+            key = primary_id,
+            model = models.MolecularEntity,
+            primary_id = primary_id,
+            secondary_id = secondary_id,
+            taxon = taxon_i,
+            type = entity_type_i,
+        )
+        
+        return entity_i
+    
+    
+    def insert_references(self, record, references, resources):
+        """
+        Creates the references and resources from the lists of PubMed IDs
+        and resource names, as split by :py:meth:`_iter_rows`, and links
+        them to ``record``.
+        """
+        
+        for pubmed_id in references:
+            
+            reference_i = self.insert(
+                d = self.references_d,
+                key = pubmed_id,
+                model = models.Reference,
+                pubmed_id = pubmed_id,
+            )
+            
+            self.link(record, 'references', reference_i)
+        
+        for resource in resources:
+            
+            resource_i = self.insert(
+                d = self.resources_d,
+                key = resource,
+                model = models.Resource,
+                resource_name = resource,
+            )
+            
+            self.link(record, 'resources', resource_i)
+    
+    
+    @staticmethod
+    def insert(d, key, model, append = False, **kwargs):
+        """
+        Inserts a record into a table and returns the instance.
+        It also inserts the instance into the dict ``d`` with key ``key``.
+        If the record already exists does nothing but returns the instance.
+        Field names and values should be provided as ``**kwargs``.
+        The ``model`` is the ``sqlalchemy`` table model to use.
+        """
+        
+        if key not in d:
+            
+            d[key] = model(**kwargs)
+        
+        return d[key]
+    
+    
+    @staticmethod
+    def link(parent, attr, child):
+        """
+        Adds ``child`` to the many-to-many relationship ``attr`` of
+        ``parent`` unless it is already there.
+        """
+        
+        children = getattr(parent, attr)
+        
+        if child not in children:
+            
+            children.append(child)
+    
+    
+    def count_interactions(self):
+        """
+        Counts the number of interactions in the database.
+        """
+        
+        return self._count_model(models.Interaction)
+    
+    
+    def count_ptms(self):
+        """
+        Counts the number of enzyme-substrate relationships in the database.
+        """
+        
+        return self._count_model(models.Ptm)
+    
+    
+    def count_proteins(self):
+        """
+        Counts the number of proteins in the database.
+        """
+        
+        return self._count_model(models.MolecularEntity)
+    
+    
+    def count_complexes(self):
+        """
+        Counts the number of protein complexes in the database.
+        """
+        
+        return self._count_model(models.Complex)
+    
+    
+    def count_annotations(self):
+        """
+        Counts the number of annotation records in the database.
+        """
+        
+        return self._count_model(models.Annotation)
+    
+    
+    def get_entities(self, primary_ids):
+        """
+        Retrieves molecular entities by their primary IDs.
+        
+        :param primary_ids:
+            UniProtKB IDs or miRBase mature miRNA ACs.
+        
+        :return:
+            Dict of :py:class:`models.MolecularEntity` objects by primary
+            ID, IDs not in the database are missing.
+        """
+        
+        entity = models.MolecularEntity
+        
+        entities = self._lookup(
+            name = 'entities',
+            keys = primary_ids,
+            query = lambda chunk: (
+                self.session.query(entity).
+                filter(entity.primary_id.in_(chunk)).
+                options(
+                    sqlalchemy.orm.selectinload(entity.taxon),
+                    sqlalchemy.orm.selectinload(entity.type),
+                )
+            ),
+            keys_of = lambda record: (record.primary_id,),
+        )
+        
+        return dict(
+            (primary_id, records[0])
+            for primary_id, records in entities.items()
+            if records
+        )
+    
+    
+    def get_interactions_of(self, entity_ids, direction = 'both', types = None):
+        """
+        Retrieves the interactions of molecular entities, with their
+        partners, references and resources loaded.
+        
+        :param entity_ids:
+            Keys of :py:class:`models.MolecularEntity` records.
+        :param str direction:
+            `out` for the interactions with the entities as sources,
+            `in` as targets, `both` for all.
+        :param types:
+            Interaction types, e.g. `PPI`, `TF`, by default all.
+        
+        :return:
+            Dict of lists of :py:class:`models.Interaction` objects by
+            entity key.
+        """
+        
+        if direction not in DIRECTIONS:
+            
+            raise ValueError(
+                'Direction must be one of %s, not `%s`.' % (
+                    ', '.join(DIRECTIONS),
+                    direction,
+                )
+            )
+        
+        interaction = models.Interaction
+        types = tuple(sorted(types)) if types else None
+        sides = (
+            ('source_id', 'target_id')
+                if direction == 'both' else
+            ('source_id',)
+                if direction == 'out' else
+            ('target_id',)
+        )
+        
+        def query(chunk):
+            
+            query = self.session.query(interaction).filter(
+                sqlalchemy.or_(*(
+                    getattr(interaction, side).in_(chunk)
+                    for side in sides
+                ))
+            )
+            
+            if types:
+                
+                query = query.join(interaction.type).filter(
+                    models.InteractionType.interaction_type.in_(types)
+                )
+            
+            return query.options(
+                sqlalchemy.orm.selectinload(interaction.source),
+                sqlalchemy.orm.selectinload(interaction.target),
+                sqlalchemy.orm.selectinload(interaction.type),
+                sqlalchemy.orm.selectinload(interaction.references),
+                sqlalchemy.orm.selectinload(interaction.resources),
+            )
+        
+        return self._lookup(
+            name = ('interactions', direction, types),
+            keys = entity_ids,
+            query = query,
+            # a set as loops are both outgoing and incoming
+            keys_of = lambda record: set(
+                getattr(record, side) for side in sides
+            ),
+        )
+    
+    
+    def get_ptms_on(self, target_ids):
+        """
+        Retrieves the PTMs on substrates, with their enzymes, references
+        and resources loaded.
+        
+        :param target_ids:
+            Keys of the :py:class:`models.MolecularEntity` records of
+            the substrates.
+        
+        :return:
+            Dict of lists of :py:class:`models.Ptm` objects by substrate
+            key.
+        """
+        
+        ptm = models.Ptm
+        
+        return self._lookup(
+            name = 'ptms',
+            keys = target_ids,
+            query = lambda chunk: (
+                self.session.query(ptm).
+                filter(ptm.target_id.in_(chunk)).
+                options(
+                    sqlalchemy.orm.selectinload(ptm.source),
+                    sqlalchemy.orm.selectinload(ptm.modification_type),
+                    sqlalchemy.orm.selectinload(ptm.references),
+                    sqlalchemy.orm.selectinload(ptm.resources),
+                )
+            ),
+            keys_of = lambda record: (record.target_id,),
+        )
+    
+    
+    def get_complexes_of(self, entity_ids):
+        """
+        Retrieves the complexes molecular entities are members of, with
+        their members, references and resources loaded.
+        
+        :param entity_ids:
+            Keys of :py:class:`models.MolecularEntity` records.
+        
+        :return:
+            Dict of lists of :py:class:`models.Complex` objects by
+            entity key.
+        """
+        
+        cpx = models.Complex
+        assoc = models.assoc_cpx_ent
+        
+        return self._lookup(
+            name = 'complexes',
+            keys = entity_ids,
+            query = lambda chunk: (
+                self.session.query(cpx).
+                filter(
+                    cpx.id.in_(
+                        sqlalchemy.select([assoc.c.complex_id]).
+                        where(assoc.c.molecular_entity_id.in_(chunk))
+                    )
+                ).
+                options(
+                    sqlalchemy.orm.selectinload(cpx.members),
+                    sqlalchemy.orm.selectinload(cpx.references),
+                    sqlalchemy.orm.selectinload(cpx.resources),
+                )
+            ),
+            keys_of = lambda record: set(
+                member.id for member in record.members
+            ),
+        )
+    
+    
+    def get_annotations_of(self, entity_ids, resource = None):
+        """
+        Retrieves the annotations of molecular entities, with their
+        resources, labels and values loaded.
+        
+        :param entity_ids:
+            Keys of :py:class:`models.MolecularEntity` records.
+        :param str resource:
+            Name of a resource, e.g. `HPA_tissue`, by default all.
+        
+        :return:
+            Dict of lists of :py:class:`models.Annotation` objects by
+            entity key, in the order of the resources and records.
+        """
+        
+        annotation = models.Annotation
+        
+        def query(chunk):
+            
+            query = self.session.query(annotation).filter(
+                annotation.entity_id.in_(chunk)
+            )
+            
+            if resource is not None:
+                
+                query = query.join(annotation.resource).filter(
+                    models.Resource.resource_name == resource
+                )
+            
+            return query.order_by(
+                annotation.resource_id,
+                annotation.record_id,
+                annotation.id,
+            ).options(
+                sqlalchemy.orm.selectinload(annotation.resource),
+                sqlalchemy.orm.selectinload(annotation.label),
+                sqlalchemy.orm.selectinload(annotation.value),
+            )
+        
+        return self._lookup(
+            name = ('annotations', resource),
+            keys = entity_ids,
+            query = query,
+            keys_of = lambda record: (record.entity_id,),
+        )
+    
+    
+    def get_annotation_facets(self, resource, label):
+        """
+        Counts the molecular entities and complexes by the values of an
+        annotation label in a resource, e.g. the proteins by tissue.
+        
+        :param str resource:
+            Name of the resource, e.g. `HPA_tissue`.
+        :param str label:
+            The label, e.g. `tissue`.
+        
+        :return:
+            Dict of the number of annotated entities and complexes by
+            value, the most frequent values first.
+        """
+        
+        annotation = models.Annotation
+        # the complexes by negative keys, distinct from the entities
+        n_annotated = sqlalchemy.func.count(
+            sqlalchemy.distinct(
+                sqlalchemy.func.coalesce(
+                    annotation.entity_id,
+                    -annotation.complex_id,
+                )
+            )
+        )
+        
+        return collections.OrderedDict(
+            self.session.query(
+                models.AnnotationValue.value,
+                n_annotated,
+            ).
+            select_from(annotation).
+            join(annotation.resource).
+            join(annotation.label).
+            join(annotation.value).
+            filter(
+                models.Resource.resource_name == resource,
+                models.AnnotationLabel.label == label,
+            ).
+            group_by(models.AnnotationValue.value).
+            order_by(n_annotated.desc(), models.AnnotationValue.value)
+        )
+    
+    
+    def get_annotated(self, resource, label, value):
+        """
+        Retrieves the molecular entities and complexes with an
+        annotation value, e.g. the proteins expressed in a tissue.
+        
+        :param str resource:
+            Name of the resource, e.g. `HPA_tissue`.
+        :param str label:
+            The label, e.g. `tissue`.
+        :param str value:
+            The value, e.g. `liver`.
+        
+        :return:
+            Tuple of the sorted lists of the keys of the
+            :py:class:`models.MolecularEntity` and the
+            :py:class:`models.Complex` records.
+        """
+        
+        annotation = models.Annotation
+        rows = (
+            self.session.query(annotation.entity_id, annotation.complex_id).
+            join(annotation.resource).
+            join(annotation.label).
+            join(annotation.value).
+            filter(
+                models.Resource.resource_name == resource,
+                models.AnnotationLabel.label == label,
+                models.AnnotationValue.value == value,
+            ).
+            distinct()
+        )
+        entity_ids = set()
+        complex_ids = set()
+        
+        for entity_id, complex_id in rows:
+            
+            if entity_id is not None:
+                
+                entity_ids.add(entity_id)
+                
+            else:
+                
+                complex_ids.add(complex_id)
+        
+        return sorted(entity_ids), sorted(complex_ids)
+    
+    
+    def build_graph_index(self, directory = None, save = True):
+        """
+        Builds the adjacency of the entities by the interactions in the
+        database as NumPy arrays, for neighborhood, shortest path and
+        subgraph queries without SQL, see :py:class:`graph.GraphIndex`.
+        
+        :param str directory:
+            Save the index into this directory, by default
+            :py:data:`constants.GRAPH_INDEX_DIR` in the data directory.
+        :param bool save:
+            Save the index, which can be loaded by
+            :py:meth:`get_graph_index` as long as the database does not
+            change.
+        
+        :return:
+            A :py:class:`graph.GraphIndex` object.
+        """
+        
+        index = GraphIndex.from_database(self.session.connection())
+        
+        if save:
+            
+            index.save(
+                directory or constants.GRAPH_INDEX_DIR,
+                meta = self._graph_index_meta(),
+            )
+        
+        return index
+    
+    
+    def get_graph_index(self, directory = None, mmap = True):
+        """
+        Returns the graph index of the database: the one loaded before,
+        or the one saved in ``directory``, or a new one if the database
+        changed since those were built.
+        
+        :param str directory:
+            Directory of the saved index, by default
+            :py:data:`constants.GRAPH_INDEX_DIR`.
+        :param bool mmap:
+            Memory map the arrays of the saved index instead of reading
+            them into the memory.
+        
+        :return:
+            A :py:class:`graph.GraphIndex` object.
+        """
+        
+        meta = self._graph_index_meta()
+        directory = directory or constants.GRAPH_INDEX_DIR
+        
+        if getattr(self, '_graph_index', (None, None))[1] != meta:
+            
+            index, saved_meta = GraphIndex.load(directory, mmap = mmap)
+            
+            if saved_meta != meta:
+                
+                log.info('Graph index is missing or obsolete, building it.')
+                self.build_graph_index(directory = directory)
+                index, _ = GraphIndex.load(directory, mmap = mmap)
+            
+            self._graph_index = (index, meta)
+        
+        return self._graph_index[0]
+    
+    
+    def _graph_index_meta(self):
+        """
+        Returns the data identifying the contents of the database for the
+        graph index: the fingerprints of the datasets, the number of
+        interactions and the largest interaction key.
+        """
+        
+        return {
+            'fingerprints': self.get_fingerprints(),
+            'interactions': self.count_interactions(),
+            'last_interaction': self.session.query(
+                sqlalchemy.func.max(models.Interaction.id)
+            ).scalar(),
+        }
+    
+    
+    def to_bel(
+            self,
+            path = None,
+            fmt = 'nodelink',
+            batch_size = BEL_BATCH_SIZE,
+            partition_by = None,
+            workers = None,
+        ):
+        """
+        Converts the interactions and PTMs to BEL, see
+        :py:class:`bel.BelExporter`. The rows are streamed from the
+        database and converted by batches, or by partitions in parallel
+        processes.
+        
+        :param str path:
+            Write the edges batch by batch into this file instead of
+            building a graph, hence the whole graph is never in the
+            memory.
+        :param str fmt:
+            Format of the file: ``nodelink`` for PyBEL node-link JSON, or
+            ``bel`` for BEL script.
+        :param int batch_size:
+            Number of interactions or PTMs converted in one batch.
+        :param str partition_by:
+            Convert the records by partitions in a pool of processes:
+            ``resource`` or ``taxon``. The graphs of the partitions are
+            merged, or written into the file one after the other. The
+            database can not be an in memory SQLite database.
+        :param int workers:
+            Number of processes converting the partitions, by default
+            the number of CPUs.
+        
+        :return:
+            A :py:class:`pybel.BELGraph`, or the number of edges written
+            if ``path`` is given.
+        """
+        
+        exporter = BelExporter(self.session, batch_size = batch_size)
+        batches = (
+            exporter.partitioned_batches(partition_by, workers = workers)
+                if partition_by else
+            None
+        )
+        
+        if path is None:
+            
+            return exporter.to_graph(batches = batches)
+        
+        with open(path, 'w') as fp:
+            
+            return exporter.write(fp, fmt = fmt, batches = batches)
+    
+    
+    def clear_query_cache(self):
+        """
+        Removes all results from the cache of the query API, as after
+        loading they might be obsolete.
+        """
+        
+        if getattr(self, '_query_cache', None) is not None:
+            
+            self._query_cache.clear()
+    
+    
+    def _get_query_cache(self):
+        """
+        Returns the cache of the query API, creating it at first use.
+        """
+        
+        if getattr(self, '_query_cache', None) is None:
+            
+            self._query_cache = LruCache(self.query_cache_size)
+        
+        return self._query_cache
+    
+    
+    def _lookup(self, name, keys, query, keys_of):
+        """
+        Retrieves records for many keys: the results cached for each
+        key, and the rest from the database by queries of at most
+        ``query_chunk_size`` keys, also caching the keys without
+        records.
+        
+        :param name:
+            Name of the lookup, part of the cache keys.
+        :param keys:
+            Keys to look up, e.g. primary IDs or entity keys.
+        :param query:
+            Function returning a query of the records of a list of keys.
+        :param keys_of:
+            Function returning the keys a record belongs to.
+        
+        :return:
+            Dict of lists of records by key.
+        """
+        
+        cache = self._get_query_cache()
+        keys = list(dict.fromkeys(keys))
+        result = {}
+        missing = []
+        
+        for key in keys:
+            
+            records = cache.get((name, key))
+            
+            if records is None:
+                
+                missing.append(key)
+                
+            else:
+                
+                result[key] = records
+        
+        for i in range(0, len(missing), self.query_chunk_size):
+            
+            chunk = missing[i:i + self.query_chunk_size]
+            found = dict((key, []) for key in chunk)
+            
+            for record in query(chunk):
+                
+                for key in keys_of(record):
+                    
+                    if key in found:
+                        
+                        found[key].append(record)
+            
+            for key, records in found.items():
+                
+                cache.set((name, key), records)
+                result[key] = records
+        
+        return dict((key, result[key]) for key in keys)
+    
+    
+    @staticmethod
+    def _cli_add_cache(main):
+        """
+        Adds the commands of the download cache.
+        """
+        
+        from .cli import cache
+        
+        main.add_command(cache)
+        
+        return main
+    
+    
+    @staticmethod
+    def _cli_add_populate(main):
+        """
+        Adds the populate command.
+        """
+        
+        return add_cli_populate(main)
+    
+    
+    @staticmethod
+    def _cli_add_to_bel(main):
+        """
+        Adds the BEL export commands.
+        """
+        
+        return add_cli_export(add_cli_to_bel(main))
+
+
+def add_cli_populate(main):
+    """
+    Adds a ``populate`` command to main :mod:`click` function, with
+    options for chunked loading and profiling.
+    """
+    
+    @main.command()
+    @click.option('-r', '--reset', is_flag = True, help = 'Nuke database first')
+    @click.option(
+        '-f', '--force',
+        is_flag = True,
+        help = 'Load all datasets even if the database is up to date',
+    )
+    @click.option(
+        '-c', '--chunksize',
+        type = int,
+        help = 'Load the input data in chunks of this many rows',
+    )
+    @click.option(
+        '-i', '--rebuild-indexes',
+        is_flag = True,
+        help = 'Drop the secondary indexes before loading and rebuild them',
+    )
+    @click.option(
+        '--fast',
+        is_flag = True,
+        help = (
+            'Load in one transaction with settings of the database for '
+            'speed instead of durability'
+        ),
+    )
+    @click.option(
+        '--pipeline/--no-pipeline',
+        default = True,
+        show_default = True,
+        help = (
+            'Read, build and write the chunks concurrently in a pipeline '
+            'of threads'
+        ),
+    )
+    @click.option(
+        '--revalidate',
+        is_flag = True,
+        help = (
+            'Download again the input files changed on the server since '
+            'they have been cached'
+        ),
+    )
+    @click.option(
+        '-p', '--profile',
+        type = click.Path(dir_okay = False, writable = True),
+        help = 'Save cProfile statistics of the populate into this file',
+    )
+    @click.option(
+        '-d', '--dataset',
+        type = click.Choice(DATASETS),
+        multiple = True,
+        help = (
+            'Load only this dataset, along with the ones depending on it; '
+            'can be given more than once. By default all datasets'
+        ),
+    )
+    @verbose_option
+    @click.pass_obj
+    def populate(
+            manager,
+            reset,
+            force,
+            chunksize,
+            rebuild_indexes,
+            fast,
+            pipeline,
+            revalidate,
+            profile,
+            dataset,
+        ):
+        """Populate the database."""
+        
+        if reset:
+            
+            click.echo('Deleting the previous instance of the database')
+            manager.drop_all()
+            click.echo('Creating new models')
+            manager.create_all()
+        
+        profiler = cProfile.Profile() if profile else None
+        
+        if profiler:
+            
+            profiler.enable()
+        
+        try:
+            
+            manager.populate(
+                force = force,
+                chunksize = chunksize,
+                rebuild_indexes = rebuild_indexes,
+                fast_load = fast,
+                pipelined = pipeline,
+                revalidate = revalidate,
+                datasets = dataset or None,
+            )
+            
+        finally:
+            
+            if profiler:
+                
+                profiler.disable()
+                profiler.dump_stats(profile)
+                click.echo('Profile saved to %s' % profile)
+        
+        for stage in manager.profiler.report():
+            
+            click.echo(
+                '%s: %.03f s, %u rows' % (
+                    stage['stage'],
+                    stage['seconds'],
+                    stage['rows'],
+                )
+            )
+    
+    return main
+
+
+def add_cli_export(main):
+    """
+    Adds an ``export`` command to main :mod:`click` function, writing BEL
+    by batches into a file.
+    """
+    
+    @main.command()
+    @click.option(
+        '-o', '--output',
+        type = click.Path(dir_okay = False, writable = True),
+        required = True,
+        help = 'Write the BEL into this file',
+    )
+    @click.option(
+        '-f', '--fmt',
+        type = click.Choice(FORMATS),
+        default = 'nodelink',
+        show_default = True,
+        help = 'Node-link JSON or BEL script',
+    )
+    @click.option(
+        '-b', '--batch-size',
+        type = int,
+        default = BEL_BATCH_SIZE,
+        show_default = True,
+        help = 'Convert this many interactions or PTMs at once',
+    )
+    @click.option(
+        '-p', '--partition-by',
+        type = click.Choice(PARTITIONS),
+        help = 'Convert partitions of the records in parallel processes',
+    )
+    @click.option(
+        '-w', '--workers',
+        type = int,
+        help = 'Number of processes, by default the number of CPUs',
+    )
+    @verbose_option
+    @click.pass_obj
+    def export(manager, output, fmt, batch_size, partition_by, workers):
+        """Write as BEL by batches, without building the whole graph."""
+        
+        edges = manager.to_bel(
+            path = output,
+            fmt = fmt,
+            batch_size = batch_size,
+            partition_by = partition_by,
+            workers = workers,
+        )
+        click.echo('Wrote %u edges to %s' % (edges, output))
     
+    return main
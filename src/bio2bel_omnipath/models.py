@@ -26,12 +26,26 @@ import sqlalchemy
 import sqlalchemy.ext.declarative
 import sqlalchemy.orm
 
-import pybel
-
 from .constants import MODULE_NAME
 
 __all__ = [
     'Base',
+    'MolecularEntity',
+    'EntityType',
+    'Taxonomy',
+    'Interaction',
+    'InteractionType',
+    'Ptm',
+    'PtmType',
+    'Reference',
+    'Resource',
+    'Complex',
+    'Annotation',
+    'AnnotationLabel',
+    'AnnotationValue',
+    'Fingerprint',
+    'Checkpoint',
+    'Statistic',
 ]
 
 logger = logging.getLogger(__name__)
@@ -46,6 +60,15 @@ REFERENCE_TABLE_NAME = '%s_reference' % MODULE_NAME
 ENTITY_TYPE_TABLE_NAME = '%s_entity_type' % MODULE_NAME
 INTERACTION_TYPE_TABLE_NAME = '%s_interaction_type' % MODULE_NAME
 PTM_TYPE_TABLE_NAME = '%s_ptm_type' % MODULE_NAME
+COMPLEX_TABLE_NAME = '%s_complex' % MODULE_NAME
+ANNOTATION_TABLE_NAME = '%s_annotation' % MODULE_NAME
+ANNOTATION_LABEL_TABLE_NAME = '%s_annotation_label' % MODULE_NAME
+ANNOTATION_VALUE_TABLE_NAME = '%s_annotation_value' % MODULE_NAME
+
+# metadata tables
+FINGERPRINT_TABLE_NAME = '%s_fingerprint' % MODULE_NAME
+CHECKPOINT_TABLE_NAME = '%s_checkpoint' % MODULE_NAME
+STATISTIC_TABLE_NAME = '%s_statistic' % MODULE_NAME
 
 # many to many association tables
 ASSOC_INT_REF_TABLE_NAME = '%s_interaction_reference' % MODULE_NAME
@@ -58,6 +81,55 @@ ASSOC_PTM_RES_TABLE_NAME = '%s_ptm_resource' % MODULE_NAME
 
 ASSOC_RES_REF_TABLE_NAME = '%s_resource_reference' % MODULE_NAME
 
+ASSOC_CPX_ENT_TABLE_NAME = '%s_complex_entity' % MODULE_NAME
+ASSOC_CPX_REF_TABLE_NAME = '%s_complex_reference' % MODULE_NAME
+ASSOC_CPX_RES_TABLE_NAME = '%s_complex_resource' % MODULE_NAME
+
+# association tables built from the records of the datasets; the links
+# between interactions and PTMs are derived by a join in the database
+ASSOC_TABLE_NAMES = (
+    ASSOC_INT_REF_TABLE_NAME,
+    ASSOC_INT_RES_TABLE_NAME,
+    ASSOC_PTM_REF_TABLE_NAME,
+    ASSOC_PTM_RES_TABLE_NAME,
+    ASSOC_CPX_ENT_TABLE_NAME,
+    ASSOC_CPX_REF_TABLE_NAME,
+    ASSOC_CPX_RES_TABLE_NAME,
+)
+
+# tables of the records loaded from the PTMs dataset only
+PTM_TABLE_NAMES = (
+    PTM_TABLE_NAME,
+    PTM_TYPE_TABLE_NAME,
+    ASSOC_INT_PTM_TABLE_NAME,
+    ASSOC_PTM_REF_TABLE_NAME,
+    ASSOC_PTM_RES_TABLE_NAME,
+)
+
+# tables of the records loaded from the complexes dataset only
+COMPLEX_TABLE_NAMES = (
+    COMPLEX_TABLE_NAME,
+    ASSOC_CPX_ENT_TABLE_NAME,
+    ASSOC_CPX_REF_TABLE_NAME,
+    ASSOC_CPX_RES_TABLE_NAME,
+)
+
+# tables of the records loaded from the annotations dataset only
+ANNOTATION_TABLE_NAMES = (
+    ANNOTATION_TABLE_NAME,
+    ANNOTATION_LABEL_TABLE_NAME,
+    ANNOTATION_VALUE_TABLE_NAME,
+)
+
+# the number of records of these tables summarize the database
+SUMMARY_TABLE_NAMES = (
+    ('interactions', INTERACTION_TABLE_NAME),
+    ('ptms', PTM_TABLE_NAME),
+    ('proteins', ENTITY_TABLE_NAME),
+    ('complexes', COMPLEX_TABLE_NAME),
+    ('annotations', ANNOTATION_TABLE_NAME),
+)
+
 
 Base = sqlalchemy.ext.declarative.declarative_base()
 
@@ -71,13 +143,19 @@ assoc_res_ref = sqlalchemy.Table(
     sqlalchemy.Column(
         'resource_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % RESOURCE_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % RESOURCE_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
     sqlalchemy.Column(
         'reference_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % REFERENCE_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % REFERENCE_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
 )
@@ -89,13 +167,19 @@ assoc_int_ref = sqlalchemy.Table(
     sqlalchemy.Column(
         'interaction_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % INTERACTION_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % INTERACTION_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
     sqlalchemy.Column(
         'reference_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % REFERENCE_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % REFERENCE_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
 )
@@ -107,13 +191,19 @@ assoc_int_res = sqlalchemy.Table(
     sqlalchemy.Column(
         'interaction_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % INTERACTION_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % INTERACTION_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
     sqlalchemy.Column(
         'resource_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % RESOURCE_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % RESOURCE_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
 )
@@ -125,13 +215,19 @@ assoc_int_ptm = sqlalchemy.Table(
     sqlalchemy.Column(
         'interaction_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % INTERACTION_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % INTERACTION_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
     sqlalchemy.Column(
         'ptm_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % PTM_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % PTM_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
 )
@@ -143,13 +239,139 @@ assoc_ent_tax = sqlalchemy.Table(
     sqlalchemy.Column(
         'molecular_entity_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % INTERACTION_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
     sqlalchemy.Column(
         'taxonomy_id',
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % TAXONOMY_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % TAXONOMY_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+)
+
+
+assoc_ptm_ref = sqlalchemy.Table(
+    ASSOC_PTM_REF_TABLE_NAME,
+    Base.metadata,
+    sqlalchemy.Column(
+        'ptm_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % PTM_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+    sqlalchemy.Column(
+        'reference_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % REFERENCE_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+)
+
+
+assoc_ptm_res = sqlalchemy.Table(
+    ASSOC_PTM_RES_TABLE_NAME,
+    Base.metadata,
+    sqlalchemy.Column(
+        'ptm_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % PTM_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+    sqlalchemy.Column(
+        'resource_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % RESOURCE_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+)
+
+
+assoc_cpx_ent = sqlalchemy.Table(
+    ASSOC_CPX_ENT_TABLE_NAME,
+    Base.metadata,
+    sqlalchemy.Column(
+        'complex_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % COMPLEX_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+    sqlalchemy.Column(
+        'molecular_entity_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+)
+
+
+assoc_cpx_ref = sqlalchemy.Table(
+    ASSOC_CPX_REF_TABLE_NAME,
+    Base.metadata,
+    sqlalchemy.Column(
+        'complex_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % COMPLEX_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+    sqlalchemy.Column(
+        'reference_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % REFERENCE_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+)
+
+
+assoc_cpx_res = sqlalchemy.Table(
+    ASSOC_CPX_RES_TABLE_NAME,
+    Base.metadata,
+    sqlalchemy.Column(
+        'complex_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % COMPLEX_TABLE_NAME,
+            deferrable = True,
+        ),
+        primary_key = True,
+    ),
+    sqlalchemy.Column(
+        'resource_id',
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % RESOURCE_TABLE_NAME,
+            deferrable = True,
+        ),
         primary_key = True,
     ),
 )
@@ -163,7 +385,7 @@ class MolecularEntity(Base):
     Represents a protein.
     """
     
-    __tablename__ = PROTEIN_TABLE_NAME
+    __tablename__ = ENTITY_TABLE_NAME
     
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
     
@@ -182,12 +404,33 @@ class MolecularEntity(Base):
         doc = 'Primary Gene Symbol or miRBase mature miRNA name',
     )
     
+    taxon_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % TAXONOMY_TABLE_NAME,
+            deferrable = True,
+        ),
+        nullable = False,
+        index = True,
+        doc = 'Key of the Taxonomy',
+    )
+    
+    type_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TYPE_TABLE_NAME,
+            deferrable = True,
+        ),
+        nullable = False,
+        doc = 'Key of the EntityType',
+    )
+    
     taxon = sqlalchemy.orm.relationship(
-        TAXONOMY_TABLE_NAME,
+        'Taxonomy',
     )
     
     type = sqlalchemy.orm.relationship(
-        ENTITY_TYPE_TABLE_NAME,
+        'EntityType',
     )
 
 
@@ -232,6 +475,21 @@ class Interaction(Base):
     """
     
     __tablename__ = INTERACTION_TABLE_NAME
+    __table_args__ = (
+        # neighbors by source, or the interactions between two entities
+        sqlalchemy.Index(
+            'ix_%s_source_target_type' % INTERACTION_TABLE_NAME,
+            'source_id',
+            'target_id',
+            'type_id',
+        ),
+        # neighbors by target
+        sqlalchemy.Index(
+            'ix_%s_target_source' % INTERACTION_TABLE_NAME,
+            'target_id',
+            'source_id',
+        ),
+    )
     
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
     
@@ -241,43 +499,64 @@ class Interaction(Base):
     
     source_id = sqlalchemy.Column(
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % ENTITY_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TABLE_NAME,
+            deferrable = True,
+        ),
         nullable = False,
-        index = True,
         doc = 'Key of the source MolecularEntity',
     )
     
     target_id = sqlalchemy.Column(
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % ENTITY_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TABLE_NAME,
+            deferrable = True,
+        ),
         nullable = False,
-        index = True,
         doc = 'Key of the target MolecularEntity',
     )
     
     is_directed = sqlalchemy.Column(
         sqlalchemy.Integer,
         nullable = False,
-        index = True,
         doc = 'Boolean: the interaction is directed',
     )
     
     is_stimulation = sqlalchemy.Column(
         sqlalchemy.Integer,
         nullable = False,
-        index = True,
         doc = 'Boolean: the interaction has stimulatory effect',
     )
     
     is_inhibition = sqlalchemy.Column(
         sqlalchemy.Integer,
         nullable = False,
-        index = True,
         doc = 'Boolean: the interaction has inhibitory effect',
     )
     
-    type = sqlalchemy.relationship(
-        INTERACTION_TYPE_TABLE_NAME,
+    type_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % INTERACTION_TYPE_TABLE_NAME,
+            deferrable = True,
+        ),
+        nullable = False,
+        doc = 'Key of the InteractionType',
+    )
+    
+    source = sqlalchemy.orm.relationship(
+        'MolecularEntity',
+        foreign_keys = [source_id],
+    )
+    
+    target = sqlalchemy.orm.relationship(
+        'MolecularEntity',
+        foreign_keys = [target_id],
+    )
+    
+    type = sqlalchemy.orm.relationship(
+        'InteractionType',
     )
     
     #
@@ -285,23 +564,19 @@ class Interaction(Base):
     #
     
     resources = sqlalchemy.orm.relationship(
-        RESOURCE_TABLE_NAME,
-        secondary = assoc_int_ref,
+        'Resource',
+        secondary = assoc_int_res,
     )
     
     references = sqlalchemy.orm.relationship(
-        REFERENCE_TABLE_NAME,
+        'Reference',
         secondary = assoc_int_ref,
     )
     
-    references = sqlalchemy.orm.relationship(
-        REFERENCE_TABLE_NAME,
-        secondary = assoc_int_ptm,
-    )
-    
     ptms = sqlalchemy.orm.relationship(
-        PTM_TABLE_NAME,
+        'Ptm',
         secondary = assoc_int_ptm,
+        back_populates = 'interactions',
     )
 
 
@@ -329,12 +604,24 @@ class Ptm(Base):
     """
     
     __tablename__ = PTM_TABLE_NAME
+    __table_args__ = (
+        # PTMs on a substrate, or on a site of it
+        sqlalchemy.Index(
+            'ix_%s_target_residue_offset' % PTM_TABLE_NAME,
+            'target_id',
+            'residue_type',
+            'sequence_offset',
+        ),
+    )
     
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
     
     source_id = sqlalchemy.Column(
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % ENTITY_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TABLE_NAME,
+            deferrable = True,
+        ),
         nullable = False,
         index = True,
         doc = 'Key of the source MolecularEntity',
@@ -342,43 +629,64 @@ class Ptm(Base):
     
     target_id = sqlalchemy.Column(
         sqlalchemy.Integer,
-        sqlalchemy.ForeignKey('%s.id' % ENTITY_TABLE_NAME),
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TABLE_NAME,
+            deferrable = True,
+        ),
         nullable = False,
-        index = True,
         doc = 'Key of the target MolecularEntity',
     )
     
     sequence_offset = sqlalchemy.Column(
         sqlalchemy.Integer,
         nullable = False,
-        index = True,
         doc = 'Sequence position of the modified residue',
     )
     
     residue_type = sqlalchemy.Column(
         sqlalchemy.String(1),
         nullable = False,
-        index = True,
         doc = 'Single letter code of the modified residue',
     )
     
+    modification_type_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % PTM_TYPE_TABLE_NAME,
+            deferrable = True,
+        ),
+        nullable = False,
+        doc = 'Key of the PtmType',
+    )
+    
+    source = sqlalchemy.orm.relationship(
+        'MolecularEntity',
+        foreign_keys = [source_id],
+    )
+    
+    target = sqlalchemy.orm.relationship(
+        'MolecularEntity',
+        foreign_keys = [target_id],
+    )
+    
     modification_type = sqlalchemy.orm.relationship(
-        PTM_TYPE_TABLE_NAME,
+        'PtmType',
     )
     
     references = sqlalchemy.orm.relationship(
-        REFERENCE_TABLE_NAME,
-        secondary = assoc_ref_ptm,
+        'Reference',
+        secondary = assoc_ptm_ref,
     )
     
     resources = sqlalchemy.orm.relationship(
-        RESOURCE_TABLE_NAME,
-        secondary = assoc_res_ptm,
+        'Resource',
+        secondary = assoc_ptm_res,
     )
     
     interactions = sqlalchemy.orm.relationship(
-        INTERACTION_TABLE_NAME,
+        'Interaction',
         secondary = assoc_int_ptm,
+        back_populates = 'ptms',
     )
 
 
@@ -409,7 +717,7 @@ class Reference(Base):
     
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
     
-    pubmed_id = sequence_offset = sqlalchemy.Column(
+    pubmed_id = sqlalchemy.Column(
         sqlalchemy.Integer,
         nullable = False,
         index = True,
@@ -436,5 +744,331 @@ class Resource(Base):
     )
     
     reference = sqlalchemy.orm.relationship(
-        REFERENCE_TABLE_NAME,
+        'Reference',
+        secondary = assoc_res_ref,
+    )
+
+
+class Complex(Base):
+    """
+    Represents a protein complex, identified by its components.
+    """
+    
+    __tablename__ = COMPLEX_TABLE_NAME
+    
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
+    
+    components = sqlalchemy.Column(
+        sqlalchemy.Text,
+        nullable = False,
+        index = True,
+        unique = True,
+        doc = (
+            'UniProtKB IDs of the components separated by underscores, '
+            'as in the OmniPath ID of the complex, `COMPLEX:<components>`'
+        ),
+    )
+    
+    name = sqlalchemy.Column(
+        sqlalchemy.Text,
+        doc = 'Name of the complex',
+    )
+    
+    stoichiometry = sqlalchemy.Column(
+        sqlalchemy.Text,
+        doc = 'Number of copies of each component separated by colons',
+    )
+    
+    members = sqlalchemy.orm.relationship(
+        'MolecularEntity',
+        secondary = assoc_cpx_ent,
+    )
+    
+    references = sqlalchemy.orm.relationship(
+        'Reference',
+        secondary = assoc_cpx_ref,
+    )
+    
+    resources = sqlalchemy.orm.relationship(
+        'Resource',
+        secondary = assoc_cpx_res,
+    )
+
+
+class Annotation(Base):
+    """
+    Represents a key-value pair describing a molecular entity or a
+    complex in a resource. The pairs of the same record of a resource
+    share their ``record_id``, e.g. the tissue and the level of an
+    expression record. Labels and values are stored only once, the
+    annotations refer to them by their keys.
+    """
+    
+    __tablename__ = ANNOTATION_TABLE_NAME
+    __table_args__ = (
+        # annotations of an entity, optionally in one resource
+        sqlalchemy.Index(
+            'ix_%s_entity_resource' % ANNOTATION_TABLE_NAME,
+            'entity_id',
+            'resource_id',
+        ),
+        sqlalchemy.Index(
+            'ix_%s_complex' % ANNOTATION_TABLE_NAME,
+            'complex_id',
+        ),
+        # values of a label in a resource, or the entities with a value
+        sqlalchemy.Index(
+            'ix_%s_resource_label_value' % ANNOTATION_TABLE_NAME,
+            'resource_id',
+            'label_id',
+            'value_id',
+        ),
+    )
+    
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
+    
+    entity_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % ENTITY_TABLE_NAME,
+            deferrable = True,
+        ),
+        doc = 'Key of the MolecularEntity, NULL for complexes',
+    )
+    
+    complex_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % COMPLEX_TABLE_NAME,
+            deferrable = True,
+        ),
+        doc = 'Key of the Complex, NULL for molecular entities',
+    )
+    
+    resource_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % RESOURCE_TABLE_NAME,
+            deferrable = True,
+        ),
+        nullable = False,
+        doc = 'Key of the Resource',
+    )
+    
+    record_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        nullable = False,
+        doc = 'Number of the record in the resource',
+    )
+    
+    label_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % ANNOTATION_LABEL_TABLE_NAME,
+            deferrable = True,
+        ),
+        nullable = False,
+        doc = 'Key of the AnnotationLabel',
+    )
+    
+    value_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey(
+            '%s.id' % ANNOTATION_VALUE_TABLE_NAME,
+            deferrable = True,
+        ),
+        nullable = False,
+        doc = 'Key of the AnnotationValue',
+    )
+    
+    entity = sqlalchemy.orm.relationship(
+        'MolecularEntity',
+    )
+    
+    complex = sqlalchemy.orm.relationship(
+        'Complex',
+    )
+    
+    resource = sqlalchemy.orm.relationship(
+        'Resource',
+    )
+    
+    label = sqlalchemy.orm.relationship(
+        'AnnotationLabel',
+    )
+    
+    value = sqlalchemy.orm.relationship(
+        'AnnotationValue',
+    )
+
+
+class AnnotationLabel(Base):
+    """
+    Describes the keys of annotations, e.g. tissue, location.
+    """
+    
+    __tablename__ = ANNOTATION_LABEL_TABLE_NAME
+    
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
+    
+    label = sqlalchemy.Column(
+        sqlalchemy.String(64),
+        nullable = False,
+        index = True,
+        unique = True,
+        doc = 'Label of an annotation',
+    )
+
+
+class AnnotationValue(Base):
+    """
+    Represents the distinct values of annotations.
+    """
+    
+    __tablename__ = ANNOTATION_VALUE_TABLE_NAME
+    
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
+    
+    # not indexed: some values are too long for the B-tree indexes of
+    # PostgreSQL, they are deduplicated by hashes at loading
+    value = sqlalchemy.Column(
+        sqlalchemy.Text,
+        nullable = False,
+        doc = 'Value of an annotation',
+    )
+
+
+#
+# Metadata tables
+#
+
+class Fingerprint(Base):
+    """
+    Describes the input data of a dataset loaded into the database:
+    the hash of the input file contents, the parser options and the
+    version of this module at load time.
+    """
+    
+    __tablename__ = FINGERPRINT_TABLE_NAME
+    
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
+    
+    dataset = sqlalchemy.Column(
+        sqlalchemy.String(16),
+        nullable = False,
+        unique = True,
+        doc = 'Name of the dataset, e.g. interactions, ptms',
+    )
+    
+    content_hash = sqlalchemy.Column(
+        sqlalchemy.String(32),
+        nullable = False,
+        doc = 'MD5 hex digest of the input file',
+    )
+    
+    options = sqlalchemy.Column(
+        sqlalchemy.Text,
+        nullable = False,
+        doc = 'Parser options as JSON',
+    )
+    
+    version = sqlalchemy.Column(
+        sqlalchemy.String(16),
+        nullable = False,
+        doc = 'Version of bio2bel_omnipath',
+    )
+    
+    loaded_at = sqlalchemy.Column(
+        sqlalchemy.DateTime,
+        nullable = False,
+        doc = 'Time of loading the dataset',
+    )
+
+
+class Checkpoint(Base):
+    """
+    Progress of loading a dataset: the number of input rows committed,
+    and the fingerprint of the input data as in :py:class:`Fingerprint`.
+    Written in the transaction of each batch, and removed when the
+    dataset is completely loaded; an interrupted load can be resumed
+    after the rows committed.
+    """
+    
+    __tablename__ = CHECKPOINT_TABLE_NAME
+    
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
+    
+    dataset = sqlalchemy.Column(
+        sqlalchemy.String(16),
+        nullable = False,
+        unique = True,
+        doc = 'Name of the dataset, e.g. interactions, ptms',
+    )
+    
+    content_hash = sqlalchemy.Column(
+        sqlalchemy.String(32),
+        nullable = False,
+        doc = 'MD5 hex digest of the input file',
+    )
+    
+    options = sqlalchemy.Column(
+        sqlalchemy.Text,
+        nullable = False,
+        doc = 'Parser options as JSON',
+    )
+    
+    version = sqlalchemy.Column(
+        sqlalchemy.String(16),
+        nullable = False,
+        doc = 'Version of bio2bel_omnipath',
+    )
+    
+    rows = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        nullable = False,
+        doc = 'Number of input rows loaded and committed',
+    )
+    
+    updated_at = sqlalchemy.Column(
+        sqlalchemy.DateTime,
+        nullable = False,
+        doc = 'Time of committing the last batch',
+    )
+
+
+class Statistic(Base):
+    """
+    A materialized statistic of the database, e.g. the number of records
+    of a table or the number of interactions of a type, maintained by
+    :py:mod:`stats`.
+    """
+    
+    __tablename__ = STATISTIC_TABLE_NAME
+    __table_args__ = (
+        sqlalchemy.Index(
+            'ix_%s_category_key' % STATISTIC_TABLE_NAME,
+            'category',
+            'key',
+            unique = True,
+        ),
+    )
+    
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key = True)
+    
+    category = sqlalchemy.Column(
+        sqlalchemy.String(32),
+        nullable = False,
+        doc = 'Category of the statistic, e.g. tables, taxons',
+    )
+    
+    key = sqlalchemy.Column(
+        sqlalchemy.String(64),
+        nullable = False,
+        doc = 'Subject of the statistic, e.g. a table name, a taxon',
+    )
+    
+    value = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        nullable = False,
+        doc = 'Value of the statistic, e.g. a number of records',
     )
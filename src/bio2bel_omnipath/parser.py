@@ -21,75 +21,828 @@ Parsers and downloaders for Bio2BEL OmniPath.
 """
 
 import os
-import log
+import json
+import gzip
+import shutil
+import logging
 import hashlib
+import concurrent.futures
 
-import bio2bel.downloading
+import urllib.error
 import urllib.request
+import numpy as np
 import pandas as pd
 
+try:
+    
+    import pyarrow.feather
+
+except ImportError:
+    
+    pyarrow = None
 
-from .constants import URLS, DATA_DIR
+from .constants import URLS, get_url
+from .cache import content_hash, get_cache, temp_path
 
 
 log = logging.getLogger(__name__)
 
 
-def download(url, force_download = False):
+class FetchError(Exception):
+    """
+    Raised if some datasets could not be retrieved by
+    :py:func:`fetch_all`. The exception of each failed dataset is in
+    ``errors``, the data of the successful ones in ``results``, both
+    dicts by query type.
+    """
+    
+    def __init__(self, errors, results):
+        
+        self.errors = errors
+        self.results = results
+        
+        super().__init__(
+            'Failed to retrieve datasets: %s' % '; '.join(
+                '`%s`: %s' % (query_type, error)
+                for query_type, error in errors.items()
+            )
+        )
+
+
+def download(url, force_download = False, revalidate = False, cache = None):
     """
     Downloads anything and manages cache.
+    
+    The downloaded files are stored in a content addressed
+    :py:class:`cache.DownloadCache`, along with their ``ETag`` and
+    ``Last-Modified`` headers, used to revalidate the cached file by a
+    conditional request. The data is requested gzip compressed. An
+    interrupted download is resumed by a range request at the next call.
+    Only one thread or process downloads the same URL at a time, the
+    others wait and use its download.
+    
+    :param str url:
+        The URL to download.
+    :param bool force_download:
+        Download again even if local copy exists.
+    :param bool revalidate:
+        Check if the local copy is up to date, and download again only
+        if the server has a newer version. If the server can not be
+        reached the local copy is used.
+    :param cache:
+        A :py:class:`cache.DownloadCache`, by default the one in the
+        data directory.
+    
+    :return:
+        The path of the cached file.
     """
     
-    local_path = os.path.join(
-        DATA_DIR,
-        hashlib.md5(url.encode('utf-8')).hexdigest(),
-    )
+    cache = cache or get_cache()
+    
+    with cache.url_lock(url):
+        
+        local_path = cache.get(url)
+        
+        if local_path and not force_download and not revalidate:
+            
+            log.info('using cached data at %s', local_path)
+            
+            return local_path
+        
+        meta = (
+            cache.entry(url) or {}
+                if local_path and not force_download else
+            {}
+        )
+        part_path = cache.partial_path(url)
+        
+        try:
+            
+            meta = fetch(url, part_path, meta)
+            
+        except (urllib.error.URLError, OSError) as e:
+            
+            if not local_path or force_download:
+                
+                raise
+            
+            log.warning(
+                'could not revalidate %s, using cached data at %s: %s',
+                url,
+                local_path,
+                e,
+            )
+            
+            return local_path
+        
+        if meta is None:
+            
+            cache.touch(url)
+            
+            return local_path
+        
+        return cache.store(url, part_path, meta)
+
+
+def read_meta(path):
+    """
+    Reads the HTTP metadata saved along with a downloaded file.
+    """
+    
+    meta_path = '%s.json' % path
+    
+    if os.path.exists(meta_path):
+        
+        with open(meta_path, 'r') as fp:
+            
+            return json.load(fp)
+    
+    return {}
+
+
+def write_meta(path, meta):
+    """
+    Saves the HTTP metadata of a downloaded file.
+    """
+    
+    meta_path = '%s.json' % path
+    tmp_path = temp_path(meta_path)
+    
+    with open(tmp_path, 'w') as fp:
+        
+        json.dump(meta, fp)
+    
+    os.replace(tmp_path, meta_path)
+
+
+def fetch(url, local_path, meta = None):
+    """
+    Retrieves ``url`` into ``local_path`` by HTTP. Conditional on the
+    validators in ``meta``, if any. Data is downloaded into a partial
+    file first, which is moved to ``local_path`` only when complete.
+    
+    :return:
+        The URL, HTTP validators and encoding of the download, None if
+        the data is not modified since the download of ``meta``.
+    """
+    
+    meta = meta or {}
+    part_path = '%s.part' % local_path
+    part_meta = read_meta(part_path)
+    headers = {'Accept-Encoding': 'gzip'}
+    
+    if meta.get('etag'):
+        
+        headers['If-None-Match'] = meta['etag']
+    
+    if meta.get('last_modified'):
+        
+        headers['If-Modified-Since'] = meta['last_modified']
+    
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    validator = part_meta.get('etag') or part_meta.get('last_modified')
     
-    if not os.path.exists(local_path) or force_download:
+    if offset and validator:
+        
+        log.info('resuming download of %s from byte %u', url, offset)
+        headers['Range'] = 'bytes=%u-' % offset
+        headers['If-Range'] = validator
+    
+    request = urllib.request.Request(url, headers = headers)
+    
+    try:
+        
+        response = urllib.request.urlopen(request)
+        
+    except urllib.error.HTTPError as e:
+        
+        if e.code == 304:
+            
+            log.info('cached data of %s is up to date', url)
+            
+            return None
+        
+        if e.code == 416 and 'Range' in headers:
+            
+            # partial file is not valid any more
+            os.remove(part_path)
+            
+            return fetch(url, local_path, meta)
+        
+        raise
+    
+    with response:
+        
+        if response.status != 206:
+            
+            offset = 0
+            part_meta = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'encoding': response.headers.get('Content-Encoding'),
+            }
+            write_meta(part_path, part_meta)
         
         log.info('downloading %s to %s', url, local_path)
-        urllib.request.urlretrieve(url, local_path)
         
-    else:
+        with open(part_path, 'ab' if offset else 'wb') as fp:
+            
+            shutil.copyfileobj(response, fp)
+            received = fp.tell() - offset
+        
+        length = response.headers.get('Content-Length')
+        
+        if length is not None and received < int(length):
+            
+            raise OSError(
+                'incomplete download of %s: %u of %s bytes, '
+                'will be resumed next time' % (url, received, length)
+            )
+    
+    if part_meta.get('encoding') == 'gzip':
+        
+        tmp_path = temp_path(part_path)
+        
+        with gzip.open(part_path, 'rb') as fp_in:
+            
+            with open(tmp_path, 'wb') as fp_out:
+                
+                shutil.copyfileobj(fp_in, fp_out)
+        
+        os.replace(tmp_path, part_path)
+    
+    os.replace(part_path, local_path)
+    os.remove('%s.json' % part_path)
+    
+    return part_meta
+
+
+def columnar_path(path):
+    """
+    Returns the path of the columnar (Feather) cache of a raw data file.
+    The file name contains the hash of the raw file contents and of the
+    schemas, hence a changed raw file or schema never matches an old
+    cache.
+    """
+    
+    digest = hashlib.md5(
+        (content_hash(path) + SCHEMAS_HASH).encode('ascii')
+    ).hexdigest()
+    
+    return '%s.%s.feather' % (path, digest)
+
+
+def read_columnar(path, force = False):
+    """
+    Reads the data frame parsed from the raw file at ``path`` from the
+    columnar cache. The cache file is memory mapped.
+    
+    :param str path:
+        Path to the raw data file.
+    :param bool force:
+        Ignore the cache, as it is about to be rewritten.
+    
+    :return:
+        A ``pyarrow.Table`` or None if pyarrow is not available or no
+        valid cache exists.
+    """
+    
+    if pyarrow is None or force:
+        
+        return None
+    
+    cache_path = columnar_path(path)
+    
+    if not os.path.exists(cache_path):
+        
+        return None
+    
+    log.info('using columnar cache at %s', cache_path)
+    
+    return pyarrow.feather.read_table(cache_path, memory_map = True)
+
+
+def write_columnar(df, path):
+    """
+    Saves the data frame parsed from the raw file at ``path`` into the
+    columnar cache next to the raw file, and removes the caches of
+    earlier versions of the raw file. Failures are only logged, the
+    cache is never essential.
+    """
+    
+    if pyarrow is None:
+        
+        return
+    
+    cache_path = columnar_path(path)
+    directory, raw_name = os.path.split(cache_path.rsplit('.', 2)[0])
+    
+    try:
+        
+        for name in os.listdir(directory or '.'):
+            
+            if (
+                name.startswith('%s.' % raw_name) and
+                name.endswith('.feather')
+            ):
+                
+                os.remove(os.path.join(directory, name))
+        
+        tmp_path = temp_path(cache_path)
+        df.to_feather(tmp_path, compression = 'uncompressed')
+        os.replace(tmp_path, cache_path)
+        log.info('saved columnar cache to %s', cache_path)
+        
+    except (OSError, ValueError, pyarrow.ArrowException) as e:
+        
+        log.warning('could not save columnar cache %s: %s', cache_path, e)
+
+
+# the columns read from the input files and their data types, by query
+# type; the data frames have the columns in this order, missing ones
+# filled with NAs; repetitive columns are categorical, the flags and
+# numbers small nullable integers; sources and references are read as
+# strings even if all values in a chunk look like numbers or are missing
+SCHEMAS = {
+    'interactions': {
+        'source': 'category',
+        'target': 'category',
+        'source_genesymbol': 'category',
+        'target_genesymbol': 'category',
+        'is_directed': 'Int8',
+        'is_stimulation': 'Int8',
+        'is_inhibition': 'Int8',
+        'sources': 'category',
+        'references': 'str',
+        'type': 'category',
+        'ncbi_tax_id_source': 'Int32',
+        'ncbi_tax_id_target': 'Int32',
+    },
+    'ptms': {
+        'enzyme': 'category',
+        'substrate': 'category',
+        'enzyme_genesymbol': 'category',
+        'substrate_genesymbol': 'category',
+        'residue_type': 'category',
+        'residue_offset': 'Int32',
+        'modification': 'category',
+        'sources': 'category',
+        'references': 'str',
+        'ncbi_tax_id': 'Int32',
+    },
+    'complexes': {
+        'name': 'str',
+        'components': 'str',
+        'components_genesymbols': 'str',
+        'stoichiometry': 'str',
+        'sources': 'category',
+        'references': 'str',
+    },
+    # millions of rows with few distinct values in each column
+    'annotations': {
+        'uniprot': 'category',
+        'genesymbol': 'category',
+        'entity_type': 'category',
+        'source': 'category',
+        'label': 'category',
+        'value': 'category',
+        'record_id': 'Int32',
+    },
+}
+
+# changes in the schemas invalidate the columnar caches
+SCHEMAS_HASH = hashlib.md5(
+    json.dumps(SCHEMAS, sort_keys = True).encode('utf-8')
+).hexdigest()
+
+
+def read_options(query_type):
+    """
+    Returns the arguments for :py:func:`pandas.read_table` to read only
+    the columns in the schema of ``query_type``, with their data types.
+    For query types without schema all columns are read with the
+    inferred types.
+    """
+    
+    schema = SCHEMAS.get(query_type)
+    
+    return (
+        {}
+            if schema is None else
+        {
+            'usecols': lambda column: column in schema,
+            'dtype': schema,
+        }
+    )
+
+
+def project(df, query_type):
+    """
+    Brings the columns of a data frame into the order of the schema of
+    ``query_type``, adding the missing ones filled with NAs. Data frames
+    of query types without schema are returned unchanged.
+    """
+    
+    schema = SCHEMAS.get(query_type)
+    
+    if schema is None:
+        
+        return df
+    
+    for column, dtype in schema.items():
+        
+        if column not in df.columns:
+            
+            df[column] = pd.Series(index = df.index, dtype = dtype)
+    
+    return df[list(schema)]
+
+
+# PubMed IDs, bare or prefixed by the name of the resource they come
+# from, e.g. `SIGNOR:12345678`
+PUBMED_ID_PATTERN = r'^(?:[^:;]*:)?(\d+)$'
+
+
+def _split_categories(values, sep):
+    """
+    Splits the distinct elements of ``values``, each of them only once.
+    
+    :return:
+        Tuple of the category code of each element of ``values``, -1 for
+        NAs, the category of each part and the parts, stripped, without
+        the empty ones.
+    """
+    
+    values = pd.Categorical(values).remove_unused_categories()
+    categories = pd.Series(np.asarray(values.categories, dtype = str))
+    
+    parts = categories.str.split(sep).explode().str.strip()
+    parts = parts[parts.notna() & (parts != '')]
+    
+    return (
+        values.codes.astype(np.int64),
+        parts.index.values.astype(np.int64),
+        parts.values.astype(object),
+    )
+
+
+def _gather(codes, part_categories, parts, n_categories):
+    """
+    Repeats the parts of the categories of ``_split_categories`` for
+    each row.
+    
+    :return:
+        Tuple of the row positions and the parts, each part once for
+        each row of its category.
+    """
+    
+    counts = np.bincount(part_categories, minlength = n_categories)
+    # the parts of each category are contiguous
+    starts = np.cumsum(counts) - counts
+    valid = codes >= 0
+    row_counts = np.zeros(len(codes), dtype = np.int64)
+    row_counts[valid] = counts[codes[valid]]
+    row_starts = np.zeros(len(codes), dtype = np.int64)
+    row_starts[valid] = starts[codes[valid]]
+    
+    total = row_counts.sum()
+    rows = np.repeat(np.arange(len(codes), dtype = np.int64), row_counts)
+    offsets = np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+    positions = np.arange(total, dtype = np.int64) - offsets
+    positions += np.repeat(row_starts, row_counts)
+    
+    return rows, parts[positions]
+
+
+def explode(values, sep = ';'):
+    """
+    Splits a column of ``sep`` separated lists, e.g. the resources of
+    interactions, by vectorized string operations on its distinct
+    values. NAs and empty elements are skipped.
+    
+    :param values:
+        Array or series of strings, possibly categorical.
+    
+    :return:
+        Tuple of an int64 array of row positions and an array of the
+        elements, both of the same length, in the order of the rows.
+    """
+    
+    codes, part_categories, parts = _split_categories(values, sep)
+    
+    return _gather(codes, part_categories, parts, codes.max(initial = -1) + 1)
+
+
+def explode_pubmed_ids(values, sep = ';'):
+    """
+    Splits a column of ``sep`` separated PubMed IDs, like
+    :py:func:`explode`, and converts them to integers at once. Elements
+    which are not PubMed IDs are skipped.
+    
+    :return:
+        Tuple of int64 arrays of row positions and PubMed IDs.
+    """
+    
+    codes, part_categories, parts = _split_categories(values, sep)
+    
+    digits = pd.Series(parts, dtype = object).str.extract(
+        PUBMED_ID_PATTERN,
+        expand = False,
+    )
+    valid = digits.notna().values
+    
+    if not valid.all():
+        
+        log.debug(
+            'Skipping %u elements which are not PubMed IDs, e.g. `%s`.',
+            (~valid).sum(),
+            parts[~valid][0],
+        )
+    
+    return _gather(
+        codes,
+        part_categories[valid],
+        digits[valid].values.astype(np.int64),
+        codes.max(initial = -1) + 1,
+    )
+
+
+def group_rows(rows, elements, n):
+    """
+    Groups the elements exploded by :py:func:`explode` or
+    :py:func:`explode_pubmed_ids` by row.
+    
+    :param int n:
+        Number of rows.
+    
+    :return:
+        List of ``n`` lists of the elements of each row, as Python
+        objects.
+    """
+    
+    bounds = np.searchsorted(rows, np.arange(n + 1)).tolist()
+    elements = elements.tolist()
+    
+    return [elements[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def resolve_url(query_type, url = None, fields = None):
+    """
+    Returns ``url`` or the default URL of ``query_type``, with the
+    ``fields`` requested from the web service if provided.
+    """
+    
+    if url is not None:
+        
+        return url
+    
+    try:
+        
+        return URLS[query_type] if fields is None else get_url(
+            query_type,
+            fields = fields,
+        )
         
-        log.info('using cached data at %s', local_path)
+    except KeyError:
+        
+        raise NotImplementedError(
+            'No URL available for query type `%s`.' % query_type
+        )
+
+
+def get_path(
+        query_type,
+        url = None,
+        fields = None,
+        cache = True,
+        force_download = False,
+        revalidate = False,
+    ):
+    """
+    Returns the path to the input data, downloading it if necessary.
+    Arguments are the same as for :py:func:`get`.
+    """
+    
+    url = resolve_url(query_type, url = url, fields = fields)
     
-    return local_path
+    if (not os.path.exists(url) or force_download) and cache:
+        
+        url = download(
+            url,
+            force_download = force_download,
+            revalidate = revalidate,
+        )
+    
+    return url
+
+
+def options(query_type, url = None, fields = None):
+    """
+    Returns the options determining the data frame parsed for
+    ``query_type``: the source URL and the schema of the columns.
+    Along with the contents of the input file these identify the data
+    loaded into the database.
+    """
+    
+    return {
+        'url': resolve_url(query_type, url = url, fields = fields),
+        'schema': SCHEMAS.get(query_type),
+    }
 
 
-def get(query_type, url = None, cache = True, force_download = False):
+def get(
+        query_type,
+        url = None,
+        fields = None,
+        cache = True,
+        force_download = False,
+        revalidate = False,
+        columnar_cache = True,
+    ):
     """
     Retrieves a data frame with OmniPath data.
     
     :param str query_type:
-        The web service query type to use. At the moment `interactions`
-        or `ptms` available.
+        The web service query type to use: `interactions`, `ptms`,
+        `complexes` or `annotations`.
     :param str url:
         Path or URL to the input data. If None default URL used from
         :py:mod:``constants``.
+    :param list fields:
+        Fields to request from the web service if ``url`` is None,
+        by default those in :py:data:`constants.FIELDS`. Columns not
+        in :py:data:`SCHEMAS` are not read.
     :param bool cache:
         Save local copy of the input file or only load to data frame.
     :param bool force_download:
         Download again even if local copy exists.
+    :param bool revalidate:
+        Download again only if the server has a newer version than the
+        local copy.
+    :param bool columnar_cache:
+        Load the parsed data frame from a columnar cache if it exists
+        for the current contents of the input file, otherwise save it
+        there after parsing. Requires ``pyarrow``.
     """
     
-    if url is None:
+    path = get_path(
+        query_type,
+        url = url,
+        fields = fields,
+        cache = cache,
+        force_download = force_download,
+        revalidate = revalidate,
+    )
+    columnar_cache = columnar_cache and cache and os.path.exists(path)
+    
+    if columnar_cache:
         
-        try:
+        table = read_columnar(path, force = force_download)
+        
+        if table is not None:
             
-            url = URLS[query_type]
+            return table.to_pandas()
+    
+    df = project(
+        pd.read_table(path, **read_options(query_type)),
+        query_type,
+    )
+    
+    if columnar_cache:
+        
+        write_columnar(df, path)
+    
+    return df
+
+
+def iter_chunks(query_type, chunksize = None, offset = 0, **kwargs):
+    """
+    Iterates through OmniPath data in data frames of ``chunksize`` rows.
+    The whole data never needs to be loaded into memory at once.
+    
+    :param str query_type:
+        The web service query type to use, as for :py:func:`get`.
+    :param int chunksize:
+        Number of rows in one data frame. If None all data is yielded
+        in one data frame.
+    :param int offset:
+        Skip this many rows at the beginning, without parsing them if
+        the data is read by chunks.
+    :param **kwargs:
+        Passed to :py:func:`get`. If a columnar cache exists the chunks
+        are sliced from the memory mapped cache, otherwise the input
+        file is parsed by chunks and no cache is written.
+    """
+    
+    if chunksize is None:
+        
+        yield get(query_type, **kwargs).iloc[offset:]
+        return
+    
+    columnar_cache = kwargs.pop('columnar_cache', True)
+    path = get_path(query_type, **kwargs)
+    table = (
+        read_columnar(path, force = kwargs.get('force_download', False))
+            if columnar_cache and os.path.exists(path) else
+        None
+    )
+    
+    if table is not None:
+        
+        for start in range(offset, table.num_rows, chunksize):
             
-        except KeyError:
+            yield table.slice(start, chunksize).to_pandas()
+        
+        return
+    
+    with pd.read_table(
+        path,
+        chunksize = chunksize,
+        # the first line is the header
+        skiprows = range(1, offset + 1) if offset else None,
+        **read_options(query_type)
+    ) as reader:
+        
+        for chunk in reader:
             
-            raise NotImplementedError
+            yield project(chunk, query_type)
+
+
+def fetch_all(
+        query_types = None,
+        max_workers = None,
+        parse = True,
+        raise_errors = True,
+        revalidate = False,
+        **kwargs
+    ):
+    """
+    Downloads and parses multiple datasets concurrently in a thread pool.
     
-    if (not os.path.exists(url) or force_download) and cache:
+    :param list query_types:
+        The web service query types to retrieve. By default all in
+        :py:data:`constants.URLS`.
+    :param int max_workers:
+        Number of threads, by default one for each query type.
+    :param bool parse:
+        Return data frames by :py:func:`get`; if False only download
+        the data and return the paths by :py:func:`get_path`.
+    :param bool raise_errors:
+        Raise :py:class:`FetchError` if any of the datasets failed,
+        after all the others have been retrieved. Otherwise the failed
+        ones are only logged and missing from the result.
+    :param bool revalidate:
+        Check if the cached files are up to date by conditional
+        requests, and download again the ones changed on the server.
+    :param **kwargs:
+        Passed to :py:func:`get` or :py:func:`get_path`.
+    
+    :return:
+        Dict of data frames or paths by query type.
+    """
+    
+    query_types = list(dict.fromkeys(query_types or URLS))
+    method = get if parse else get_path
+    results = {}
+    errors = {}
+    
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers = max_workers or len(query_types),
+    ) as executor:
         
-        url = download(url, force_download = force_download)
+        futures = dict(
+            (
+                executor.submit(
+                    method,
+                    query_type,
+                    revalidate = revalidate,
+                    **kwargs
+                ),
+                query_type,
+            )
+            for query_type in query_types
+        )
+        
+        for future in concurrent.futures.as_completed(futures):
+            
+            query_type = futures[future]
+            
+            try:
+                
+                results[query_type] = future.result()
+                log.info('retrieved `%s`', query_type)
+                
+            except Exception as e:
+                
+                log.error('failed to retrieve `%s`: %s', query_type, e)
+                errors[query_type] = e
     
-    df = pd.read_table(url)
+    if errors and raise_errors:
+        
+        raise FetchError(errors, results)
     
-    return df
+    return results
 
 
 def get_interactions(**kwargs):
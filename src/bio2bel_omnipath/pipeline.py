@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Producer/consumer pipeline of threads for loading Bio2BEL OmniPath.
+
+Each stage runs in its own thread, takes the items of the previous
+stage, and passes its results to the next one through a bounded queue:
+a stage producing faster than the next one consumes waits, hence at
+most a few items are in memory at once. Parsing and building records
+is mostly NumPy and pandas code, and the database drivers release the
+GIL while waiting for the database, hence the stages run in parallel.
+Errors in any stage are raised in the consumer of the last stage, and
+leaving the pipeline early stops all stages.
+"""
+
+import queue
+import logging
+import threading
+import contextlib
+
+from .constants import PIPELINE_QUEUE_SIZE
+
+__all__ = [
+    'Stage',
+    'pipeline',
+]
+
+log = logging.getLogger(__name__)
+
+# seconds between checks of the stop signal while waiting on a queue
+POLL_INTERVAL = .1
+
+
+class _Done(object):
+    """
+    Marks the end of the items of a stage.
+    """
+
+
+class _Failure(object):
+    """
+    Carries the exception of a stage to its consumer.
+    """
+    
+    def __init__(self, error):
+        
+        self.error = error
+
+
+class Stage(threading.Thread):
+    """
+    Thread applying ``function`` to each item of ``items`` and putting
+    the results into a bounded queue. Iterating the stage yields the
+    results in order, and raises the exception of the stage if any.
+    """
+    
+    def __init__(
+            self,
+            items,
+            function = None,
+            maxsize = PIPELINE_QUEUE_SIZE,
+            name = None,
+        ):
+        """
+        :param items:
+            Iterable of the input items, e.g. the previous stage.
+        :param function:
+            Function applied to each item, by default the items are
+            passed on as they are, e.g. read in this thread.
+        :param int maxsize:
+            Maximum number of results waiting in the queue.
+        :param str name:
+            Name of the thread.
+        """
+        
+        super().__init__(name = name, daemon = True)
+        
+        self.items = items
+        self.function = function
+        self.queue = queue.Queue(maxsize = maxsize)
+        self.stopped = threading.Event()
+    
+    
+    def run(self):
+        
+        try:
+            
+            for item in self.items:
+                
+                if self.function is not None:
+                    
+                    item = self.function(item)
+                
+                if not self._put(item):
+                    
+                    return
+                    
+        except BaseException as e:
+            
+            log.debug('Stage `%s` failed: %s', self.name, e)
+            self._put(_Failure(e))
+            return
+        
+        self._put(_Done)
+    
+    
+    def _put(self, item):
+        """
+        Puts ``item`` into the queue, waiting while it is full.
+        
+        :return:
+            False if the stage has been stopped meanwhile.
+        """
+        
+        while not self.stopped.is_set():
+            
+            try:
+                
+                self.queue.put(item, timeout = POLL_INTERVAL)
+                return True
+                
+            except queue.Full:
+                
+                pass
+        
+        return False
+    
+    
+    def __iter__(self):
+        
+        while not self.stopped.is_set():
+            
+            try:
+                
+                item = self.queue.get(timeout = POLL_INTERVAL)
+                
+            except queue.Empty:
+                
+                continue
+            
+            if item is _Done:
+                
+                return
+            
+            if isinstance(item, _Failure):
+                
+                raise item.error
+            
+            yield item
+    
+    
+    def stop(self):
+        """
+        Signals the stage to stop; its consumers stop iterating it.
+        """
+        
+        self.stopped.set()
+
+
+@contextlib.contextmanager
+def pipeline(items, *functions, maxsize = PIPELINE_QUEUE_SIZE, name = 'load'):
+    """
+    Context of a pipeline: ``items`` are retrieved in one thread, each
+    of ``functions`` is applied in a further thread, and the results of
+    the last one are iterated by the caller. At exit all threads are
+    stopped and joined, also if the caller has not consumed all items.
+    
+    :param items:
+        Iterable of the input items, e.g. a generator reading chunks.
+    :param functions:
+        Functions applied in sequence, each in its own thread.
+    :param int maxsize:
+        Maximum number of items waiting between two stages.
+    :param str name:
+        Prefix of the names of the threads.
+    
+    :return:
+        Iterator of the results of the last stage.
+    """
+    
+    stages = []
+    
+    for i, function in enumerate((None,) + functions):
+        
+        stage = Stage(
+            items,
+            function = function,
+            maxsize = maxsize,
+            name = '%s-%u' % (name, i),
+        )
+        stage.start()
+        stages.append(stage)
+        items = stage
+    
+    try:
+        
+        yield iter(stages[-1])
+        
+    finally:
+        
+        for stage in stages:
+            
+            stage.stop()
+        
+        for stage in stages:
+            
+            stage.join()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Stage level timing of the database loading for Bio2BEL OmniPath.
+"""
+
+import sys
+import time
+import logging
+import threading
+import contextlib
+import collections
+
+try:
+    
+    import resource
+
+except ImportError:
+    
+    # not available on Windows
+    resource = None
+
+__all__ = [
+    'Profiler',
+    'peak_rss',
+]
+
+log = logging.getLogger(__name__)
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the current process in MiB,
+    or None if it is not available on the platform. This is the peak
+    over the whole lifetime of the process, it never decreases.
+    """
+    
+    if resource is None:
+        
+        return None
+    
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    # bytes on macOS, KiB elsewhere
+    return maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+
+
+class Profiler(object):
+    """
+    Records the wall time and the number of rows processed by the
+    stages of loading, e.g. download, parsing, building records,
+    writing and committing.
+    
+    A stage can be entered many times, e.g. once for each chunk, its
+    time and rows are summed up. Stages can be nested, the time of a
+    stage does not include the time of the stages within it, hence
+    the times of all stages add up to the total time. Stages can be
+    timed in concurrent threads, e.g. by :py:func:`pipeline.pipeline`,
+    then their times overlap and add up to more than the total time.
+    
+    As the peak resident set size is only available for the whole
+    process, the memory use of a stage is recorded as the growth of the
+    process peak while the stage runs, the largest of its entries. A
+    stage not raising the peak above the earlier stages, e.g. one
+    following a larger stage, has zero growth even if it allocated
+    memory. The growth of concurrent stages is attributed to each of
+    them.
+    """
+    
+    def __init__(self):
+        
+        self.stages = collections.OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    
+    @property
+    def _stack(self):
+        """
+        The times spent in nested stages, of the current thread.
+        """
+        
+        if not hasattr(self._local, 'stack'):
+            
+            self._local.stack = []
+        
+        return self._local.stack
+    
+    
+    @contextlib.contextmanager
+    def stage(self, name, rows = 0):
+        """
+        Context manager timing a stage.
+        
+        :param str name:
+            Name of the stage, e.g. `interactions.build`.
+        :param int rows:
+            Number of rows processed; more can be added within the
+            context by :py:meth:`add_rows`.
+        """
+        
+        with self._lock:
+            
+            record = self.stages.setdefault(
+                name,
+                {'seconds': 0., 'rows': 0, 'peak_rss_growth_mb': None},
+            )
+            record['rows'] += rows
+        
+        stack = self._stack
+        rss_before = peak_rss()
+        # time spent in nested stages
+        stack.append(0.)
+        start = time.perf_counter()
+        
+        try:
+            
+            yield
+            
+        finally:
+            
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            
+            with self._lock:
+                
+                record['seconds'] += elapsed - nested
+                
+                if rss_before is not None:
+                    
+                    record['peak_rss_growth_mb'] = max(
+                        record['peak_rss_growth_mb'] or 0.,
+                        peak_rss() - rss_before,
+                    )
+            
+            if stack:
+                
+                stack[-1] += elapsed
+    
+    
+    def add_rows(self, name, rows):
+        """
+        Adds ``rows`` to the number of rows processed by a stage.
+        """
+        
+        with self._lock:
+            
+            self.stages[name]['rows'] += rows
+    
+    
+    def iterate(self, name, iterable):
+        """
+        Iterates through ``iterable`` timing the retrieval of each
+        item as stage ``name``. Items with length, e.g. data frames,
+        are counted as that many rows.
+        """
+        
+        iterator = iter(iterable)
+        
+        while True:
+            
+            with self.stage(name):
+                
+                try:
+                    
+                    item = next(iterator)
+                    
+                except StopIteration:
+                    
+                    return
+                
+                self.add_rows(
+                    name,
+                    len(item) if hasattr(item, '__len__') else 1,
+                )
+            
+            yield item
+    
+    
+    def report(self):
+        """
+        Returns a list of dicts with the name, time in seconds, number
+        of rows, rows per second and the growth of the peak resident
+        set size of the process during the stage in MiB, None if not
+        available, in the order of their first start.
+        """
+        
+        return [
+            {
+                'stage': name,
+                'seconds': record['seconds'],
+                'rows': record['rows'],
+                'rows_per_sec': (
+                    record['rows'] / record['seconds']
+                        if record['rows'] and record['seconds'] else
+                    None
+                ),
+                'peak_rss_growth_mb': record['peak_rss_growth_mb'],
+            }
+            for name, record in self.stages.items()
+        ]
+    
+    
+    def log(self):
+        """
+        Logs the time, rows, rows per second and memory use of each
+        stage.
+        """
+        
+        for stage in self.report():
+            
+            log.info(
+                'Stage `%s`: %.03f s, %u rows, %s rows/s, '
+                'peak RSS growth %s MiB.',
+                stage['stage'],
+                stage['seconds'],
+                stage['rows'],
+                (
+                    '%.0f' % stage['rows_per_sec']
+                        if stage['rows_per_sec'] is not None else
+                    'n/a'
+                ),
+                (
+                    '%.01f' % stage['peak_rss_growth_mb']
+                        if stage['peak_rss_growth_mb'] is not None else
+                    'n/a'
+                ),
+            )
@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Materialized statistics of the Bio2BEL OmniPath database.
+
+The statistics are stored in :py:class:`models.Statistic` by groups,
+e.g. the number of records of one table, or the number of interactions
+by type. Each group depends on some tables: writing those deletes the
+group, by :py:func:`invalidate`, and :py:func:`refresh` computes the
+missing groups again, hence after a change only the statistics of the
+changed tables are recomputed. The groups computed are recorded in the
+`computed` category, with their number of statistics.
+"""
+
+import collections
+import logging
+
+import sqlalchemy
+
+from . import models
+
+__all__ = [
+    'GROUPS',
+    'invalidate',
+    'refresh',
+    'read',
+    'summary',
+    'count_summary',
+    'detailed_summary',
+]
+
+log = logging.getLogger(__name__)
+
+COMPUTED = 'computed'
+TABLES = 'tables'
+
+Group = collections.namedtuple(
+    'Group',
+    ['name', 'category', 'key', 'tables', 'compute', 'key_type'],
+)
+Group.__doc__ = """
+A group of statistics: its ``name``, the ``category`` of its statistics,
+their ``key`` if the group has only one, the names of the ``tables`` it
+depends on, the function ``compute`` returning its rows of keys and
+values from a connection, and the ``key_type`` to convert the keys to.
+"""
+
+
+def _count(table):
+    """
+    Returns a function counting the records of ``table``.
+    """
+    
+    return lambda connection: connection.execute(
+        sqlalchemy.select([
+            sqlalchemy.literal(table.name),
+            sqlalchemy.func.count(),
+        ]).select_from(table)
+    ).fetchall()
+
+
+def _count_by(name_column, from_clause):
+    """
+    Returns a function counting the records of ``from_clause`` by the
+    values of ``name_column``.
+    """
+    
+    return lambda connection: connection.execute(
+        sqlalchemy.select([name_column, sqlalchemy.func.count()]).
+        select_from(from_clause).
+        group_by(name_column)
+    ).fetchall()
+
+
+def _degrees(*sides):
+    """
+    Returns a function computing the distribution of the number of
+    interactions of the entities, with ``sides`` of the interactions
+    as their ends, the entities without interactions of degree zero.
+    """
+    
+    interaction = models.Interaction.__table__
+    entity = models.MolecularEntity.__table__
+    
+    def compute(connection):
+        
+        ends = sqlalchemy.union_all(*(
+            sqlalchemy.select([interaction.c[side].label('entity_id')])
+            for side in sides
+        )).alias('ends')
+        degrees = sqlalchemy.select([
+            sqlalchemy.func.count().label('degree'),
+        ]).select_from(ends).group_by(ends.c.entity_id).alias('degrees')
+        distribution = dict(
+            connection.execute(
+                sqlalchemy.select([
+                    degrees.c.degree,
+                    sqlalchemy.func.count(),
+                ]).group_by(degrees.c.degree)
+            ).fetchall()
+        )
+        n_entities = connection.execute(
+            sqlalchemy.select([sqlalchemy.func.count()]).select_from(entity)
+        ).scalar()
+        isolated = n_entities - sum(distribution.values())
+        
+        if isolated > 0:
+            
+            distribution[0] = isolated
+        
+        return sorted(distribution.items())
+    
+    return compute
+
+
+def _groups():
+    """
+    Yields the groups of statistics.
+    """
+    
+    for table in models.Base.metadata.sorted_tables:
+        
+        if table.name in (
+            models.STATISTIC_TABLE_NAME,
+            models.FINGERPRINT_TABLE_NAME,
+            models.CHECKPOINT_TABLE_NAME,
+        ):
+            
+            continue
+        
+        yield Group(
+            name = '%s:%s' % (TABLES, table.name),
+            category = TABLES,
+            key = table.name,
+            tables = (table.name,),
+            compute = _count(table),
+            key_type = str,
+        )
+    
+    interaction = models.Interaction.__table__
+    interaction_type = models.InteractionType.__table__
+    ptm = models.Ptm.__table__
+    ptm_type = models.PtmType.__table__
+    entity = models.MolecularEntity.__table__
+    taxonomy = models.Taxonomy.__table__
+    resource = models.Resource.__table__
+    annotation = models.Annotation.__table__
+    
+    for category, name_column, from_clause, key_type in (
+        (
+            'interaction_types',
+            interaction_type.c.interaction_type,
+            interaction.join(
+                interaction_type,
+                interaction.c.type_id == interaction_type.c.id,
+            ),
+            str,
+        ),
+        (
+            'ptm_types',
+            ptm_type.c.ptm_type,
+            ptm.join(
+                ptm_type,
+                ptm.c.modification_type_id == ptm_type.c.id,
+            ),
+            str,
+        ),
+        (
+            'taxons',
+            taxonomy.c.ncbi_taxonomy_id,
+            entity.join(taxonomy, entity.c.taxon_id == taxonomy.c.id),
+            int,
+        ),
+        (
+            'interaction_resources',
+            resource.c.resource_name,
+            models.assoc_int_res.join(resource),
+            str,
+        ),
+        (
+            'ptm_resources',
+            resource.c.resource_name,
+            models.assoc_ptm_res.join(resource),
+            str,
+        ),
+        (
+            'complex_resources',
+            resource.c.resource_name,
+            models.assoc_cpx_res.join(resource),
+            str,
+        ),
+        (
+            'annotation_resources',
+            resource.c.resource_name,
+            annotation.join(
+                resource,
+                annotation.c.resource_id == resource.c.id,
+            ),
+            str,
+        ),
+    ):
+        
+        yield Group(
+            name = category,
+            category = category,
+            key = None,
+            tables = (from_clause.left.name, from_clause.right.name),
+            compute = _count_by(name_column, from_clause),
+            key_type = key_type,
+        )
+    
+    for category, sides in (
+        ('degrees', ('source_id', 'target_id')),
+        ('out_degrees', ('source_id',)),
+        ('in_degrees', ('target_id',)),
+    ):
+        
+        yield Group(
+            name = category,
+            category = category,
+            key = None,
+            tables = (interaction.name, entity.name),
+            compute = _degrees(*sides),
+            key_type = int,
+        )
+
+
+GROUPS = tuple(_groups())
+GROUPS_BY_NAME = dict((group.name, group) for group in GROUPS)
+KEY_TYPES = dict((group.category, group.key_type) for group in GROUPS)
+
+
+def _depending(tables = None):
+    """
+    Returns the groups depending on any of ``tables``, all if None.
+    """
+    
+    return [
+        group
+        for group in GROUPS
+        if tables is None or set(group.tables) & set(tables)
+    ]
+
+
+def _rows_of(groups):
+    """
+    Returns a condition selecting the statistics of ``groups`` and their
+    records in the `computed` category.
+    """
+    
+    table = models.Statistic.__table__
+    whole = [group.category for group in groups if group.key is None]
+    keyed = [group.key for group in groups if group.key is not None]
+    
+    return sqlalchemy.or_(
+        table.c.category.in_(whole),
+        sqlalchemy.and_(table.c.category == TABLES, table.c.key.in_(keyed)),
+        sqlalchemy.and_(
+            table.c.category == COMPUTED,
+            table.c.key.in_([group.name for group in groups]),
+        ),
+    )
+
+
+def invalidate(connection, tables = None):
+    """
+    Deletes the statistics depending on ``tables``, all if None. Called
+    in the transaction writing the tables, the statistics are never
+    outdated, only missing.
+    
+    :param connection:
+        A SQLAlchemy connection.
+    :param tables:
+        Names of the written tables.
+    """
+    
+    groups = _depending(tables)
+    
+    if groups:
+        
+        connection.execute(
+            models.Statistic.__table__.delete().where(_rows_of(groups))
+        )
+
+
+def refresh(connection, tables = None, missing = True):
+    """
+    Computes and stores the statistics depending on ``tables``, all if
+    None.
+    
+    :param connection:
+        A SQLAlchemy connection.
+    :param tables:
+        Names of tables.
+    :param bool missing:
+        Compute only the groups not computed since their tables were
+        written.
+    
+    :return:
+        The names of the computed groups.
+    """
+    
+    table = models.Statistic.__table__
+    groups = _depending(tables)
+    
+    if missing:
+        
+        computed = read(connection, [COMPUTED]).get(COMPUTED, {})
+        groups = [group for group in groups if group.name not in computed]
+    
+    if not groups:
+        
+        return []
+    
+    log.info(
+        'Computing statistics: %s.',
+        ', '.join(group.name for group in groups),
+    )
+    records = []
+    
+    for group in groups:
+        
+        rows = group.compute(connection)
+        records.extend(
+            {'category': group.category, 'key': str(key), 'value': value}
+            for key, value in rows
+        )
+        records.append({
+            'category': COMPUTED,
+            'key': group.name,
+            'value': len(rows),
+        })
+    
+    connection.execute(table.delete().where(_rows_of(groups)))
+    connection.execute(table.insert(), records)
+    
+    return [group.name for group in groups]
+
+
+def read(connection, categories = None):
+    """
+    Reads the statistics by one query.
+    
+    :param connection:
+        A SQLAlchemy connection.
+    :param categories:
+        The categories to read, by default all.
+    
+    :return:
+        Dict of dicts of the values by key, by category. The keys of
+        taxons and degrees are integers.
+    """
+    
+    table = models.Statistic.__table__
+    query = sqlalchemy.select([table.c.category, table.c.key, table.c.value])
+    
+    if categories is not None:
+        
+        query = query.where(table.c.category.in_(list(categories)))
+    
+    result = collections.defaultdict(dict)
+    
+    for category, key, value in connection.execute(query):
+        
+        result[category][KEY_TYPES.get(category, str)(key)] = value
+    
+    return dict(result)
+
+
+def _summarize(statistics):
+    """
+    Returns the numbers of records of :py:data:`models.SUMMARY_TABLE_NAMES`
+    from the statistics, None if any of them is missing.
+    """
+    
+    computed = statistics.get(COMPUTED, {})
+    tables = statistics.get(TABLES, {})
+    
+    if any(
+        '%s:%s' % (TABLES, table_name) not in computed
+        for _, table_name in models.SUMMARY_TABLE_NAMES
+    ):
+        
+        return None
+    
+    return dict(
+        (name, tables.get(table_name, 0))
+        for name, table_name in models.SUMMARY_TABLE_NAMES
+    )
+
+
+def summary(connection):
+    """
+    Returns the numbers of interactions, PTMs, proteins, complexes and
+    annotations, from the statistics by one query, or by counting the
+    records if those are missing.
+    """
+    
+    result = _summarize(read(connection, [TABLES, COMPUTED]))
+    
+    return count_summary(connection) if result is None else result
+
+
+def count_summary(connection):
+    """
+    Returns the numbers of the summary by counting the records, without
+    the statistics, e.g. in databases created without their table.
+    """
+    
+    return dict(
+        (
+            name,
+            connection.execute(
+                sqlalchemy.select([sqlalchemy.func.count()]).
+                select_from(models.Base.metadata.tables[table_name])
+            ).scalar(),
+        )
+        for name, table_name in models.SUMMARY_TABLE_NAMES
+    )
+
+
+def detailed_summary(connection):
+    """
+    Returns the summary with all statistics: the numbers of records by
+    table, of interactions and PTMs by type, entities by taxon, records
+    by resource, and the distributions of the number of interactions of
+    the entities. Read by one query; the missing statistics are
+    computed and stored first.
+    
+    :return:
+        Dict of the numbers as in :py:func:`summary` and dicts of the
+        statistics by category.
+    """
+    
+    statistics = read(connection)
+    
+    if len(statistics.get(COMPUTED, {})) < len(GROUPS):
+        
+        refresh(connection)
+        statistics = read(connection)
+    
+    statistics.pop(COMPUTED)
+    result = _summarize(dict(statistics, computed = GROUPS_BY_NAME))
+    result.update(statistics)
+    
+    return result
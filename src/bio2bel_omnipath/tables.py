@@ -0,0 +1,922 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  This file is part of the `bio2bel_omnipath` python module
+#
+#  Copyright (c) 2019
+#  Uniklinik RWTH Aachen
+#  Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#
+#  Distributed under the MIT License.
+#  See accompanying file LICENSE or copy at
+#      https://spdx.org/licenses/MIT.html
+#
+#  Website: http://omnipathdb.org/
+#
+
+"""
+Vectorized preprocessing of OmniPath data frames into integer keyed
+table records for Bio2BEL OmniPath.
+"""
+
+import logging
+import collections
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+from .constants import DEFAULT_TAXID
+from . import models
+from . import parser
+
+__all__ = [
+    'TableBuilder',
+    'INTERACTION_FIELDS',
+    'PTM_FIELDS',
+    'COMPLEX_FIELDS',
+    'ANNOTATION_FIELDS',
+]
+
+log = logging.getLogger(__name__)
+
+# the columns of the data frames, in the order of `parser.SCHEMAS`
+INTERACTION_FIELDS = (
+    'source', 'target', 'source_genesymbol', 'target_genesymbol',
+    'is_directed', 'is_stimulation', 'is_inhibition',
+    'sources', 'references', 'type',
+    'source_taxid', 'target_taxid',
+)
+PTM_FIELDS = (
+    'source', 'target', 'source_genesymbol', 'target_genesymbol',
+    'residue_type', 'residue_offset', 'modification',
+    'sources', 'references', 'taxid',
+)
+COMPLEX_FIELDS = (
+    'name', 'components', 'component_genesymbols', 'stoichiometry',
+    'sources', 'references',
+)
+ANNOTATION_FIELDS = (
+    'primary_id', 'genesymbol', 'entity_type',
+    'source', 'label', 'value', 'record_id',
+)
+
+# the prefix of the IDs of complexes in the annotations
+COMPLEX_PREFIX = 'COMPLEX:'
+# the annotations of other entities, e.g. small molecules, are skipped
+ANNOTATED_ENTITY_TYPES = ('protein', 'mirna', 'complex')
+
+# columns not part of the natural key, hence their values might change
+UPDATABLE_COLUMNS = {
+    models.MolecularEntity.__tablename__: (
+        'secondary_id',
+        'taxon_id',
+        'type_id',
+    ),
+    models.Ptm.__tablename__: (
+        'modification_type_id',
+    ),
+    models.Complex.__tablename__: (
+        'name',
+        'stoichiometry',
+    ),
+}
+
+INT_TYPE_TO_ENTITY_TYPE = {
+    'PPI': ('protein', 'protein'),
+    'TF': ('protein', 'protein'),
+    'MTI': ('mirna', 'protein'),
+    'TFM': ('protein', 'mirna'),
+}
+
+
+class TableBuilder(object):
+    """
+    Turns OmniPath data frames into data frames of table records with
+    integer primary keys, ready to be written into the database.
+    
+    Records are deduplicated by their natural keys with
+    :py:func:`pandas.factorize`, the first occurrence of each key
+    provides the record. The keys are kept across the data frames
+    processed by the same instance, hence the PTMs refer to the
+    entities, references and resources created for the interactions,
+    and data can be processed in chunks. To keep this state compact,
+    only 64 bit hashes of the natural keys are stored.
+    
+    Keys are compared only by their hashes, hence two distinct keys with
+    the same hash would be silently merged into one record. Collisions
+    are not detected, their probability is bounded by ``n ** 2 / 2 **
+    65`` for ``n`` distinct keys in a table: below 1e-6 for the five
+    million records of the largest OmniPath table, but growing with the
+    square of the number of records.
+    """
+    
+    def __init__(self, first_ids = None, track = False):
+        """
+        :param dict first_ids:
+            The first primary key to assign in each table, by table name.
+            By default keys start from 1.
+        :param bool track:
+            Keep track of which records seeded from the database by
+            :py:meth:`seed` occur in the processed data, in order to find
+            the removed and changed ones.
+        """
+        
+        self.next_ids = dict(first_ids or {})
+        self.track = track
+        self.keys = {}
+        self.ids = {}
+        self.seen = {}
+        self.existing = {}
+        self.revisited = collections.defaultdict(list)
+    
+    
+    def assign_ids(self, table, keys):
+        """
+        Assigns primary keys to the records identified by natural keys.
+        
+        :param table:
+            A SQLAlchemy table.
+        :param keys:
+            An array, ``pandas.Index`` or ``pandas.MultiIndex`` with the
+            natural key of each record.
+        
+        :return:
+            Tuple of an array with the primary key of each element of
+            ``keys``, an array with the positions of the first
+            occurrences of keys not seen before and, if tracking, an
+            array with the positions of the first occurrences of seeded
+            keys which have not occurred before.
+        """
+        
+        codes, uniques = pd.factorize(self.hash_keys(keys))
+        uniques = pd.Index(uniques)
+        known = self.keys.get(table.name, uniques[:0])
+        known_ids = self.ids.get(table.name, np.array([], dtype = np.int64))
+        
+        pos = known.get_indexer(uniques)
+        new = pos == -1
+        n_new = new.sum()
+        next_id = self.next_ids.get(table.name, 1)
+        
+        ids = np.empty(len(uniques), dtype = np.int64)
+        ids[~new] = known_ids[pos[~new]]
+        ids[new] = next_id + np.arange(n_new)
+        
+        self.next_ids[table.name] = next_id + n_new
+        self.keys[table.name] = known.append(uniques[new])
+        self.ids[table.name] = np.concatenate([known_ids, ids[new]])
+        
+        _, first = np.unique(codes, return_index = True)
+        revisit = first[:0]
+        
+        if self.track and table.name in self.seen:
+            
+            seen = self.seen[table.name]
+            old = pos[~new]
+            revisit = first[~new][~seen[old]]
+            seen[old] = True
+            self.seen[table.name] = np.concatenate([
+                seen,
+                np.ones(n_new, dtype = bool),
+            ])
+        
+        return ids[codes], first[new], revisit
+    
+    
+    def seed(self, connection):
+        """
+        Loads the natural keys and primary keys of all records in the
+        database, so the records processed later refer to them and only
+        the missing ones are created. If tracking, the existing records
+        are kept in ``existing``, without their natural keys.
+        
+        :param connection:
+            A SQLAlchemy connection.
+        """
+        
+        for table, key_columns, query in self._seed_queries():
+            
+            existing = pd.DataFrame.from_records(
+                connection.execute(query).fetchall(),
+                columns = query.columns.keys(),
+            )
+            
+            if table.name in models.ASSOC_TABLE_NAMES:
+                
+                # association records have no primary key
+                existing['id'] = np.arange(len(existing))
+            
+            keys = (
+                pd.MultiIndex.from_frame(existing[key_columns])
+                    if len(key_columns) > 1 else
+                existing[key_columns[0]].values
+            )
+            
+            self.keys[table.name] = pd.Index(self.hash_keys(keys))
+            self.ids[table.name] = existing.id.values.astype(np.int64)
+            
+            if self.track:
+                
+                self.seen[table.name] = np.zeros(len(existing), dtype = bool)
+                self.existing[table.name] = existing.drop(
+                    columns = [
+                        c for c in key_columns if c not in table.c
+                    ],
+                )
+    
+    
+    @staticmethod
+    def _seed_queries():
+        """
+        Yields tuples of tables, the names of their natural key columns
+        and the queries selecting the primary keys, natural keys and
+        other columns of their records.
+        """
+        
+        source = models.MolecularEntity.__table__.alias('source')
+        target = models.MolecularEntity.__table__.alias('target')
+        
+        for model, key in (
+            (models.EntityType, 'entity_type'),
+            (models.Taxonomy, 'ncbi_taxonomy_id'),
+            (models.MolecularEntity, 'primary_id'),
+            (models.InteractionType, 'interaction_type'),
+            (models.PtmType, 'ptm_type'),
+            (models.Resource, 'resource_name'),
+            (models.Complex, 'components'),
+            (models.AnnotationLabel, 'label'),
+            (models.AnnotationValue, 'value'),
+        ):
+            
+            table = model.__table__
+            
+            yield table, [key], sqlalchemy.select([table])
+        
+        # the PubMed IDs are processed as 64 bit integers
+        table = models.Reference.__table__
+        
+        yield table, ['pubmed_id'], sqlalchemy.select([table])
+        
+        table = models.Interaction.__table__
+        int_type = models.InteractionType.__table__
+        
+        yield (
+            table,
+            [
+                'source', 'target', 'is_directed',
+                'is_stimulation', 'is_inhibition', 'interaction_type',
+            ],
+            sqlalchemy.select([
+                table,
+                source.c.primary_id.label('source'),
+                target.c.primary_id.label('target'),
+                int_type.c.interaction_type,
+            ]).select_from(
+                table.
+                join(source, table.c.source_id == source.c.id).
+                join(target, table.c.target_id == target.c.id).
+                join(int_type, table.c.type_id == int_type.c.id)
+            )
+        )
+        
+        table = models.Ptm.__table__
+        
+        yield (
+            table,
+            ['source', 'target', 'residue_type', 'sequence_offset'],
+            sqlalchemy.select([
+                table,
+                source.c.primary_id.label('source'),
+                target.c.primary_id.label('target'),
+            ]).select_from(
+                table.
+                join(source, table.c.source_id == source.c.id).
+                join(target, table.c.target_id == target.c.id)
+            )
+        )
+        
+        for name in models.ASSOC_TABLE_NAMES:
+            
+            table = models.Base.metadata.tables[name]
+            
+            yield table, list(table.c.keys()), sqlalchemy.select([table])
+    
+    
+    def removed(self, table):
+        """
+        Returns the records seeded from the database which have not
+        occurred in the processed data, as a data frame. Requires tracking.
+        """
+        
+        existing = self.existing.get(table.name)
+        
+        if existing is None:
+            
+            return None
+        
+        return existing[~self.seen[table.name][:len(existing)]]
+    
+    
+    def changed(self, table):
+        """
+        Returns the records seeded from the database which occurred in
+        the processed data with different values in their non-key
+        columns, as a data frame with the new values. Requires tracking.
+        """
+        
+        existing = self.existing.get(table.name)
+        revisited = self.revisited.get(table.name)
+        columns = UPDATABLE_COLUMNS.get(table.name)
+        
+        if existing is None or not revisited or not columns:
+            
+            return None
+        
+        revisited = pd.concat(revisited, ignore_index = True)
+        columns = ['id'] + list(columns)
+        merged = revisited[columns].merge(
+            existing[columns],
+            on = 'id',
+            suffixes = ('', '_old'),
+        )
+        
+        differs = np.zeros(len(merged), dtype = bool)
+        
+        for column in columns:
+            
+            if column == 'id':
+                
+                continue
+            
+            new = merged[column]
+            old = merged['%s_old' % column]
+            differs |= ~((new == old) | (new.isna() & old.isna())).values
+        
+        return merged.loc[differs, columns]
+    
+    
+    @staticmethod
+    def hash_keys(keys):
+        """
+        Returns an array of 64 bit hashes of natural keys. Distinct keys
+        may have the same hash, see the collision bound in
+        :py:class:`TableBuilder`.
+        
+        :param keys:
+            An array, ``pandas.Index`` or ``pandas.MultiIndex``.
+        """
+        
+        if isinstance(keys, pd.MultiIndex):
+            
+            return pd.util.hash_pandas_object(keys, index = False).values
+        
+        return pd.util.hash_array(np.asarray(keys))
+    
+    
+    def associations(self, table, parent_ids, child_ids):
+        """
+        Creates the records of an association table which have not been
+        created before.
+        
+        :param table:
+            A SQLAlchemy table with two columns, referring to the parent
+            and the child.
+        :param parent_ids,child_ids:
+            Arrays of equal length with the primary keys of the parents
+            and the children.
+        """
+        
+        parent_ids = np.asarray(parent_ids)
+        child_ids = np.asarray(child_ids)
+        parent_col, child_col = (c.name for c in table.columns)
+        
+        _, new, _ = self.assign_ids(
+            table,
+            pd.MultiIndex.from_arrays([parent_ids, child_ids]),
+        )
+        
+        return pd.DataFrame({
+            parent_col: parent_ids[new],
+            child_col: child_ids[new],
+        })
+    
+    
+    def records(self, table, keys, **columns):
+        """
+        Assigns primary keys and creates the records not seen before.
+        If tracking, the first occurrences of seeded records are collected
+        in ``revisited``.
+        
+        :param table:
+            A SQLAlchemy table.
+        :param keys:
+            Natural keys as in :py:meth:`assign_ids`.
+        :param **columns:
+            Arrays or series of the same length as ``keys`` with the
+            values of the columns. The values of each record are taken
+            from the first occurrence of its key.
+        
+        :return:
+            Tuple of the primary keys of each element of ``keys`` and a
+            data frame of the new records.
+        """
+        
+        ids, new, revisit = self.assign_ids(table, keys)
+        
+        def select(positions):
+            
+            return pd.DataFrame(
+                dict(
+                    (
+                        (name, np.asarray(values)[positions])
+                        for name, values in columns.items()
+                    ),
+                    id = ids[positions],
+                )
+            )
+        
+        if len(revisit):
+            
+            self.revisited[table.name].append(select(revisit))
+        
+        return ids, select(new)
+    
+    
+    def categories(self, table, column, values):
+        """
+        Creates the records of a table with one natural key column from
+        the distinct elements of ``values``, e.g. a categorical column
+        of millions of rows with a few thousand distinct values, each
+        of them hashed only once. ``values`` must not contain NAs.
+        
+        :return:
+            Tuple of the primary keys of each element of ``values`` and
+            a data frame of the new records.
+        """
+        
+        values = pd.Categorical(values).remove_unused_categories()
+        categories = np.asarray(values.categories, dtype = object)
+        
+        ids, new = self.records(table, categories, **{column: categories})
+        
+        return ids[values.codes], new
+    
+    
+    def new_ids(self, table, n):
+        """
+        Assigns ``n`` new primary keys in ``table``, for records never
+        looked up by their natural keys, hence these are not kept.
+        """
+        
+        next_id = self.next_ids.get(table.name, 1)
+        self.next_ids[table.name] = next_id + n
+        
+        return next_id + np.arange(n, dtype = np.int64)
+    
+    
+    def entities(self, primary_id, secondary_id, taxid, entity_type):
+        """
+        Creates the entities, taxons and entity types. Arguments are
+        series of equal length. Returns the primary keys of the entities
+        and a dict of data frames by table name.
+        """
+        
+        tables = {}
+        
+        entity_type_ids, tables[models.EntityType.__tablename__] = (
+            self.records(
+                models.EntityType.__table__,
+                entity_type,
+                entity_type = entity_type,
+            )
+        )
+        
+        taxon_ids, tables[models.Taxonomy.__tablename__] = self.records(
+            models.Taxonomy.__table__,
+            taxid,
+            ncbi_taxonomy_id = taxid,
+        )
+        
+        entity_ids, tables[models.MolecularEntity.__tablename__] = (
+            self.records(
+                models.MolecularEntity.__table__,
+                primary_id,
+                primary_id = primary_id,
+                secondary_id = secondary_id,
+                taxon_id = taxon_ids,
+                type_id = entity_type_ids,
+            )
+        )
+        
+        return entity_ids, tables
+    
+    
+    def paired_entities(self, df, source_type, target_type, taxid = None):
+        """
+        Creates the source and target entities of the records in ``df``.
+        Sources and targets are processed in the order of rows, the
+        source of each row coming before its target.
+        """
+        
+        n = len(df)
+        sides = []
+        
+        for side, entity_type in (
+            ('source', source_type),
+            ('target', target_type),
+        ):
+            
+            sides.append(
+                pd.DataFrame({
+                    'primary_id': df[side].values,
+                    'secondary_id': df['%s_genesymbol' % side].values,
+                    'taxid': (
+                        df['%s_taxid' % side] if taxid is None else taxid
+                    ).values,
+                    'entity_type': np.asarray(entity_type),
+                    'order': np.arange(n) * 2 + len(sides),
+                })
+            )
+        
+        both = pd.concat(sides, ignore_index = True)
+        both = both.sort_values('order', kind = 'mergesort')
+        
+        entity_ids, tables = self.entities(
+            both.primary_id.values,
+            both.secondary_id.values,
+            both.taxid.values,
+            both.entity_type.values,
+        )
+        
+        # back to the order of concatenation: sources, then targets
+        entity_ids[both.index.values] = entity_ids.copy()
+        
+        return entity_ids[:n], entity_ids[n:], tables
+    
+    
+    def references(self, model, ids, references, resources):
+        """
+        Creates the references and resources from the semicolon separated
+        ``references`` and ``resources`` series and the association
+        records linking them to the records of ``model`` with primary
+        keys ``ids``. The PubMed IDs are converted to integers.
+        """
+        
+        tables = {}
+        mapper = model.__mapper__
+        ids = np.asarray(ids)
+        
+        for attr, exploded, target, column in (
+            (
+                'references',
+                parser.explode_pubmed_ids(references),
+                models.Reference,
+                'pubmed_id',
+            ),
+            (
+                'resources',
+                parser.explode(resources),
+                models.Resource,
+                'resource_name',
+            ),
+        ):
+            
+            rows, elements = exploded
+            # each distinct element is hashed only once
+            distinct, inverse = np.unique(elements, return_inverse = True)
+            
+            target_ids, tables[target.__tablename__] = self.records(
+                target.__table__,
+                distinct,
+                **{column: distinct}
+            )
+            
+            assoc = mapper.relationships[attr].secondary
+            
+            tables[assoc.name] = self.associations(
+                assoc,
+                ids[rows],
+                target_ids[inverse],
+            )
+        
+        return tables
+    
+    
+    def interactions(self, df):
+        """
+        Processes a data frame of interactions as provided by
+        :py:func:`parser.get_interactions`.
+        
+        :return:
+            Dict of data frames of new records by table name.
+        """
+        
+        df = df.set_axis(INTERACTION_FIELDS, axis = 1)
+        df = df.reset_index(drop = True)
+        
+        log.info('Preprocessing %u interaction records.', len(df))
+        
+        source_ids, target_ids, tables = self.paired_entities(
+            df,
+            source_type = df.type.map({
+                typ: entity_types[0]
+                for typ, entity_types in INT_TYPE_TO_ENTITY_TYPE.items()
+            }).values,
+            target_type = df.type.map({
+                typ: entity_types[1]
+                for typ, entity_types in INT_TYPE_TO_ENTITY_TYPE.items()
+            }).values,
+        )
+        
+        type_ids, tables[models.InteractionType.__tablename__] = (
+            self.records(
+                models.InteractionType.__table__,
+                df.type.values,
+                interaction_type = df.type.values,
+            )
+        )
+        
+        interaction_keys = pd.MultiIndex.from_arrays([
+            df.source.values,
+            df.target.values,
+            df.is_directed.values,
+            df.is_stimulation.values,
+            df.is_inhibition.values,
+            df.type.values,
+        ])
+        
+        interaction_ids, tables[models.Interaction.__tablename__] = (
+            self.records(
+                models.Interaction.__table__,
+                interaction_keys,
+                source_id = source_ids,
+                target_id = target_ids,
+                is_directed = df.is_directed.values,
+                is_stimulation = df.is_stimulation.values,
+                is_inhibition = df.is_inhibition.values,
+                type_id = type_ids,
+            )
+        )
+        
+        tables.update(
+            self.references(
+                models.Interaction,
+                interaction_ids,
+                df.references,
+                df.sources,
+            )
+        )
+        
+        return tables
+    
+    
+    def ptms(self, df):
+        """
+        Processes a data frame of enzyme-substrate relationships as
+        provided by :py:func:`parser.get_ptms`.
+        
+        :return:
+            Dict of data frames of new records by table name.
+        """
+        
+        df = df.set_axis(PTM_FIELDS, axis = 1)
+        df = df.reset_index(drop = True)
+        
+        log.info('Preprocessing %u PTM records.', len(df))
+        
+        source_ids, target_ids, tables = self.paired_entities(
+            df,
+            source_type = 'protein',
+            target_type = 'protein',
+            taxid = df.taxid,
+        )
+        
+        mod_type_ids, tables[models.PtmType.__tablename__] = self.records(
+            models.PtmType.__table__,
+            df.modification.values,
+            ptm_type = df.modification.values,
+        )
+        
+        ptm_keys = pd.MultiIndex.from_arrays([
+            df.source.values,
+            df.target.values,
+            df.residue_type.values,
+            df.residue_offset.values,
+        ])
+        
+        ptm_ids, tables[models.Ptm.__tablename__] = self.records(
+            models.Ptm.__table__,
+            ptm_keys,
+            source_id = source_ids,
+            target_id = target_ids,
+            sequence_offset = df.residue_offset.values,
+            residue_type = df.residue_type.values,
+            modification_type_id = mod_type_ids,
+        )
+        
+        tables.update(
+            self.references(
+                models.Ptm,
+                ptm_ids,
+                df.references,
+                df.sources,
+            )
+        )
+        
+        return tables
+    
+    
+    def complexes(self, df):
+        """
+        Processes a data frame of protein complexes as provided by
+        :py:func:`parser.get_complexes`. The components are created as
+        proteins of :py:data:`constants.DEFAULT_TAXID`.
+        
+        :return:
+            Dict of data frames of new records by table name.
+        """
+        
+        df = df.set_axis(COMPLEX_FIELDS, axis = 1)
+        df = df[df.components.notna()].reset_index(drop = True)
+        
+        log.info('Preprocessing %u complex records.', len(df))
+        
+        components = df.components.str.split('_')
+        genesymbols = df.component_genesymbols.str.split('_')
+        # the UniProt IDs if the Gene Symbols are missing or do not match
+        genesymbols = genesymbols.where(
+            genesymbols.str.len() == components.str.len(),
+            components,
+        )
+        components = components.explode()
+        n = len(components)
+        
+        entity_ids, tables = self.entities(
+            components.values,
+            genesymbols.explode().values,
+            np.full(n, DEFAULT_TAXID),
+            np.full(n, 'protein', dtype = object),
+        )
+        
+        complex_ids, tables[models.Complex.__tablename__] = self.records(
+            models.Complex.__table__,
+            df.components.values,
+            components = df.components.values,
+            name = df.name.values,
+            stoichiometry = df.stoichiometry.values,
+        )
+        
+        tables[models.assoc_cpx_ent.name] = self.associations(
+            models.assoc_cpx_ent,
+            complex_ids[components.index.values],
+            entity_ids,
+        )
+        
+        tables.update(
+            self.references(
+                models.Complex,
+                complex_ids,
+                df.references,
+                df.sources,
+            )
+        )
+        
+        return tables
+    
+    
+    def annotations(self, df):
+        """
+        Processes a data frame of annotations as provided by
+        :py:func:`parser.get_annotations`, into key-value records
+        referring to the distinct labels and values. The entities are
+        created as of :py:data:`constants.DEFAULT_TAXID`, the complexes
+        missing from the complexes dataset by their components only.
+        
+        The annotation records are not looked up by their natural keys,
+        each row of the data becomes a new record; to replace all the
+        annotations in the database the existing ones must be deleted.
+        
+        :return:
+            Dict of data frames of new records by table name.
+        """
+        
+        df = df.set_axis(ANNOTATION_FIELDS, axis = 1)
+        keep = (
+            df.entity_type.isin(ANNOTATED_ENTITY_TYPES) &
+            df.primary_id.notna() &
+            df.source.notna() &
+            df.label.notna()
+        ).values
+        
+        if not keep.all():
+            
+            log.info(
+                'Skipping %u annotations of other entity types '
+                'or without ID, resource or label.',
+                (~keep).sum(),
+            )
+            df = df[keep]
+        
+        df = df.reset_index(drop = True)
+        n = len(df)
+        
+        log.info('Preprocessing %u annotation records.', n)
+        
+        tables = {}
+        # the entities and complexes are processed once for each ID
+        primary_ids = pd.Categorical(df.primary_id).remove_unused_categories()
+        categories = np.asarray(primary_ids.categories, dtype = object)
+        codes = primary_ids.codes
+        _, first = np.unique(codes, return_index = True)
+        is_complex = pd.Series(categories).str.startswith(COMPLEX_PREFIX).values
+        entity_id = np.full(n, None, dtype = object)
+        complex_id = np.full(n, None, dtype = object)
+        
+        if (~is_complex).any():
+            
+            rows = first[~is_complex]
+            genesymbols = np.asarray(df.genesymbol.values[rows], dtype = object)
+            
+            ids, tables = self.entities(
+                categories[~is_complex],
+                np.where(
+                    pd.isna(genesymbols),
+                    categories[~is_complex],
+                    genesymbols,
+                ),
+                np.full(len(rows), DEFAULT_TAXID),
+                np.asarray(df.entity_type.values[rows], dtype = object),
+            )
+            ids_by_code = np.zeros(len(categories), dtype = np.int64)
+            ids_by_code[~is_complex] = ids
+            on_entity = ~is_complex[codes]
+            entity_id[on_entity] = ids_by_code[codes[on_entity]].tolist()
+        
+        if is_complex.any():
+            
+            components = np.array(
+                [i[len(COMPLEX_PREFIX):] for i in categories[is_complex]],
+                dtype = object,
+            )
+            missing = np.full(len(components), None, dtype = object)
+            
+            ids, tables[models.Complex.__tablename__] = self.records(
+                models.Complex.__table__,
+                components,
+                components = components,
+                name = missing,
+                stoichiometry = missing,
+            )
+            ids_by_code = np.zeros(len(categories), dtype = np.int64)
+            ids_by_code[is_complex] = ids
+            on_complex = is_complex[codes]
+            complex_id[on_complex] = ids_by_code[codes[on_complex]].tolist()
+        
+        resource_ids, tables[models.Resource.__tablename__] = (
+            self.categories(
+                models.Resource.__table__,
+                'resource_name',
+                df.source.values,
+            )
+        )
+        
+        label_ids, tables[models.AnnotationLabel.__tablename__] = (
+            self.categories(
+                models.AnnotationLabel.__table__,
+                'label',
+                df.label.values,
+            )
+        )
+        
+        values = pd.Categorical(df.value)
+        
+        if values.isna().any():
+            
+            if '' not in values.categories:
+                
+                values = values.add_categories([''])
+            
+            values = values.fillna('')
+        
+        value_ids, tables[models.AnnotationValue.__tablename__] = (
+            self.categories(
+                models.AnnotationValue.__table__,
+                'value',
+                values,
+            )
+        )
+        
+        tables[models.Annotation.__tablename__] = pd.DataFrame({
+            'id': self.new_ids(models.Annotation.__table__, n),
+            'entity_id': entity_id,
+            'complex_id': complex_id,
+            'resource_id': resource_ids,
+            'record_id': df.record_id.fillna(0).values.astype(np.int64),
+            'label_id': label_ids,
+            'value_id': value_ids,
+        })
+        
+        return tables
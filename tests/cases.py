@@ -3,13 +3,24 @@
 """Test cases for Bio2BEL OmniPath."""
 
 import os
+import shutil
+import tempfile
 
 from bio2bel.testing import AbstractTemporaryCacheClassMixin
-from bio2bel_omnipath import Manager
+from bio2bel_omnipath import Manager, models
+from tests.synthetic import generate
 
 __all__ = [
     'TemporaryCacheClass',
+    'dump_tables',
 ]
+#: Tables of the state of the loads rather than of the data
+METADATA_TABLE_NAMES = {
+    models.FINGERPRINT_TABLE_NAME,
+    models.CHECKPOINT_TABLE_NAME,
+    models.STATISTIC_TABLE_NAME,
+}
+
 
 class TemporaryCacheClass(AbstractTemporaryCacheClassMixin):
     """A test case containing a temporary database and a Bio2BEL OmniPath manager."""
@@ -17,8 +28,51 @@ class TemporaryCacheClass(AbstractTemporaryCacheClassMixin):
     Manager = Manager
     manager: Manager
 
+    #: Number of synthetic interactions to populate the database with
+    n_interactions = 1000
+
     @classmethod
     def populate(cls):
-        """Populate the Bio2BEL OmniPath database with test data."""
-        # cls.manager.populate(url=...)
-        raise NotImplementedError
+        """Populate the Bio2BEL OmniPath database with synthetic test data."""
+        cls.data_directory = tempfile.mkdtemp()
+        cls.data_paths = generate(cls.data_directory, cls.n_interactions)
+        cls.manager.populate_interactions(interactions=cls.data_paths['interactions'])
+        cls.manager.populate_ptms(ptms=cls.data_paths['ptms'])
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the synthetic data along with the temporary database."""
+        super().tearDownClass()
+        shutil.rmtree(cls.data_directory, ignore_errors=True)
+
+
+def dump_tables(manager: Manager) -> dict:
+    """Return the records of all data tables by table name, comparable between databases.
+
+    The records are sorted lists of tuples, without the primary keys, and with the foreign keys replaced by the records
+    they refer to, hence they do not depend on the primary keys assigned.
+    """
+    resolved = {}
+
+    def resolve(table) -> dict:
+        if table.name not in resolved:
+            records = {}
+            for i, row in enumerate(manager.session.execute(table.select())):
+                record = []
+                for column in table.columns:
+                    value = row[column.name]
+                    foreign_key = next(iter(column.foreign_keys), None)
+                    if foreign_key is not None:
+                        value = None if value is None else resolve(foreign_key.column.table)[value]
+                    elif column.primary_key:
+                        continue
+                    record.append(value)
+                records[row['id'] if 'id' in table.c else i] = tuple(record)
+            resolved[table.name] = records
+        return resolved[table.name]
+
+    return {
+        name: sorted(resolve(table).values(), key=repr)
+        for name, table in models.Base.metadata.tables.items()
+        if name not in METADATA_TABLE_NAMES
+    }
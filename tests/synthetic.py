@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+"""Synthetic OmniPath data for testing and benchmarking Bio2BEL OmniPath.
+
+The data is written in the layout of the OmniPath web service, with the columns of
+:data:`bio2bel_omnipath.parser.SCHEMAS`. Proteins are drawn with a long tailed degree
+distribution, and part of the PTMs are between interacting proteins, as in the real data. The complexes
+consist of the same proteins, and the annotations are key-value records of the proteins, miRNAs and complexes,
+with few distinct values, some of them of small molecules which are not loaded.
+
+Generate data from the command line::
+
+    python -m tests.synthetic 100k /path/to/directory
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from bio2bel_omnipath.parser import SCHEMAS
+
+__all__ = [
+    'SCALES',
+    'generate',
+    'generate_interactions',
+    'generate_ptms',
+    'generate_complexes',
+    'generate_annotations',
+]
+
+#: Number of interactions at the named scales, the number of PTMs is half of that, the number of annotation
+#: records is the same, the number of complexes is a fiftieth
+SCALES = {
+    '10k': 10000,
+    '100k': 100000,
+    '1M': 1000000,
+}
+
+INTERACTION_TYPES = ('PPI', 'TF', 'MTI', 'TFM')
+INTERACTION_TYPE_P = (.6, .25, .13, .02)
+INTERACTION_RESOURCES = (
+    'SignaLink3', 'Reactome', 'KEGG', 'SPIKE', 'Signor', 'BioGRID', 'IntAct',
+    'HPRD', 'TRIP', 'ARN', 'CA1', 'NetPath', 'InnateDB', 'DIP', 'MatrixDB',
+    'TFe', 'ORegAnno', 'miRTarBase', 'miRecords', 'TarBase', 'miR2Disease',
+)
+PTM_RESOURCES = (
+    'PhosphoSite', 'Signor', 'HPRD', 'phosphoELM', 'dbPTM', 'MIMP', 'PhosphoNetworks',
+    'Li2012', 'ProtMapper', 'KEA', 'DEPOD',
+)
+MODIFICATIONS = (
+    'phosphorylation', 'dephosphorylation', 'acetylation', 'ubiquitination',
+    'sumoylation', 'methylation', 'deacetylation', 'proteolytic cleavage',
+)
+MODIFICATION_P = (.85, .06, .03, .02, .01, .01, .01, .01)
+RESIDUES = ('S', 'T', 'Y')
+RESIDUE_P = (.65, .22, .13)
+COMPLEX_RESOURCES = ('CORUM', 'ComplexPortal', 'hu.MAP', 'Signor', 'PDB', 'CellPhoneDB')
+#: Labels of the annotation resources and the pools of their values
+ANNOTATION_RESOURCES = {
+    'HPA_tissue': {
+        'organ': ('liver', 'kidney', 'lung', 'brain', 'heart', 'skin', 'colon', 'pancreas', 'spleen', 'testis'),
+        'level': ('High', 'Medium', 'Low', 'Not detected'),
+    },
+    'UniProt_location': {
+        'location': ('Cytoplasm', 'Nucleus', 'Membrane', 'Mitochondrion', 'Secreted', 'Golgi apparatus'),
+        'features': ('Single-pass membrane protein', 'Multi-pass membrane protein', 'Peripheral membrane protein'),
+    },
+    'CancerGeneCensus': {
+        'tier': ('1', '2'),
+        'role': ('oncogene', 'TSG', 'fusion', 'oncogene, fusion'),
+    },
+    'Kinase.com': {
+        'group': ('AGC', 'CAMK', 'CK1', 'CMGC', 'STE', 'TK', 'TKL', 'Other'),
+    },
+    'SignaLink_pathway': {
+        'pathway': ('Notch', 'WNT', 'TGF', 'RTK', 'Hedgehog', 'JAK/STAT', 'NHR', 'TNF pathway', 'Toll-like'),
+    },
+}
+ANNOTATED_TYPES = ('protein', 'mirna', 'complex', 'small_molecule')
+ANNOTATED_TYPE_P = (.85, .05, .08, .02)
+TAXA = (9606, 10090, 10116)
+TAXON_P = (.9, .07, .03)
+
+BASE36 = np.array(list('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+
+def _uniprot_acs(n: int) -> np.ndarray:
+    """Make ``n`` distinct identifiers in the format of UniProtKB accessions, e.g. P0A1B2."""
+    capacity = 3 * 10 * 36 ** 3 * 10
+    # a multiplier coprime to the capacity maps the indices to distinct, scattered values
+    i = np.arange(n, dtype=np.int64) * 2654435761 % capacity
+    parts = []
+
+    for radix, symbols in (
+        (3, np.array(list('OPQ'))),
+        (10, BASE36[:10]),
+        (36, BASE36),
+        (36, BASE36),
+        (36, BASE36),
+        (10, BASE36[:10]),
+    ):
+        parts.append(symbols[i % radix])
+        i = i // radix
+
+    return np.array([''.join(chars) for chars in zip(*parts)])
+
+
+def _power_law_choice(rng, n: int, size: int, exponent: float = .8) -> np.ndarray:
+    """Draw ``size`` integers below ``n`` with probabilities following a power law of their rank."""
+    weights = 1. / np.arange(1, n + 1) ** exponent
+    weights /= weights.sum()
+    # the most connected ones should not be the first ones
+    return rng.permutation(n)[rng.choice(n, size=size, p=weights)]
+
+
+def _join_random(
+    rng,
+    pool,
+    size: int,
+    max_items: int,
+    min_items: int = 0,
+    combinations: int = 500,
+) -> np.ndarray:
+    """Draw ``size`` semicolon separated lists of items from ``pool``, of a limited number of combinations."""
+    combos = []
+
+    for _ in range(combinations):
+        n_items = rng.integers(max(min_items, 1), max_items + 1)
+        items = rng.choice(len(pool), size=min(n_items, len(pool)), replace=False)
+        combos.append(';'.join(sorted(pool[j] for j in items)))
+
+    combos = np.array(combos, dtype=object)
+    result = combos[_power_law_choice(rng, combinations, size, exponent=1.)]
+
+    if not min_items:
+        result[rng.random(size) < .05] = ''
+
+    return result
+
+
+def _references(rng, size: int, max_references: int = 3) -> np.ndarray:
+    """Draw ``size`` semicolon separated lists of PubMed IDs, many of them shared between records."""
+    counts = rng.choice(max_references + 1, size=size, p=(.15, .5, .25, .1))
+    pmids = _power_law_choice(rng, max(size // 3, 10), counts.sum(), exponent=.5) + 1000000
+
+    return np.array(
+        [';'.join(map(str, chunk)) for chunk in np.split(pmids, np.cumsum(counts)[:-1])],
+        dtype=object,
+    )
+
+
+def _universe(n_interactions: int):
+    """Make the proteins and miRNAs of a dataset, with their names and taxa."""
+    n_proteins = min(max(n_interactions // 5, 100), 20000)
+    n_mirnas = min(max(n_interactions // 50, 10), 2500)
+    proteins = _uniprot_acs(n_proteins)
+    protein_names = np.array(['GENE%u' % i for i in range(n_proteins)], dtype=object)
+    mirnas = np.array(['MIMAT%07u' % i for i in range(n_mirnas)], dtype=object)
+    mirna_names = np.array(
+        ['hsa-miR-%u-%up' % (i // 2, 5 - 2 * (i % 2)) for i in range(n_mirnas)],
+        dtype=object,
+    )
+    # the taxa depend only on the index, hence they are the same in both datasets
+    taxon_rng = np.random.default_rng(n_proteins)
+    protein_taxa = np.array(TAXA)[taxon_rng.choice(len(TAXA), size=n_proteins, p=TAXON_P)]
+    mirna_taxa = np.full(n_mirnas, TAXA[0])
+
+    return proteins, protein_names, protein_taxa, mirnas, mirna_names, mirna_taxa
+
+
+def generate_interactions(n: int, seed: int = 0) -> pd.DataFrame:
+    """Generate a data frame of ``n`` interactions in the layout of the OmniPath interactions query."""
+    rng = np.random.default_rng(seed)
+    proteins, protein_names, protein_taxa, mirnas, mirna_names, mirna_taxa = _universe(n)
+
+    types = rng.choice(len(INTERACTION_TYPES), size=n, p=INTERACTION_TYPE_P)
+    source_mirna = types == INTERACTION_TYPES.index('MTI')
+    target_mirna = types == INTERACTION_TYPES.index('TFM')
+
+    source_protein = _power_law_choice(rng, len(proteins), n)
+    target_protein = _power_law_choice(rng, len(proteins), n)
+    source_mi = rng.integers(len(mirnas), size=n)
+    target_mi = rng.integers(len(mirnas), size=n)
+
+    is_directed = (types != INTERACTION_TYPES.index('PPI')) | (rng.random(n) < .7)
+    effect = rng.choice(3, size=n, p=(.5, .35, .15))
+
+    columns = [
+        np.where(source_mirna, mirnas[source_mi], proteins[source_protein]),
+        np.where(target_mirna, mirnas[target_mi], proteins[target_protein]),
+        np.where(source_mirna, mirna_names[source_mi], protein_names[source_protein]),
+        np.where(target_mirna, mirna_names[target_mi], protein_names[target_protein]),
+        is_directed.astype(int),
+        (is_directed & (effect == 1)).astype(int),
+        (is_directed & (effect == 2)).astype(int),
+        _join_random(rng, INTERACTION_RESOURCES, n, max_items=4, min_items=1),
+        _references(rng, n),
+        np.array(INTERACTION_TYPES)[types],
+        np.where(source_mirna, mirna_taxa[source_mi], protein_taxa[source_protein]),
+        np.where(target_mirna, mirna_taxa[target_mi], protein_taxa[target_protein]),
+    ]
+
+    return pd.DataFrame(dict(zip(SCHEMAS['interactions'], columns)))
+
+
+def generate_ptms(n: int, interactions: pd.DataFrame = None, seed: int = 0) -> pd.DataFrame:
+    """Generate a data frame of ``n`` PTMs in the layout of the OmniPath PTMs query.
+
+    If ``interactions`` are provided, 30 percent of the PTMs are between partners of their PPIs.
+    """
+    rng = np.random.default_rng(seed + 1)
+    n_interactions = 2 * n if interactions is None else len(interactions)
+    proteins, protein_names, protein_taxa, _, _, _ = _universe(n_interactions)
+    name_of = dict(zip(proteins, protein_names))
+    taxon_of = dict(zip(proteins, protein_taxa))
+
+    enzymes = proteins[_power_law_choice(rng, len(proteins), n)]
+    substrates = proteins[_power_law_choice(rng, len(proteins), n)]
+
+    if interactions is not None:
+        ppi = interactions[interactions['type'] == 'PPI']
+        from_ppi = np.flatnonzero(rng.random(n) < .3)[:len(ppi)]
+        rows = rng.choice(len(ppi), size=len(from_ppi), replace=False)
+        enzymes[from_ppi] = ppi['source'].values[rows]
+        substrates[from_ppi] = ppi['target'].values[rows]
+
+    columns = [
+        enzymes,
+        substrates,
+        np.array([name_of.get(ac, ac) for ac in enzymes], dtype=object),
+        np.array([name_of.get(ac, ac) for ac in substrates], dtype=object),
+        np.array(RESIDUES)[rng.choice(len(RESIDUES), size=n, p=RESIDUE_P)],
+        rng.integers(1, 2000, size=n),
+        np.array(MODIFICATIONS)[rng.choice(len(MODIFICATIONS), size=n, p=MODIFICATION_P)],
+        _join_random(rng, PTM_RESOURCES, n, max_items=3, min_items=1),
+        _references(rng, n),
+        np.array([taxon_of[ac] for ac in substrates]),
+    ]
+
+    return pd.DataFrame(dict(zip(SCHEMAS['ptms'], columns)))
+
+
+def generate_complexes(n: int, n_interactions: int = None, seed: int = 0) -> pd.DataFrame:
+    """Generate a data frame of ``n`` complexes of 2 to 5 proteins in the layout of the OmniPath complexes query."""
+    rng = np.random.default_rng(seed + 2)
+    proteins, protein_names, _, _, _, _ = _universe(n_interactions or 50 * n)
+    sizes = rng.integers(2, 6, size=n)
+    components = []
+    genesymbols = []
+
+    for size in sizes:
+        members = np.sort(rng.choice(len(proteins), size=size, replace=False))
+        components.append('_'.join(proteins[members]))
+        genesymbols.append('_'.join(protein_names[members]))
+
+    columns = [
+        np.array(['Complex %u' % i if i % 10 else None for i in range(n)], dtype=object),
+        np.array(components, dtype=object),
+        np.array(genesymbols, dtype=object),
+        np.array([':'.join(['1'] * size) for size in sizes], dtype=object),
+        _join_random(rng, COMPLEX_RESOURCES, n, max_items=3, min_items=1),
+        _references(rng, n),
+    ]
+
+    return pd.DataFrame(dict(zip(SCHEMAS['complexes'], columns)))
+
+
+def generate_annotations(
+    n: int,
+    complexes: pd.DataFrame = None,
+    n_interactions: int = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Generate a data frame of ``n`` annotation records in the layout of the OmniPath annotations query.
+
+    Each record has one row for each label of its resource, the annotated entities are drawn from the proteins and
+    miRNAs of the interactions, and from ``complexes`` if provided.
+    """
+    rng = np.random.default_rng(seed + 3)
+    proteins, protein_names, _, mirnas, mirna_names, _ = _universe(n_interactions or n)
+    complex_ids = (
+        np.array(['COMPLEX:%s' % c for c in complexes['components']], dtype=object)
+        if complexes is not None and len(complexes) else
+        np.array(['COMPLEX:%s_%s' % (proteins[0], proteins[1])], dtype=object)
+    )
+    small_molecules = np.array(['CHEBI:%u' % (15000 + i) for i in range(50)], dtype=object)
+
+    types = rng.choice(len(ANNOTATED_TYPES), size=n, p=ANNOTATED_TYPE_P)
+    ids = np.empty(n, dtype=object)
+    names = np.empty(n, dtype=object)
+
+    for i, (pool, pool_names) in enumerate((
+        (proteins, protein_names),
+        (mirnas, mirna_names),
+        (complex_ids, complex_ids),
+        (small_molecules, small_molecules),
+    )):
+        rows = np.flatnonzero(types == i)
+        picked = _power_law_choice(rng, len(pool), len(rows))
+        ids[rows] = pool[picked]
+        names[rows] = pool_names[picked]
+
+    resources = np.array(list(ANNOTATION_RESOURCES))[rng.integers(len(ANNOTATION_RESOURCES), size=n)]
+    frames = []
+
+    for resource, labels in ANNOTATION_RESOURCES.items():
+        records = np.flatnonzero(resources == resource)
+
+        for label, values in labels.items():
+            frames.append(pd.DataFrame({
+                'uniprot': ids[records],
+                'genesymbol': names[records],
+                'entity_type': np.array(ANNOTATED_TYPES)[types[records]],
+                'source': resource,
+                'label': label,
+                'value': np.array(values, dtype=object)[_power_law_choice(rng, len(values), len(records))],
+                'record_id': records,
+            }))
+
+    df = pd.concat(frames, ignore_index=True).sort_values(['record_id', 'label'], kind='mergesort')
+
+    return df[list(SCHEMAS['annotations'])].reset_index(drop=True)
+
+
+def generate(
+    directory: str,
+    n_interactions: int,
+    n_ptms: int = None,
+    n_complexes: int = None,
+    n_annotations: int = None,
+    seed: int = 0,
+):
+    """Write synthetic interactions, PTMs, complexes and annotations into tab separated files in ``directory``.
+
+    :param directory: The directory to write the files into
+    :param n_interactions: The number of interactions, or the name of a scale in :data:`SCALES`
+    :param n_ptms: The number of PTMs, by default half of the interactions
+    :param n_complexes: The number of complexes, by default a fiftieth of the interactions
+    :param n_annotations: The number of annotation records, by default the same as the interactions
+    :param seed: Seed of the random number generator, the same seed always gives the same data
+    :return: A dictionary of the paths of the files by query type
+    """
+    n_interactions = SCALES.get(n_interactions, n_interactions)
+    n_ptms = n_interactions // 2 if n_ptms is None else n_ptms
+    n_complexes = max(n_interactions // 50, 10) if n_complexes is None else n_complexes
+    n_annotations = n_interactions if n_annotations is None else n_annotations
+
+    os.makedirs(directory, exist_ok=True)
+    interactions = generate_interactions(n_interactions, seed=seed)
+    ptms = generate_ptms(n_ptms, interactions=interactions, seed=seed)
+    complexes = generate_complexes(n_complexes, n_interactions=n_interactions, seed=seed)
+    annotations = generate_annotations(
+        n_annotations,
+        complexes=complexes,
+        n_interactions=n_interactions,
+        seed=seed,
+    )
+
+    paths = {}
+
+    for query_type, df in (
+        ('interactions', interactions),
+        ('ptms', ptms),
+        ('complexes', complexes),
+        ('annotations', annotations),
+    ):
+        paths[query_type] = os.path.join(directory, '%s_%u.tsv' % (query_type, len(df)))
+        df.to_csv(paths[query_type], sep='\t', index=False)
+
+    return paths
+
+
+def main():
+    """Write synthetic OmniPath data at the scale provided on the command line."""
+    argparser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    argparser.add_argument('scale', help='one of %s or the number of interactions' % ', '.join(SCALES))
+    argparser.add_argument('directory')
+    argparser.add_argument('--seed', type=int, default=0)
+    args = argparser.parse_args()
+
+    scale = SCALES.get(args.scale) or int(args.scale)
+
+    for query_type, path in generate(args.directory, scale, seed=args.seed).items():
+        print(query_type, path)
+
+
+if __name__ == '__main__':
+    main()
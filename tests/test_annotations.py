@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the complexes and annotations of Bio2BEL OmniPath."""
+
+import pandas as pd
+
+from bio2bel_omnipath import models
+from bio2bel_omnipath.tables import ANNOTATED_ENTITY_TYPES
+from tests.cases import TemporaryCacheClass
+
+
+class TestAnnotations(TemporaryCacheClass):
+    """Test loading and querying the complexes and annotations."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the complexes and annotations in chunks, and read them for comparison."""
+        super().setUpClass()
+        cls.manager.populate_complexes(complexes=cls.data_paths['complexes'], chunksize=7)
+        cls.manager.populate_annotations(annotations=cls.data_paths['annotations'], chunksize=500)
+        cls.complexes = pd.read_table(cls.data_paths['complexes'])
+        annotations = pd.read_table(cls.data_paths['annotations'], dtype={'value': str})
+        cls.annotations = annotations[annotations['entity_type'].isin(ANNOTATED_ENTITY_TYPES)]
+
+    def setUp(self):
+        """Clear the query cache."""
+        super().setUp()
+        self.manager.clear_query_cache()
+        self.entities = dict(self.manager.session.query(models.MolecularEntity.primary_id, models.MolecularEntity.id))
+
+    def test_complexes(self):
+        """Test that each complex is loaded with its components as members."""
+        self.assertEqual(len(self.complexes), self.manager.count_complexes())
+
+        for record in self.manager._list_model(models.Complex):
+            row = self.complexes[self.complexes['components'] == record.components].iloc[0]
+
+            self.assertEqual(sorted(row['components'].split('_')), sorted(m.primary_id for m in record.members))
+            self.assertEqual(sorted(row['sources'].split(';')), sorted(r.resource_name for r in record.resources))
+
+    def test_get_complexes_of(self):
+        """Test retrieving the complexes of their members."""
+        components = self.complexes['components'].str.split('_').explode()
+        entity_ids = [self.entities[primary_id] for primary_id in components.unique()[:20]]
+        complexes = self.manager.get_complexes_of(entity_ids)
+
+        self.assertEqual(entity_ids, list(complexes))
+
+        for entity_id, records in complexes.items():
+            primary_id = self.manager.session.query(models.MolecularEntity).get(entity_id).primary_id
+            expected = self.complexes.loc[components[components == primary_id].index, 'components']
+
+            self.assertEqual(sorted(expected), sorted(record.components for record in records))
+
+    def test_annotations(self):
+        """Test that the annotations of proteins, miRNAs and complexes are loaded, with distinct labels and values."""
+        self.assertEqual(len(self.annotations), self.manager.count_annotations())
+        self.assertEqual(
+            self.annotations['value'].nunique(),
+            self.manager.session.query(models.AnnotationValue).count(),
+        )
+        self.assertEqual(
+            self.annotations['label'].nunique(),
+            self.manager.session.query(models.AnnotationLabel).count(),
+        )
+
+    def test_complex_annotations(self):
+        """Test that the annotations of complexes refer to the complexes."""
+        on_complexes = self.annotations['uniprot'].str.startswith('COMPLEX:')
+
+        self.assertEqual(
+            on_complexes.sum(),
+            self.manager.session.query(models.Annotation).filter(models.Annotation.complex_id.isnot(None)).count(),
+        )
+        self.assertEqual(
+            self.manager.count_annotations() - on_complexes.sum(),
+            self.manager.session.query(models.Annotation).filter(models.Annotation.entity_id.isnot(None)).count(),
+        )
+
+    def test_get_annotations_of(self):
+        """Test retrieving the annotations of entities, optionally of one resource."""
+        primary_ids = self.annotations['uniprot'][~self.annotations['uniprot'].str.startswith('COMPLEX:')].unique()[:10]
+        entity_ids = [self.entities[primary_id] for primary_id in primary_ids]
+
+        for resource in (None, 'HPA_tissue'):
+            with self.subTest(resource=resource):
+                annotations = self.manager.get_annotations_of(entity_ids, resource=resource)
+
+                for primary_id, entity_id in zip(primary_ids, entity_ids):
+                    expected = self.annotations[self.annotations['uniprot'] == primary_id]
+
+                    if resource is not None:
+                        expected = expected[expected['source'] == resource]
+
+                    self.assertEqual(
+                        sorted(zip(expected['source'], expected['record_id'], expected['label'], expected['value'])),
+                        sorted(
+                            (record.resource.resource_name, record.record_id, record.label.label, record.value.value)
+                            for record in annotations[entity_id]
+                        ),
+                    )
+
+    def test_facets(self):
+        """Test counting the annotated entities by value."""
+        rows = self.annotations[
+            (self.annotations['source'] == 'HPA_tissue') & (self.annotations['label'] == 'organ')
+        ]
+        expected = rows.groupby('value')['uniprot'].nunique().to_dict()
+        facets = self.manager.get_annotation_facets('HPA_tissue', 'organ')
+
+        self.assertEqual(expected, dict(facets))
+        self.assertEqual(sorted(facets.values(), reverse=True), list(facets.values()))
+
+    def test_get_annotated(self):
+        """Test retrieving the entities and complexes with an annotation value."""
+        rows = self.annotations[
+            (self.annotations['source'] == 'Kinase.com') & (self.annotations['value'] == 'TK')
+        ]
+        entity_ids, complex_ids = self.manager.get_annotated('Kinase.com', 'group', 'TK')
+        complexes = dict(self.manager.session.query(models.Complex.id, models.Complex.components))
+
+        self.assertEqual(
+            set(rows['uniprot']),
+            {self.manager.session.query(models.MolecularEntity).get(i).primary_id for i in entity_ids} |
+            {'COMPLEX:%s' % complexes[i] for i in complex_ids},
+        )
+
+    def test_populate_again(self):
+        """Test that loading the annotations again replaces them."""
+        self.manager.populate_annotations(annotations=self.data_paths['annotations'])
+
+        self.assertEqual(len(self.annotations), self.manager.count_annotations())
+        self.assertEqual(
+            self.annotations['value'].nunique(),
+            self.manager.session.query(models.AnnotationValue).count(),
+        )
+
+    def test_stale_datasets(self):
+        """Test that the annotations are loaded again along with the complexes, but not with the PTMs."""
+        fingerprints = self.manager.fingerprints(self.data_paths)
+
+        for dataset, fingerprint in fingerprints.items():
+            self.manager._store_fingerprint(dataset, fingerprint)
+
+        self.manager.session.commit()
+
+        self.assertEqual([], self.manager._stale_datasets(fingerprints))
+
+        for changed, expected in (
+            ('ptms', ['ptms']),
+            ('annotations', ['annotations']),
+            ('complexes', ['complexes', 'annotations']),
+        ):
+            with self.subTest(changed=changed):
+                changed_fingerprints = dict(fingerprints, **{changed: dict(fingerprints[changed], content_hash='')})
+
+                self.assertEqual(expected, self.manager._stale_datasets(changed_fingerprints))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the BEL export of Bio2BEL OmniPath."""
+
+import os
+import shutil
+import tempfile
+
+import pybel
+from pybel.constants import CITATION, HAS_VARIANT, RELATION
+
+from bio2bel_omnipath import models
+from bio2bel_omnipath.bel import PARTITIONS, PTM_MODIFICATIONS
+from tests.cases import TemporaryCacheClass
+
+
+def _qualified_edges(graph: pybel.BELGraph) -> set:
+    """Return the edges with citations as comparable tuples."""
+    return {
+        (u.as_bel(), v.as_bel(), data[RELATION], data[CITATION].identifier)
+        for u, v, data in graph.edges(data=True)
+        if CITATION in data
+    }
+
+
+class TestBel(TemporaryCacheClass):
+    """Test the conversion of the database to BEL by batches."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Convert the database in one batch, and make a directory for the files."""
+        super().setUpClass()
+        cls.graph = cls.manager.to_bel(batch_size=100000)
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the written files."""
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def test_nodes(self):
+        """Test that each entity with interactions is one node, and the modified substrates are its variants."""
+        entities = self.manager.session.query(models.MolecularEntity.primary_id).filter(
+            models.MolecularEntity.id.in_(self.manager.session.query(models.Interaction.source_id)),
+        )
+        identifiers = {node.identifier for node in self.graph if not node.variants}
+
+        self.assertLessEqual({primary_id for primary_id, in entities}, identifiers)
+        self.assertEqual(len(identifiers), sum(not node.variants for node in self.graph))
+
+        for u, v, data in self.graph.edges(data=True):
+            if data[RELATION] == HAS_VARIANT:
+                self.assertEqual(u, v.get_parent())
+
+    def test_edges(self):
+        """Test that each interaction and convertible PTM has an edge for each of its references."""
+        ptm_types = dict(self.manager.session.query(models.PtmType.id, models.PtmType.ptm_type))
+        expected = 0
+
+        for record in self.manager._list_model(models.Interaction):
+            relations = [record.is_stimulation, record.is_inhibition]
+            n_relations = 2 if not record.is_directed else max(sum(map(bool, relations)), 1)
+            expected += n_relations * max(len(record.references), 1)
+
+        for record in self.manager._list_model(models.Ptm):
+            if ptm_types[record.modification_type_id] in PTM_MODIFICATIONS:
+                expected += max(len(record.references), 1)
+
+        self.assertEqual(expected, sum(CITATION in data for _, _, data in self.graph.edges(data=True)))
+
+    def test_batches(self):
+        """Test that converting by small batches gives the same graph."""
+        graph = self.manager.to_bel(batch_size=37)
+
+        self.assertEqual(self.graph.number_of_nodes(), graph.number_of_nodes())
+        self.assertEqual(_qualified_edges(self.graph), _qualified_edges(graph))
+
+    def test_write_nodelink(self):
+        """Test writing node-link JSON by batches, readable by PyBEL."""
+        path = os.path.join(self.directory, 'omnipath.bel.nodelink.json')
+        n_edges = self.manager.to_bel(path=path, batch_size=123)
+        graph = pybel.from_nodelink_file(path)
+
+        self.assertEqual(len(_qualified_edges(self.graph)), n_edges)
+        self.assertEqual(set(self.graph), set(graph))
+        self.assertEqual(_qualified_edges(self.graph), _qualified_edges(graph))
+
+    def test_write_bel(self):
+        """Test writing a BEL script by batches, parsed to the same edges by PyBEL."""
+        path = os.path.join(self.directory, 'omnipath.bel')
+        self.manager.to_bel(path=path, fmt='bel', batch_size=123)
+        graph = pybel.from_bel_script(path, citation_clearing=False)
+
+        self.assertEqual(set(self.graph), set(graph))
+        self.assertEqual(_qualified_edges(self.graph), _qualified_edges(graph))
+
+    def test_partitions(self):
+        """Test that converting by partitions in processes gives the same graph."""
+        for partition_by in PARTITIONS:
+            with self.subTest(partition_by=partition_by):
+                graph = self.manager.to_bel(partition_by=partition_by, workers=2)
+
+                self.assertEqual(set(self.graph), set(graph))
+                self.assertEqual(_qualified_edges(self.graph), _qualified_edges(graph))
+
+    def test_write_partitions(self):
+        """Test writing by partitions, each record in one partition only."""
+        path = os.path.join(self.directory, 'omnipath.partitions.bel.nodelink.json')
+        n_edges = self.manager.to_bel(path=path, partition_by='resource', workers=2)
+
+        self.assertEqual(len(_qualified_edges(self.graph)), n_edges)
+        self.assertEqual(_qualified_edges(self.graph), _qualified_edges(pybel.from_nodelink_file(path)))
+
+    def test_unknown_partitioning(self):
+        """Test that an unknown partitioning is an error."""
+        with self.assertRaises(ValueError):
+            self.manager.to_bel(partition_by='reference')
+
+    def test_unknown_format(self):
+        """Test that an unknown format is an error."""
+        with self.assertRaises(ValueError):
+            self.manager.to_bel(path=os.path.join(self.directory, 'omnipath.txt'), fmt='txt')
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the download cache of Bio2BEL OmniPath."""
+
+import concurrent.futures
+import functools
+import gzip
+import hashlib
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from click.testing import CliRunner
+
+from bio2bel_omnipath import Manager, cache, constants, parser
+from bio2bel_omnipath.cli import main
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve files without logging the requests."""
+
+    def log_message(self, *args):
+        """Do not log."""
+
+
+class ConditionalHandler(QuietHandler):
+    """Serve files with ETags, gzip compressed if accepted, and by ranges.
+
+    The server records the headers of the requests and the statuses and encodings of the responses in ``requests``.
+    If the ``cut_after`` attribute of the server is set, the next response is cut off after that many bytes.
+    """
+
+    def do_GET(self):
+        """Serve a file, or its part requested by a range, or nothing if it is not modified."""
+        with open(self.translate_path(self.path), 'rb') as fp:
+            content = fp.read()
+
+        etag = '"%s"' % hashlib.md5(content).hexdigest()
+        encoding = 'gzip' if 'gzip' in self.headers.get('Accept-Encoding', '') else None
+        status, start = 200, 0
+
+        if self.headers.get('If-None-Match') == etag:
+            status = 304
+        elif self.headers.get('Range') and self.headers.get('If-Range') == etag:
+            status, start = 206, int(self.headers['Range'].split('=')[1].rstrip('-'))
+
+        self.server.requests.append({'headers': dict(self.headers), 'status': status, 'encoding': encoding})
+
+        if status == 304:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        if encoding:
+            content = gzip.compress(content, mtime=0)
+
+        body = content[start:]
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+
+        if status == 206:
+            self.send_header('Content-Range', 'bytes %u-%u/%u' % (start, len(content) - 1, len(content)))
+
+        self.end_headers()
+
+        if self.server.cut_after is not None:
+            body, self.server.cut_after = body[:self.server.cut_after], None
+            self.close_connection = True
+
+        self.wfile.write(body)
+
+
+class ServerMixin:
+    """Serve a temporary directory by HTTP."""
+
+    handler = QuietHandler
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the server in a thread."""
+        cls.served = tempfile.mkdtemp()
+        cls.server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0),
+            functools.partial(cls.handler, directory=cls.served),
+        )
+        cls.server.requests = []
+        cls.server.cut_after = None
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.served, ignore_errors=True)
+
+    def setUp(self):
+        """Make an empty cache."""
+        self.directory = tempfile.mkdtemp()
+        self.cache = cache.DownloadCache(self.directory)
+        self.server.requests.clear()
+
+    def tearDown(self):
+        """Remove the cache."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def serve(self, name: str, content: bytes) -> str:
+        """Write a served file, and return its URL."""
+        with open(os.path.join(self.served, name), 'wb') as fp:
+            fp.write(content)
+
+        return 'http://127.0.0.1:%u/%s' % (self.server.server_port, name)
+
+
+class TestDownloadCache(ServerMixin, unittest.TestCase):
+    """Test downloading into the cache from a local HTTP server."""
+
+    def test_content_addressed(self):
+        """Test that downloads are stored by content hash, identical contents once."""
+        url = self.serve('a.tsv', b'a\tb\n1\t2\n')
+        path = parser.download(url, cache=self.cache)
+
+        self.assertEqual(os.path.join(self.cache.blob_dir, cache.content_hash(path)), path)
+        self.assertEqual(path, parser.download(url + '?variant=1', cache=self.cache))
+        self.assertEqual([path], [os.path.join(self.cache.blob_dir, name) for name in os.listdir(self.cache.blob_dir)])
+        self.assertEqual(
+            [url, url + '?variant=1'],
+            [entry['url'] for entry in self.cache.entries()],
+        )
+
+    def test_cached(self):
+        """Test that a cached URL is not downloaded again."""
+        url = self.serve('b.tsv', b'first')
+        path = parser.download(url, cache=self.cache)
+        self.serve('b.tsv', b'second')
+
+        self.assertEqual(path, parser.download(url, cache=self.cache))
+
+    def test_revalidate(self):
+        """Test that a changed file is downloaded again, and the old version removed."""
+        url = self.serve('c.tsv', b'first')
+        first = parser.download(url, cache=self.cache)
+        fetched = self.cache.entry(url)['fetched']
+
+        self.assertEqual(first, parser.download(url, revalidate=True, cache=self.cache))
+        self.assertLess(fetched, self.cache.entry(url)['fetched'])
+
+        self.serve('c.tsv', b'second version')
+        os.utime(os.path.join(self.served, 'c.tsv'), (fetched + 10, fetched + 10))
+        second = parser.download(url, revalidate=True, cache=self.cache)
+
+        self.assertNotEqual(first, second)
+        self.assertFalse(os.path.exists(first))
+
+        with open(second, 'rb') as fp:
+            self.assertEqual(b'second version', fp.read())
+
+    def test_eviction(self):
+        """Test that the least recently used files are evicted above the maximum size."""
+        self.cache.max_size = 250
+        urls = [self.serve('%u.tsv' % i, str(i).encode() * 100) for i in range(3)]
+        paths = [parser.download(url, cache=self.cache) for url in urls[:2]]
+        parser.download(urls[0], cache=self.cache)
+        paths.append(parser.download(urls[2], cache=self.cache))
+
+        self.assertEqual([True, False, True], [os.path.exists(path) for path in paths])
+        self.assertEqual([urls[0], urls[2]], [entry['url'] for entry in self.cache.entries()])
+        self.assertEqual(200, self.cache.size())
+
+    def test_prune(self):
+        """Test pruning to a size, along with the files derived from the blobs."""
+        urls = [self.serve('p%u.tsv' % i, str(i).encode() * 100) for i in range(3)]
+        paths = [parser.download(url, cache=self.cache) for url in urls]
+
+        with open('%s.derived' % paths[0], 'wb') as fp:
+            fp.write(b'x' * 100)
+
+        self.assertEqual(400, self.cache.size())
+        self.assertEqual(200, self.cache.prune(max_size='200'))
+        self.assertEqual([urls[1], urls[2]], [entry['url'] for entry in self.cache.entries()])
+        self.assertEqual([False, True, True], [os.path.exists(path) for path in paths])
+        self.assertFalse(os.path.exists('%s.derived' % paths[0]))
+
+    def test_concurrent(self):
+        """Test that concurrent downloads of the same URL store one file."""
+        url = self.serve('d.tsv', os.urandom(1 << 20))
+
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            paths = list(executor.map(lambda _: parser.download(url, cache=self.cache), range(8)))
+
+        self.assertEqual(1, len(set(paths)))
+        self.assertEqual([os.path.basename(paths[0])], os.listdir(self.cache.blob_dir))
+        self.assertEqual([], os.listdir(self.cache.partial_dir))
+
+    def test_cli(self):
+        """Test listing and pruning the cache by the command line interface."""
+        url = self.serve('e.tsv', b'e' * 2048)
+        path = parser.download(url, cache=self.cache)
+        runner = CliRunner()
+
+        with mock.patch.object(cache, '_cache', self.cache):
+            listed = runner.invoke(main, ['cache', 'ls'])
+            pruned = runner.invoke(main, ['cache', 'prune', '--max-size', '1K'])
+            invalid = runner.invoke(main, ['cache', 'prune', '--max-size', 'much'])
+
+        self.assertEqual(0, listed.exit_code, msg=listed.output)
+        self.assertIn(url, listed.output)
+        self.assertIn('Total: 2.0 K', listed.output)
+        self.assertEqual(0, pruned.exit_code, msg=pruned.output)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(2, invalid.exit_code)
+
+    def test_parse_size(self):
+        """Test parsing sizes with units."""
+        for size, expected in (('100', 100), ('1K', 1024), ('1.5 MiB', 3 << 19), ('2g', 2 << 30), (None, None)):
+            with self.subTest(size=size):
+                self.assertEqual(expected, cache.parse_size(size))
+
+        with self.assertRaises(ValueError):
+            cache.parse_size('big')
+
+
+class TestConditionalDownload(ServerMixin, unittest.TestCase):
+    """Test the gzip compressed, resumed and revalidated downloads from a server sending ETags."""
+
+    handler = ConditionalHandler
+
+    def test_gzip(self):
+        """Test that the data is requested and transferred gzip compressed, and saved decompressed."""
+        content = b'source\ttarget\n' + b'P00533\tP04626\n' * 1000
+        path = parser.download(self.serve('g.tsv', content), cache=self.cache)
+
+        self.assertEqual(['gzip'], [request['encoding'] for request in self.server.requests])
+        self.assertEqual('gzip', self.cache.entries()[0]['encoding'])
+
+        with open(path, 'rb') as fp:
+            self.assertEqual(content, fp.read())
+
+    def test_resume(self):
+        """Test that an interrupted download is resumed by a range request from the received bytes."""
+        content = os.urandom(1 << 16)
+        url = self.serve('r.tsv', content)
+        self.server.cut_after = 1000
+
+        with self.assertRaises(OSError):
+            parser.download(url, cache=self.cache)
+
+        path = parser.download(url, cache=self.cache)
+        first, second = self.server.requests
+
+        self.assertNotIn('Range', first['headers'])
+        self.assertEqual('bytes=1000-', second['headers']['Range'])
+        self.assertEqual(206, second['status'])
+
+        with open(path, 'rb') as fp:
+            self.assertEqual(content, fp.read())
+
+    def test_etag(self):
+        """Test that a cached file is revalidated by its ETag, and downloaded again only if changed."""
+        url = self.serve('e.tsv', b'first')
+        first = parser.download(url, cache=self.cache)
+        etag = self.cache.entry(url)['etag']
+
+        self.assertEqual(first, parser.download(url, revalidate=True, cache=self.cache))
+        self.assertEqual(etag, self.server.requests[-1]['headers']['If-None-Match'])
+        self.assertEqual(304, self.server.requests[-1]['status'])
+
+        self.serve('e.tsv', b'second')
+        second = parser.download(url, revalidate=True, cache=self.cache)
+
+        self.assertEqual(200, self.server.requests[-1]['status'])
+        self.assertNotEqual(etag, self.cache.entry(url)['etag'])
+
+        with open(second, 'rb') as fp:
+            self.assertEqual(b'second', fp.read())
+
+    def test_fetch_all(self):
+        """Test that the datasets are revalidated only if requested."""
+        url = self.serve('f.tsv', b'first')
+
+        with mock.patch.object(cache, '_cache', self.cache), mock.patch.dict(constants.URLS, {'test': url}):
+            first = parser.fetch_all(['test'], parse=False)['test']
+            self.serve('f.tsv', b'second')
+
+            self.assertEqual(first, parser.fetch_all(['test'], parse=False)['test'])
+            self.assertEqual(1, len(self.server.requests))
+
+            second = parser.fetch_all(['test'], parse=False, revalidate=True)['test']
+
+        self.assertNotEqual(first, second)
+
+    def test_populate_update(self):
+        """Test that populate and update pass on revalidating the input files."""
+        manager = Manager(connection='sqlite://')
+
+        for method, kwargs, expected in (
+            (manager.populate, {}, False),
+            (manager.populate, {'revalidate': True}, True),
+            (manager.update, {}, True),
+        ):
+            with mock.patch.object(parser, 'fetch_all', side_effect=RuntimeError('stop')) as fetch_all:
+                with self.assertRaises(RuntimeError):
+                    method(**kwargs)
+
+            with self.subTest(method=method.__name__, **kwargs):
+                self.assertEqual(expected, fetch_all.call_args[1]['revalidate'])
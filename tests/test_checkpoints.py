@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for resuming an interrupted populate of Bio2BEL OmniPath."""
+
+from unittest import mock
+
+import pandas as pd
+import sqlalchemy.exc
+
+from bio2bel_omnipath import constants, models
+from bio2bel_omnipath.bulk import BulkLoader
+from bio2bel_omnipath.manager import DATASETS
+from tests.cases import TemporaryCacheClass
+
+#: Number of rows loaded in one chunk
+CHUNKSIZE = 100
+
+
+class TestCheckpoints(TemporaryCacheClass):
+    """Test that an interrupted populate is resumed after the committed chunks."""
+
+    def setUp(self):
+        """Clear the database, and use the synthetic data as the input."""
+        super().setUp()
+        self.manager._clear(list(DATASETS))
+        self.urls = mock.patch.dict(constants.URLS, self.data_paths)
+        self.urls.start()
+
+    def tearDown(self):
+        """Restore the URLs."""
+        self.urls.stop()
+        super().tearDown()
+
+    def _populate_failing(self, dataset: str, n_chunks: int):
+        """Populate, losing the connection while writing the chunk after ``n_chunks`` chunks of ``dataset``."""
+        write = BulkLoader.write
+        table = {'interactions': models.INTERACTION_TABLE_NAME, 'ptms': models.PTM_TABLE_NAME}[dataset]
+        written = []
+
+        def failing_write(loader, tables):
+            if table in tables:
+                if len(written) == n_chunks:
+                    raise sqlalchemy.exc.OperationalError('INSERT', {}, Exception('connection lost'))
+                written.append(tables)
+            write(loader, tables)
+
+        with mock.patch.object(BulkLoader, 'write', failing_write):
+            with self.assertRaises(sqlalchemy.exc.OperationalError):
+                self.manager.populate(chunksize=CHUNKSIZE)
+
+    def test_resume(self):
+        """Test that the loaded rows are recorded at the failure, and the next populate loads only the rest."""
+        self._populate_failing('ptms', 3)
+        checkpoints = self.manager.get_checkpoints()
+
+        self.assertEqual(['ptms'], list(checkpoints))
+        self.assertEqual(3 * CHUNKSIZE, checkpoints['ptms']['rows'])
+        self.assertEqual(
+            self.manager.fingerprints({'ptms': self.data_paths['ptms']})['ptms'],
+            checkpoints['ptms']['fingerprint'],
+        )
+        self.assertEqual(['interactions'], list(self.manager.get_fingerprints()))
+
+        self.manager.populate(chunksize=CHUNKSIZE)
+        ptms = pd.read_table(self.data_paths['ptms'])
+        read = {stage['stage']: stage['rows'] for stage in self.manager.profiler.report()}
+
+        self.assertEqual(len(ptms) - 3 * CHUNKSIZE, read['ptms.read'])
+        self.assertNotIn('interactions.read', read)
+        self.assertEqual({}, self.manager.get_checkpoints())
+        self.assertEqual(sorted(DATASETS), sorted(self.manager.get_fingerprints()))
+
+        resumed = self.manager.summarize(detailed=True)
+        self.manager.populate(chunksize=CHUNKSIZE, force=True)
+
+        self.assertEqual(self.manager.summarize(detailed=True), resumed)
+
+    def test_resume_interactions(self):
+        """Test that the interrupted interactions are resumed, and the other datasets loaded."""
+        self._populate_failing('interactions', 2)
+
+        self.assertEqual(2 * CHUNKSIZE, self.manager.get_checkpoints()['interactions']['rows'])
+        self.assertEqual({}, self.manager.get_fingerprints())
+
+        self.manager.populate(chunksize=CHUNKSIZE)
+        resumed = self.manager.summarize(detailed=True)
+        self.manager.populate(chunksize=CHUNKSIZE, force=True)
+
+        self.assertEqual(self.manager.summarize(detailed=True), resumed)
+
+    def test_resume_before_first_chunk(self):
+        """Test that a failure before the first chunk of the PTMs keeps the loaded interactions."""
+        self._populate_failing('ptms', 0)
+
+        self.assertEqual({}, self.manager.get_checkpoints())
+        self.assertEqual(['interactions'], list(self.manager.get_fingerprints()))
+
+        self.manager.populate(chunksize=CHUNKSIZE)
+        ptms = pd.read_table(self.data_paths['ptms'])
+        read = {stage['stage']: stage['rows'] for stage in self.manager.profiler.report()}
+
+        self.assertNotIn('interactions.read', read)
+        self.assertEqual(len(ptms), read['ptms.read'])
+        self.assertEqual(sorted(DATASETS), sorted(self.manager.get_fingerprints()))
+
+        resumed = self.manager.summarize(detailed=True)
+        self.manager.populate(chunksize=CHUNKSIZE, force=True)
+
+        self.assertEqual(self.manager.summarize(detailed=True), resumed)
+
+    def test_fast_load(self):
+        """Test that an interrupted fast load is rolled back along with its checkpoints, and loaded again."""
+        write = BulkLoader.write
+
+        def failing_write(loader, tables):
+            if models.PTM_TABLE_NAME in tables:
+                raise sqlalchemy.exc.OperationalError('INSERT', {}, Exception('connection lost'))
+            write(loader, tables)
+
+        with mock.patch.object(BulkLoader, 'write', failing_write):
+            with self.assertRaises(sqlalchemy.exc.OperationalError):
+                self.manager.populate(chunksize=CHUNKSIZE, fast_load=True)
+
+        self.assertEqual({}, self.manager.get_checkpoints())
+        self.assertEqual({}, self.manager.get_fingerprints())
+        self.assertEqual(0, self.manager.count_interactions())
+
+        self.manager.populate(chunksize=CHUNKSIZE, fast_load=True)
+
+        self.assertEqual(sorted(DATASETS), sorted(self.manager.get_fingerprints()))
+
+    def test_changed_input(self):
+        """Test that a checkpoint of different input data is not resumed."""
+        self._populate_failing('ptms', 1)
+        fingerprints = self.manager.fingerprints(self.data_paths)
+        changed = dict(fingerprints, ptms=dict(fingerprints['ptms'], content_hash=''))
+
+        self.assertEqual({'ptms': CHUNKSIZE}, self.manager._resumable_datasets(['ptms'], fingerprints))
+        self.assertEqual({}, self.manager._resumable_datasets(['ptms'], changed))
+        self.assertEqual({}, self.manager._resumable_datasets(list(DATASETS), fingerprints))
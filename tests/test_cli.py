@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the command line interface of Bio2BEL OmniPath."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import bio2bel
+import bio2bel.utils
+import click
+import sqlalchemy
+from click.testing import CliRunner
+
+from bio2bel_omnipath import Manager, constants, models
+from bio2bel_omnipath.cli import COMMANDS, main
+from tests.cases import TemporaryCacheClass
+
+#: Maximum time of importing the CLI module in seconds
+IMPORT_TIME_BUDGET = .5
+#: Modules the CLI module must not import
+HEAVY_MODULES = {'bio2bel', 'pybel', 'pandas', 'numpy', 'sqlalchemy', 'networkx'}
+
+
+def _import_times(module: str) -> dict:
+    """Import a module in a new interpreter, and return the cumulative import times of all modules in seconds."""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1e6
+
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    """Test that the CLI can start without the heavy dependencies."""
+
+    def test_import_time(self):
+        """Test the import time of the CLI and that it does not import the heavy dependencies."""
+        times = _import_times('bio2bel_omnipath.cli')
+        imported = {name.split('.')[0] for name in times}
+
+        self.assertLess(times['bio2bel_omnipath.cli'], IMPORT_TIME_BUDGET)
+        self.assertEqual(set(), HEAVY_MODULES & imported)
+
+    def test_help(self):
+        """Test that the help lists the commands without loading the manager."""
+        process = subprocess.run(
+            [sys.executable, '-c', (
+                'import sys; from bio2bel_omnipath.cli import main; '
+                'main(["--help"], standalone_mode=False); '
+                'print(sorted(m for m in ("pandas", "pybel", "bio2bel") if m in sys.modules))'
+            )],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+
+        for name in COMMANDS:
+            self.assertIn(name, process.stdout)
+
+        self.assertTrue(process.stdout.rstrip().endswith('[]'))
+
+    def test_commands(self):
+        """Test that the listed commands are those of the manager."""
+        cli = Manager.get_cli()
+        ctx = click.Context(cli)
+
+        self.assertEqual(
+            COMMANDS,
+            {name: cli.get_command(ctx, name).get_short_help_str(limit=80) for name in cli.list_commands(ctx)},
+        )
+
+    def test_lazy_constants(self):
+        """Test that the lazily resolved constants are the same as resolved by Bio2BEL."""
+        self.assertEqual(str(bio2bel.get_data_dir(constants.MODULE_NAME)), constants.DATA_DIR)
+        self.assertEqual(os.path.join(constants.DATA_DIR, 'graph_index'), constants.GRAPH_INDEX_DIR)
+        self.assertEqual(bio2bel.utils.get_connection(), constants.get_connection())
+
+        with self.assertRaises(AttributeError):
+            constants.NOT_A_CONSTANT
+
+
+class TestSummarize(TemporaryCacheClass):
+    """Test the summarize command, run without the manager."""
+
+    def test_summarize(self):
+        """Test that the output is the same as of the command of the manager."""
+        runner = CliRunner()
+        fast = runner.invoke(main, ['-c', self.manager.connection, 'summarize'])
+        full = runner.invoke(Manager.get_cli(), ['-c', self.manager.connection, 'summarize'])
+
+        self.assertEqual(0, fast.exit_code, msg=fast.output)
+        self.assertEqual(
+            [line for line in full.output.splitlines() if ' - ' not in line],
+            fast.output.splitlines(),
+        )
+        self.assertIn('Interactions: %u' % self.manager.count_interactions(), fast.output.splitlines())
+
+    def test_not_populated(self):
+        """Test that an empty database is an error, and the schema is not created by summarizing."""
+        with tempfile.TemporaryDirectory() as directory:
+            connection = 'sqlite:///%s' % os.path.join(directory, 'empty.db')
+            result = CliRunner().invoke(main, ['-c', connection, 'summarize'])
+            engine = sqlalchemy.create_engine(connection)
+            tables = sqlalchemy.inspect(engine).get_table_names()
+            engine.dispose()
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIn('not been populated', result.output)
+        self.assertEqual([], tables)
+
+    def test_without_statistics(self):
+        """Test summarizing a database created without the table of the statistics."""
+        self.manager.session.commit()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'old.db')
+            shutil.copy(self.manager.engine.url.database, path)
+            engine = sqlalchemy.create_engine('sqlite:///%s' % path)
+            models.Statistic.__table__.drop(engine)
+            engine.dispose()
+
+            result = CliRunner().invoke(main, ['-c', 'sqlite:///%s' % path, 'summarize'])
+
+        self.assertEqual(0, result.exit_code, msg=result.output)
+        self.assertIn('Interactions: %u' % self.manager.count_interactions(), result.output.splitlines())
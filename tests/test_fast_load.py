@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for loading Bio2BEL OmniPath in a fast load session.
+
+The tests run on SQLite, and also on PostgreSQL, covering ``COPY`` and the deferred constraints, if the URL of an
+empty database to use is given in the ``OMNIPATH_TEST_POSTGRESQL`` environment variable.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import sqlalchemy
+
+from bio2bel_omnipath import Manager, bulk, constants, models
+from bio2bel_omnipath.manager import DATASETS
+from tests.cases import TemporaryCacheClass, dump_tables
+from tests.synthetic import generate
+
+#: URL of an empty PostgreSQL database for testing
+POSTGRESQL_URL = os.environ.get('OMNIPATH_TEST_POSTGRESQL')
+
+
+class TestCopyCsv(unittest.TestCase):
+    """Test the CSV written for PostgreSQL ``COPY``."""
+
+    def test_nulls(self):
+        """Test that NULLs are written as the NULL marker, and empty strings as empty fields."""
+        records = pd.DataFrame({
+            'id': [1, 2, 3],
+            'value': ['', None, 'a'],
+            'flag': pd.array([1, None, 0], dtype='Int8'),
+        })
+
+        self.assertEqual('1,,1\n2,\\N,\\N\n3,a,0\n', bulk.BulkLoader.copy_csv(records))
+
+    def test_statement(self):
+        """Test that the COPY statement uses the same NULL marker."""
+        connection = mock.Mock()
+        connection.dialect = sqlalchemy.create_engine('postgresql://').dialect
+        records = pd.DataFrame({'id': [1], 'value': ['']})
+
+        bulk.BulkLoader(connection)._copy_batches(models.AnnotationValue.__table__, records)
+        statement, buffer = connection.connection.cursor().copy_expert.call_args[0]
+
+        self.assertIn("NULL '%s'" % bulk.COPY_NULL, statement)
+        self.assertEqual('1,\n', buffer.getvalue())
+
+
+class FastLoadTests:
+    """Tests of the fast load session, for managers at ``manager`` and the synthetic data at ``data_paths``."""
+
+    manager: Manager
+    data_paths: dict
+
+    def _populate(self, fast_load: bool) -> dict:
+        """Populate all datasets from scratch, and return the detailed summary."""
+        with mock.patch.dict(constants.URLS, self.data_paths):
+            self.manager.populate(force=True, fast_load=fast_load, chunksize=300)
+
+        return self.manager.summarize(detailed=True)
+
+    def test_same_as_normal(self):
+        """Test that a fast and a normal populate give the same records."""
+        normal = self._populate(False)
+        tables = dump_tables(self.manager)
+
+        self.assertEqual(normal, self._populate(True))
+        self.assertEqual(tables, dump_tables(self.manager))
+
+    def test_rollback(self):
+        """Test that an error within the session leaves the database unchanged, despite the commits within."""
+        self._populate(False)
+        tables = dump_tables(self.manager)
+
+        with self.assertRaises(RuntimeError):
+            with self.manager.load_session(fast=True):
+                self.manager._clear(list(DATASETS))
+                self.manager.session.commit()
+                self.assertEqual(0, self.manager.count_interactions())
+                raise RuntimeError('interrupted')
+
+        self.assertFalse(self.manager._fast_load)
+        self.assertEqual(tables, dump_tables(self.manager))
+
+
+class TestFastLoad(FastLoadTests, TemporaryCacheClass):
+    """Test the fast load session on SQLite."""
+
+    def _pragmas(self, connection) -> tuple:
+        """Return the journal mode and the synchronous setting of a connection."""
+        return tuple(connection.execute('PRAGMA %s' % pragma).scalar() for pragma in ('journal_mode', 'synchronous'))
+
+    def test_pragmas(self):
+        """Test that the settings of SQLite are changed within the context, and restored after it."""
+        connection = self.manager.engine.connect()
+
+        try:
+            previous = self._pragmas(connection)
+
+            with self.assertRaises(RuntimeError):
+                with bulk.fast_load(connection):
+                    self.assertEqual(('wal', 0), self._pragmas(connection))
+                    raise RuntimeError('interrupted')
+
+            self.assertEqual(previous, self._pragmas(connection))
+
+            with bulk.fast_load(connection):
+                pass
+
+            self.assertEqual(previous, self._pragmas(connection))
+        finally:
+            connection.close()
+
+        with self.manager.load_session(fast=True):
+            pass
+
+        with self.manager.engine.connect() as connection:
+            self.assertEqual(previous[0], self._pragmas(connection)[0])
+
+
+@unittest.skipUnless(POSTGRESQL_URL, 'set OMNIPATH_TEST_POSTGRESQL to the URL of an empty PostgreSQL database')
+class TestFastLoadPostgreSQL(FastLoadTests, unittest.TestCase):
+    """Test the fast load session on PostgreSQL, writing by ``COPY`` with deferred constraints."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create the tables in the database, and write the synthetic data."""
+        cls.data_directory = tempfile.mkdtemp()
+        cls.data_paths = generate(cls.data_directory, 1000)
+        cls.manager = Manager(connection=POSTGRESQL_URL)
+        cls.manager.create_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Drop the tables, and remove the synthetic data."""
+        cls.manager.session.close()
+        cls.manager.drop_all()
+        shutil.rmtree(cls.data_directory, ignore_errors=True)
+
+    def test_copy(self):
+        """Test that the records are written by ``COPY`` in the fast load session."""
+        copy_batches = bulk.BulkLoader._copy_batches
+
+        with mock.patch.object(bulk.BulkLoader, '_copy_batches', autospec=True, side_effect=copy_batches) as copied:
+            self._populate(True)
+
+        self.assertTrue(copied.called)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for skipping the unchanged datasets when populating Bio2BEL OmniPath."""
+
+import os
+from unittest import mock
+
+import pandas as pd
+
+from bio2bel_omnipath import Manager, constants
+from bio2bel_omnipath.manager import DATASETS
+from tests.cases import TemporaryCacheClass
+
+#: Number of rows loaded in one chunk
+CHUNKSIZE = 300
+
+
+class TestFingerprints(TemporaryCacheClass):
+    """Test that populate loads only the datasets with changed input data."""
+
+    def setUp(self):
+        """Populate all datasets from the synthetic data."""
+        super().setUp()
+        self.paths = dict(self.data_paths)
+        self.manager._clear(list(DATASETS))
+        self._populate()
+
+    def _populate(self, datasets=None) -> list:
+        """Populate the datasets from the current paths, and return the datasets read."""
+        with mock.patch.dict(constants.URLS, self.paths):
+            self.manager.populate(chunksize=CHUNKSIZE, datasets=datasets)
+
+        return [
+            stage['stage'].split('.')[0]
+            for stage in self.manager.profiler.report()
+            if stage['stage'].endswith('.read')
+        ]
+
+    def test_unchanged(self):
+        """Test that populating again with the same input data reads no rows."""
+        fingerprints = self.manager.get_fingerprints()
+
+        self.assertEqual([], self._populate())
+        self.assertEqual(fingerprints, self.manager.get_fingerprints())
+
+    def test_changed(self):
+        """Test that changing one input file loads again only its dataset and the ones depending on it."""
+        for dataset, expected in (
+            ('ptms', ['ptms']),
+            ('annotations', ['annotations']),
+            ('complexes', ['complexes', 'annotations']),
+        ):
+            df = pd.read_table(self.paths[dataset], dtype=str)
+            self.paths[dataset] = os.path.join(self.data_directory, 'changed_%s.tsv' % dataset)
+            df.iloc[:-1].to_csv(self.paths[dataset], sep='\t', index=False)
+            summary = self.manager.summarize()
+
+            with self.subTest(dataset=dataset):
+                self.assertEqual(expected, self._populate())
+                self.assertEqual(summary['interactions'], self.manager.summarize()['interactions'])
+                self.assertEqual([], self._populate())
+
+    def test_select(self):
+        """Test that the chosen datasets are extended by the ones depending on them."""
+        for datasets, bulk, expected in (
+            (['ptms'], True, ['ptms']),
+            (['annotations', 'ptms'], True, ['ptms', 'annotations']),
+            (['complexes'], True, ['complexes', 'annotations']),
+            (['interactions'], True, list(DATASETS)),
+            (['ptms'], False, list(DATASETS)),
+            (None, True, list(DATASETS)),
+        ):
+            with self.subTest(datasets=datasets, bulk=bulk):
+                self.assertEqual(expected, Manager._select_datasets(datasets, bulk=bulk))
+
+        with self.assertRaises(ValueError):
+            Manager._select_datasets(['pathways'])
+
+    def test_datasets(self):
+        """Test that populating chosen datasets loads only those, and the ones depending on them."""
+        for dataset in ('ptms', 'complexes'):
+            df = pd.read_table(self.paths[dataset], dtype=str)
+            self.paths[dataset] = os.path.join(self.data_directory, 'changed_%s.tsv' % dataset)
+            df.iloc[:-1].to_csv(self.paths[dataset], sep='\t', index=False)
+
+        self.assertEqual(['complexes', 'annotations'], self._populate(['complexes']))
+        self.assertEqual(['ptms'], self._populate())
+        self.assertEqual([], self._populate(['interactions']))
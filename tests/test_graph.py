@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the graph index of Bio2BEL OmniPath."""
+
+import shutil
+import tempfile
+
+import networkx as nx
+import numpy as np
+
+from bio2bel_omnipath import models
+from bio2bel_omnipath.graph import GraphIndex
+from tests.cases import TemporaryCacheClass
+
+
+class TestGraphIndex(TemporaryCacheClass):
+    """Test the graph index against the same graph in NetworkX."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build the graph index and a NetworkX graph of the interactions followed in the `out` direction."""
+        super().setUpClass()
+        cls.index = cls.manager.build_graph_index(save=False)
+        cls.graph = nx.DiGraph()
+        cls.graph.add_nodes_from(entity_id for entity_id, in cls.manager.session.query(models.MolecularEntity.id))
+
+        for interaction in cls.manager._list_model(models.Interaction):
+            cls.graph.add_edge(interaction.source_id, interaction.target_id)
+
+            if not interaction.is_directed:
+                cls.graph.add_edge(interaction.target_id, interaction.source_id)
+
+    def setUp(self):
+        """Pick the entities with the most interactions."""
+        super().setUp()
+        degrees = sorted(self.graph.degree, key=lambda item: (-item[1], item[0]))
+        self.hubs = [node for node, _ in degrees[:5]]
+
+    def test_shape(self):
+        """Test the number of nodes and edges, and that each edge has two entries."""
+        self.assertEqual(self.manager.count_proteins(), self.index.n_nodes)
+        self.assertEqual(self.manager.count_interactions(), self.index.n_edges)
+        self.assertEqual(2 * self.index.n_edges, self.index.indptr[-1])
+
+    def test_neighborhood(self):
+        """Test the k-hop neighborhoods."""
+        for k in (1, 2):
+            with self.subTest(k=k):
+                expected = set()
+
+                for hub in self.hubs:
+                    expected.update(nx.single_source_shortest_path_length(self.graph, hub, cutoff=k))
+
+                self.assertEqual(sorted(expected), self.index.neighborhood(self.hubs, k=k).tolist())
+
+    def test_neighborhood_both(self):
+        """Test the neighborhood ignoring the direction of the interactions."""
+        expected = set(self.hubs)
+
+        for hub in self.hubs:
+            expected.update(self.graph.successors(hub))
+            expected.update(self.graph.predecessors(hub))
+
+        self.assertEqual(sorted(expected), self.index.neighborhood(self.hubs, direction='both').tolist())
+
+    def test_neighborhood_types(self):
+        """Test following only some types of interactions."""
+        neighbors = set(self.index.neighborhood(self.hubs[:1], types=['PPI']).tolist())
+        interactions = self.manager.get_interactions_of(self.hubs[:1], types=['PPI'])[self.hubs[0]]
+        expected = {self.hubs[0]}
+
+        for interaction in interactions:
+            if interaction.source_id == self.hubs[0]:
+                expected.add(interaction.target_id)
+            elif not interaction.is_directed:
+                expected.add(interaction.source_id)
+
+        self.assertEqual(expected, neighbors)
+
+    def test_shortest_path(self):
+        """Test that the shortest paths are as long as in NetworkX, and follow existing edges."""
+        lengths = nx.single_source_shortest_path_length(self.graph, self.hubs[0])
+        targets = sorted(lengths)[::7]
+
+        for target in targets:
+            path = self.index.shortest_path(self.hubs[0], target)
+
+            self.assertEqual(lengths[target] + 1, len(path))
+            self.assertEqual(target, path[-1])
+
+            for source_id, target_id in zip(path, path[1:]):
+                self.assertTrue(self.graph.has_edge(source_id, target_id))
+
+    def test_no_path(self):
+        """Test that there is no path to unreachable entities."""
+        unreachable = set(self.graph) - set(nx.single_source_shortest_path_length(self.graph, self.hubs[0]))
+
+        if unreachable:
+            self.assertIsNone(self.index.shortest_path(self.hubs[0], min(unreachable)))
+
+        self.assertEqual([self.hubs[0]], self.index.shortest_path(self.hubs[0], self.hubs[0]))
+
+    def test_unknown_entity(self):
+        """Test that unknown entities are an error."""
+        with self.assertRaises(KeyError):
+            self.index.neighborhood([max(self.graph) + 1])
+
+    def test_subgraph(self):
+        """Test the subgraph induced by the neighborhood of a hub."""
+        nodes = self.index.neighborhood(self.hubs[:1])
+        subgraph = self.index.subgraph(nodes)
+        expected = self.manager.session.query(models.Interaction.id).filter(
+            models.Interaction.source_id.in_(nodes.tolist()),
+            models.Interaction.target_id.in_(nodes.tolist()),
+        )
+
+        self.assertEqual(nodes.tolist(), subgraph.node_ids.tolist())
+        self.assertEqual(sorted(interaction_id for interaction_id, in expected), subgraph.interaction_ids.tolist())
+        self.assertEqual(nodes.tolist(), subgraph.neighborhood(self.hubs[:1]).tolist())
+
+    def test_save_load(self):
+        """Test saving the index and loading it memory mapped."""
+        directory = tempfile.mkdtemp()
+
+        try:
+            index = self.manager.get_graph_index(directory=directory)
+
+            self.assertIsInstance(index.indices, np.memmap)
+            self.assertIs(index, self.manager.get_graph_index(directory=directory))
+
+            for name in GraphIndex.ARRAYS:
+                np.testing.assert_array_equal(getattr(self.index, name), getattr(index, name))
+
+            self.assertEqual(self.index.type_names, index.type_names)
+            self.assertEqual(
+                self.index.neighborhood(self.hubs, k=2).tolist(),
+                index.neighborhood(self.hubs, k=2).tolist(),
+            )
+        finally:
+            shutil.rmtree(directory)
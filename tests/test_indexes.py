@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the indexes of the Bio2BEL OmniPath database."""
+
+import sqlalchemy
+
+from bio2bel_omnipath import models
+from bio2bel_omnipath.bulk import BulkLoader
+from tests.cases import TemporaryCacheClass
+
+INTERACTION_SOURCE_INDEX = 'ix_%s_source_target_type' % models.INTERACTION_TABLE_NAME
+INTERACTION_TARGET_INDEX = 'ix_%s_target_source' % models.INTERACTION_TABLE_NAME
+PTM_SITE_INDEX = 'ix_%s_target_residue_offset' % models.PTM_TABLE_NAME
+
+
+def _index(name: str, table: str, *columns: str) -> sqlalchemy.Index:
+    """Make an index on a copy of a table, not to alter the tables of the models."""
+    copy = sqlalchemy.Table(table, sqlalchemy.MetaData(), *(sqlalchemy.Column(column) for column in columns))
+
+    return sqlalchemy.Index(name, *(copy.c[column] for column in columns))
+
+
+class TestIndexes(TemporaryCacheClass):
+    """Test that the frequent queries use the intended indexes."""
+
+    def query_plan(self, query) -> str:
+        """Return the SQLite query plan of a query as one string."""
+        statement = query.statement.compile(dialect=self.manager.engine.dialect)
+        parameters = [statement.params[name] for name in statement.positiontup]
+        rows = self.manager.engine.execute('EXPLAIN QUERY PLAN %s' % statement, parameters)
+
+        return ' '.join(row[-1] for row in rows)
+
+    def index_names(self, table: str) -> set:
+        """Return the names of the indexes of a table in the database."""
+        return {index['name'] for index in sqlalchemy.inspect(self.manager.engine).get_indexes(table)}
+
+    def test_no_boolean_indexes(self):
+        """Test that the boolean columns of interactions are not indexed."""
+        indexes = self.index_names(models.INTERACTION_TABLE_NAME)
+
+        self.assertEqual({INTERACTION_SOURCE_INDEX, INTERACTION_TARGET_INDEX}, indexes)
+
+    def test_neighbors_by_source(self):
+        """Test that the interactions of a source use the source, target, type index."""
+        query = self.manager.session.query(models.Interaction).filter(models.Interaction.source_id == 1)
+
+        self.assertIn(INTERACTION_SOURCE_INDEX, self.query_plan(query))
+
+    def test_neighbors_by_target(self):
+        """Test that the interactions of a target use the target, source index."""
+        query = self.manager.session.query(models.Interaction).filter(models.Interaction.target_id == 1)
+
+        self.assertIn(INTERACTION_TARGET_INDEX, self.query_plan(query))
+
+    def test_interactions_between(self):
+        """Test that the interactions of a type between two entities use the source, target, type index."""
+        query = self.manager.session.query(models.Interaction).filter(
+            models.Interaction.source_id == 1,
+            models.Interaction.target_id == 2,
+            models.Interaction.type_id == 1,
+        )
+
+        self.assertIn(INTERACTION_SOURCE_INDEX, self.query_plan(query))
+
+    def test_ptm_site(self):
+        """Test that the PTMs on a site use the target, residue, offset index."""
+        query = self.manager.session.query(models.Ptm).filter(
+            models.Ptm.target_id == 1,
+            models.Ptm.residue_type == 'S',
+            models.Ptm.sequence_offset == 10,
+        )
+        plan = self.query_plan(query)
+
+        self.assertIn(PTM_SITE_INDEX, plan)
+        self.assertIn('sequence_offset=?', plan)
+
+    def test_rebuild_indexes(self):
+        """Test that the secondary indexes are dropped and created again by bulk loading."""
+        loader = BulkLoader(self.manager.engine)
+        indexes = loader.secondary_indexes([models.INTERACTION_TABLE_NAME])
+
+        self.assertEqual(2, len(loader.drop_indexes(indexes)))
+        self.assertEqual(set(), self.index_names(models.INTERACTION_TABLE_NAME))
+        self.assertEqual(2, len(loader.create_indexes(indexes)))
+        self.assertEqual(0, len(loader.create_indexes(indexes)))
+
+        self.manager.populate_interactions(interactions=self.data_paths['interactions'], rebuild_indexes=True)
+
+        self.assertEqual(
+            {INTERACTION_SOURCE_INDEX, INTERACTION_TARGET_INDEX},
+            self.index_names(models.INTERACTION_TABLE_NAME),
+        )
+
+    def test_revise_indexes(self):
+        """Test that the indexes of the earlier schema are replaced."""
+        table = models.INTERACTION_TABLE_NAME
+        legacy = _index('ix_%s_is_directed' % table, table, 'is_directed')
+        legacy.create(self.manager.engine)
+        _index(INTERACTION_TARGET_INDEX, table, 'target_id').drop(self.manager.engine)
+
+        revised = self.manager.revise_indexes()
+
+        self.assertEqual([legacy.name], revised['dropped'])
+        self.assertEqual([INTERACTION_TARGET_INDEX], revised['created'])
+        self.assertEqual(
+            {INTERACTION_SOURCE_INDEX, INTERACTION_TARGET_INDEX},
+            self.index_names(models.INTERACTION_TABLE_NAME),
+        )
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for parsing the OmniPath data for Bio2BEL OmniPath."""
+
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from bio2bel_omnipath import constants, parser
+from tests.synthetic import generate, generate_interactions
+
+
+@unittest.skipIf(parser.pyarrow is None, 'pyarrow is not installed')
+class TestColumnarCache(unittest.TestCase):
+    """Test the columnar (Feather) cache of the parsed data frames."""
+
+    def setUp(self):
+        """Write synthetic interactions into a temporary directory."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'interactions.tsv')
+        self.interactions = generate_interactions(100)
+        self.interactions.to_csv(self.path, sep='\t', index=False)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _caches(self) -> list:
+        """Return the paths of the columnar caches of the input file."""
+        return glob.glob('%s.*.feather' % self.path)
+
+    def test_invalidation(self):
+        """Test that the cache is used for an unchanged file, and rebuilt after the file has been modified."""
+        first = parser.get('interactions', url=self.path)
+        caches = self._caches()
+
+        self.assertEqual([parser.columnar_path(self.path)], caches)
+        self.assertIsNotNone(parser.read_columnar(self.path))
+        pd.testing.assert_frame_equal(first, parser.get('interactions', url=self.path))
+
+        modified = self.interactions.iloc[:60].copy()
+        modified['source'] = modified['source'].str.lower()
+        modified.to_csv(self.path, sep='\t', index=False)
+        second = parser.get('interactions', url=self.path)
+
+        self.assertEqual(60, len(second))
+        self.assertEqual(sorted(modified['source'].unique()), sorted(second['source'].unique()))
+        self.assertEqual([parser.columnar_path(self.path)], self._caches())
+        self.assertNotEqual(caches, self._caches())
+        pd.testing.assert_frame_equal(second, parser.get('interactions', url=self.path, columnar_cache=False))
+
+
+class TestFetchAll(unittest.TestCase):
+    """Test retrieving the datasets concurrently, with the errors of the failed ones collected."""
+
+    def setUp(self):
+        """Write synthetic data, to be returned by a mock download of the default URLs."""
+        self.directory = tempfile.mkdtemp()
+        self.paths = generate(self.directory, 100)
+        self.query_types = {url: query_type for query_type, url in constants.URLS.items()}
+        # all downloads have to be in progress at the same time to pass
+        self.barrier = threading.Barrier(len(self.paths), timeout=10)
+
+    def tearDown(self):
+        """Remove the synthetic data."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _download(self, url, **kwargs):
+        """Return the path of the synthetic data of a URL, the PTMs fail."""
+        query_type = self.query_types[url]
+        self.barrier.wait()
+
+        if query_type == 'ptms':
+            raise urllib.error.URLError('connection refused')
+
+        return self.paths[query_type]
+
+    def test_errors(self):
+        """Test that the other datasets are retrieved in parallel, and the failed one listed in the error."""
+        with mock.patch.object(parser, 'download', self._download):
+            with self.assertRaises(parser.FetchError) as context:
+                parser.fetch_all(columnar_cache=False)
+
+        error = context.exception
+
+        self.assertEqual(['ptms'], list(error.errors))
+        self.assertIsInstance(error.errors['ptms'], urllib.error.URLError)
+        self.assertIn('`ptms`', str(error))
+        self.assertEqual({'interactions', 'complexes', 'annotations'}, set(error.results))
+
+        for query_type, df in error.results.items():
+            with self.subTest(query_type=query_type):
+                self.assertEqual(len(pd.read_table(self.paths[query_type])), len(df))
+
+    def test_no_raise(self):
+        """Test that without raising the errors, the retrieved datasets are returned."""
+        self.barrier = threading.Barrier(1)
+
+        with mock.patch.object(parser, 'download', self._download):
+            paths = parser.fetch_all(parse=False, raise_errors=False)
+
+        self.assertEqual({'interactions', 'complexes', 'annotations'}, set(paths))
+        self.assertEqual(self.paths['interactions'], paths['interactions'])
+
+
+class TestExplode(unittest.TestCase):
+    """Test exploding semicolon separated lists into arrays of row positions and elements."""
+
+    def test_explode(self):
+        """Test that NAs and empty elements are skipped, and the rows kept in order."""
+        for dtype in (object, 'category'):
+            with self.subTest(dtype=dtype):
+                values = pd.Series(['a;b', np.nan, '', 'c;;a ', 'a;b', 'd;'], dtype=dtype)
+                rows, elements = parser.explode(values)
+
+                self.assertEqual(np.int64, rows.dtype)
+                self.assertEqual([0, 0, 3, 3, 4, 4, 5], rows.tolist())
+                self.assertEqual(['a', 'b', 'c', 'a', 'a', 'b', 'd'], elements.tolist())
+
+    def test_pubmed_ids(self):
+        """Test that the PubMed IDs are converted to integers, also with resource prefixes, skipping other elements."""
+        values = pd.Series(['1000013;1000009', np.nan, 'SIGNOR:42;PMC7;', '', '1000013'], dtype=object)
+        rows, pubmed_ids = parser.explode_pubmed_ids(values)
+
+        self.assertEqual(np.int64, pubmed_ids.dtype)
+        self.assertEqual([0, 0, 2, 4], rows.tolist())
+        self.assertEqual([1000013, 1000009, 42, 1000013], pubmed_ids.tolist())
+
+    def test_empty(self):
+        """Test that columns without elements give empty arrays."""
+        for values in (pd.Series([], dtype=object), pd.Series([np.nan, ''], dtype=object)):
+            rows, pubmed_ids = parser.explode_pubmed_ids(values)
+
+            self.assertEqual(([], []), (rows.tolist(), pubmed_ids.tolist()))
+            self.assertEqual(np.int64, pubmed_ids.dtype)
+
+    def test_group_rows(self):
+        """Test grouping the elements by row as Python objects."""
+        values = pd.Series(['1;2', np.nan, '3'], dtype=object)
+
+        self.assertEqual([[1, 2], [], [3]], parser.group_rows(*parser.explode_pubmed_ids(values), len(values)))
+
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the loading pipeline of Bio2BEL OmniPath."""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from bio2bel_omnipath import models, parser, stats
+from bio2bel_omnipath.bulk import BulkLoader
+from bio2bel_omnipath.pipeline import pipeline
+from tests.cases import TemporaryCacheClass, dump_tables
+
+
+class TestPipeline(unittest.TestCase):
+    """Test the producer/consumer pipeline of threads."""
+
+    def test_order(self):
+        """Test that the functions are applied in sequence, and the results yielded in order."""
+        with pipeline(range(100), lambda x: x * 2, lambda x: x + 1) as results:
+            self.assertEqual([x * 2 + 1 for x in range(100)], list(results))
+
+    def test_backpressure(self):
+        """Test that a stage does not run ahead of its consumer by more than the queue sizes."""
+        produced = []
+
+        def produce():
+            for i in range(50):
+                produced.append(i)
+                yield i
+
+        with pipeline(produce(), lambda x: x, maxsize=2) as results:
+            for i in results:
+                time.sleep(.01)
+                # two queues, and one item in each of the two threads
+                self.assertLessEqual(len(produced) - i - 1, 6)
+
+    def test_error(self):
+        """Test that the errors of the reader and of the functions are raised in the consumer."""
+        def read():
+            yield 1
+            raise OSError('unreadable')
+
+        def build(x):
+            if x == 3:
+                raise ValueError('invalid')
+            return x
+
+        for items, exception in ((read(), OSError), (range(10), ValueError)):
+            with self.subTest(exception=exception):
+                consumed = []
+
+                with self.assertRaises(exception):
+                    with pipeline(items, build) as results:
+                        consumed.extend(results)
+
+                self.assertLessEqual(consumed, [1, 2])
+
+    def test_early_exit(self):
+        """Test that leaving the pipeline early stops and joins the threads."""
+        n_threads = threading.active_count()
+
+        def endless():
+            i = 0
+            while True:
+                yield i
+                i += 1
+
+        with pipeline(endless(), lambda x: x) as results:
+            for i in results:
+                if i == 5:
+                    break
+
+        self.assertEqual(n_threads, threading.active_count())
+
+
+class TestPipelinedLoad(TemporaryCacheClass):
+    """Test loading by chunks in the pipeline."""
+
+    def _populate_chunked(self, pipelined: bool) -> dict:
+        """Clear and load the interactions and PTMs by small chunks, and return the detailed summary."""
+        self.manager._pipelined = pipelined
+        self.manager.pipeline_queue_size = 1
+
+        try:
+            self.manager._clear(['interactions'])
+            self.manager.populate_interactions(interactions=self.data_paths['interactions'], chunksize=97)
+            self.manager.populate_ptms(ptms=self.data_paths['ptms'], chunksize=97)
+        finally:
+            del self.manager._pipelined
+            del self.manager.pipeline_queue_size
+
+        return self.manager.summarize(detailed=True)
+
+    def test_same_as_sequential(self):
+        """Test that the pipelined load gives the same records as the sequential one."""
+        pipelined = self._populate_chunked(True)
+        interactions = self.manager.session.query(models.Interaction.source_id, models.Interaction.target_id).all()
+
+        self.assertEqual(self._populate_chunked(False), pipelined)
+        self.assertEqual(
+            interactions,
+            self.manager.session.query(models.Interaction.source_id, models.Interaction.target_id).all(),
+        )
+
+    def test_error(self):
+        """Test that an error while reading is raised, with the chunks before it committed."""
+        chunk = next(parser.iter_chunks('ptms', chunksize=10, url=self.data_paths['ptms']))
+
+        def chunks():
+            yield chunk
+            raise OSError('connection lost')
+
+        self.manager._clear(['ptms'])
+
+        with self.assertRaises(OSError):
+            self.manager._load_bulk('ptms', chunks())
+
+        self.assertEqual(
+            len(chunk.drop_duplicates(['enzyme', 'substrate', 'residue_type', 'residue_offset', 'modification'])),
+            stats.summary(self.manager.session.connection())['ptms'],
+        )
+        self.manager.populate_ptms(ptms=self.data_paths['ptms'])
+
+    def test_retry(self):
+        """Test that loading again by the same manager after a failed write gives the same records as at first."""
+        tables = dump_tables(self.manager)
+        write = BulkLoader.write
+        written = []
+
+        def failing_write(loader, records):
+            if models.PTM_TABLE_NAME in records:
+                if len(written) == 2:
+                    raise OSError('connection lost')
+                written.append(records)
+            write(loader, records)
+
+        self.manager._clear(['ptms'])
+
+        with mock.patch.object(BulkLoader, 'write', failing_write):
+            with self.assertRaises(OSError):
+                self.manager.populate_ptms(ptms=self.data_paths['ptms'], chunksize=97)
+
+        self.manager.populate_ptms(ptms=self.data_paths['ptms'], chunksize=97)
+
+        self.assertEqual(tables, dump_tables(self.manager))
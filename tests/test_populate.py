@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for populating the Bio2BEL OmniPath database."""
+
+import pandas as pd
+
+from bio2bel_omnipath import models
+from bio2bel_omnipath.manager import DATASETS
+from tests.cases import TemporaryCacheClass, dump_tables
+
+
+class TestPopulate(TemporaryCacheClass):
+    """Test the records loaded into the database by the bulk and the ORM modes."""
+
+    def _expected(self) -> set:
+        """Return the PubMed IDs of the interactions and PTMs in the input files."""
+        return {
+            int(pubmed_id)
+            for dataset in ('interactions', 'ptms')
+            for pubmed_id in pd.read_table(self.data_paths[dataset], dtype=str)['references'].str.split(';').explode()
+            if isinstance(pubmed_id, str) and pubmed_id
+        }
+
+    def _loaded(self) -> set:
+        """Return the PubMed IDs in the database, checking that they are integers."""
+        pubmed_ids = [pubmed_id for pubmed_id, in self.manager.session.query(models.Reference.pubmed_id)]
+
+        self.assertTrue(all(isinstance(pubmed_id, int) for pubmed_id in pubmed_ids))
+        self.assertEqual(len(pubmed_ids), len(set(pubmed_ids)))
+
+        return set(pubmed_ids)
+
+    def test_references(self):
+        """Test that the references of the bulk load are the integer PubMed IDs of the input."""
+        self.assertEqual(self._expected(), self._loaded())
+
+    def test_orm(self):
+        """Test that loading by the ORM gives the same records in all tables as the bulk load."""
+        tables = dump_tables(self.manager)
+
+        self.manager._clear(list(DATASETS))
+        self.manager.populate_interactions(bulk=False, interactions=self.data_paths['interactions'])
+        self.manager.populate_ptms(bulk=False, ptms=self.data_paths['ptms'])
+
+        self.assertEqual(self._expected(), self._loaded())
+
+        for name, records in dump_tables(self.manager).items():
+            with self.subTest(table=name):
+                self.assertEqual(tables[name], records)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the stage level profiling of Bio2BEL OmniPath."""
+
+import time
+import unittest
+
+from bio2bel_omnipath.profiling import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    """Test recording the time, rows and memory use of stages."""
+
+    def test_stages(self):
+        """Test the names in the order of their first start, the rows summed up, and the times of nested stages."""
+        profiler = Profiler()
+
+        for chunk in profiler.iterate('read', [[1, 2, 3], [4, 5]]):
+            with profiler.stage('build', rows=len(chunk)):
+                with profiler.stage('write'):
+                    time.sleep(.01)
+                    profiler.add_rows('write', len(chunk))
+
+        report = profiler.report()
+        stages = {stage['stage']: stage for stage in report}
+
+        self.assertEqual(['read', 'build', 'write'], [stage['stage'] for stage in report])
+        self.assertEqual({'read': 5, 'build': 5, 'write': 5}, {name: stage['rows'] for name, stage in stages.items()})
+        self.assertGreaterEqual(stages['write']['seconds'], .02)
+        # the time of the nested stage is not included
+        self.assertLess(stages['build']['seconds'], stages['write']['seconds'])
+
+        for stage in report:
+            with self.subTest(stage=stage['stage']):
+                self.assertGreaterEqual(stage['seconds'], 0)
+                self.assertGreater(stage['rows_per_sec'], 0)
+                if stage['peak_rss_growth_mb'] is not None:
+                    self.assertGreaterEqual(stage['peak_rss_growth_mb'], 0)
+
+    def test_empty_stage(self):
+        """Test a stage without rows, and one failing, which is still recorded."""
+        profiler = Profiler()
+
+        with profiler.stage('download'):
+            pass
+
+        with self.assertRaises(ValueError):
+            with profiler.stage('parse'):
+                raise ValueError
+
+        report = profiler.report()
+
+        self.assertEqual(['download', 'parse'], [stage['stage'] for stage in report])
+        self.assertEqual([0, 0], [stage['rows'] for stage in report])
+        self.assertEqual([None, None], [stage['rows_per_sec'] for stage in report])
+        self.assertTrue(all(stage['seconds'] >= 0 for stage in report))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for linking the PTMs to the interactions between the same partners in Bio2BEL OmniPath."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from bio2bel_omnipath import Manager, models
+from bio2bel_omnipath.bulk import BulkLoader
+from tests.cases import TemporaryCacheClass
+
+#: Interactions between the proteins A-F: undirected A-B, directed C->D, and a directed transcriptional E->F
+INTERACTIONS = pd.DataFrame({
+    'source': ['A', 'C', 'E'],
+    'target': ['B', 'D', 'F'],
+    'source_genesymbol': ['GA', 'GC', 'GE'],
+    'target_genesymbol': ['GB', 'GD', 'GF'],
+    'is_directed': [0, 1, 1],
+    'is_stimulation': [0, 1, 1],
+    'is_inhibition': [0, 0, 0],
+    'sources': ['BioGRID', 'Signor', 'TRRUST'],
+    'references': ['1000001', '1000002', '1000003'],
+    'type': ['PPI', 'PPI', 'TF'],
+    'ncbi_tax_id_source': [9606] * 3,
+    'ncbi_tax_id_target': [9606] * 3,
+})
+
+#: PTMs in both orientations of each interaction
+PTMS = pd.DataFrame({
+    'enzyme': ['A', 'B', 'C', 'D', 'E'],
+    'substrate': ['B', 'A', 'D', 'C', 'F'],
+    'enzyme_genesymbol': ['GA', 'GB', 'GC', 'GD', 'GE'],
+    'substrate_genesymbol': ['GB', 'GA', 'GD', 'GC', 'GF'],
+    'residue_type': ['S', 'T', 'Y', 'S', 'T'],
+    'residue_offset': [10, 20, 30, 40, 50],
+    'modification': ['phosphorylation'] * 5,
+    'sources': ['PhosphoSite'] * 5,
+    'references': ['1000004'] * 5,
+    'ncbi_tax_id': [9606] * 5,
+})
+
+
+def get_links(manager: Manager) -> set:
+    """Return the links of the PTMs to the interactions as pairs of their partners' primary IDs."""
+    entities = dict(manager.session.query(models.MolecularEntity.id, models.MolecularEntity.primary_id))
+    partners = {
+        model: {
+            record_id: (entities[source_id], entities[target_id])
+            for record_id, source_id, target_id in manager.session.query(model.id, model.source_id, model.target_id)
+        }
+        for model in (models.Interaction, models.Ptm)
+    }
+
+    return {
+        (partners[models.Interaction][interaction_id], partners[models.Ptm][ptm_id])
+        for interaction_id, ptm_id in manager.session.execute(models.assoc_int_ptm.select())
+    }
+
+
+class TestOrientation(unittest.TestCase):
+    """Test which interactions the PTMs are linked to."""
+
+    def setUp(self):
+        """Write the interactions and PTMs."""
+        self.directory = tempfile.mkdtemp()
+        self.paths = {}
+
+        for query_type, df in (('interactions', INTERACTIONS), ('ptms', PTMS)):
+            self.paths[query_type] = os.path.join(self.directory, '%s.tsv' % query_type)
+            df.to_csv(self.paths[query_type], sep='\t', index=False)
+
+    def tearDown(self):
+        """Remove the data and the databases."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_orientation(self):
+        """Test that undirected PPIs are linked in both orientations, directed ones and other types only forward."""
+        expected = {
+            (('A', 'B'), ('A', 'B')),
+            (('A', 'B'), ('B', 'A')),
+            (('C', 'D'), ('C', 'D')),
+        }
+
+        for bulk in (True, False):
+            with self.subTest(bulk=bulk):
+                manager = Manager(connection='sqlite:///%s' % os.path.join(self.directory, '%s.db' % bulk))
+                manager.populate_interactions(bulk=bulk, interactions=self.paths['interactions'])
+                manager.populate_ptms(bulk=bulk, ptms=self.paths['ptms'])
+
+                self.assertEqual(expected, get_links(manager))
+                self.assertEqual(0, manager.link_ptms())
+                manager.session.close()
+
+
+class TestLinks(TemporaryCacheClass):
+    """Test linking the PTMs of the synthetic data."""
+
+    def test_separate_manager(self):
+        """Test that the PTMs loaded by a new manager, after the interactions, are linked as by the same manager."""
+        expected = get_links(self.manager)
+        self.manager._clear(['ptms'])
+
+        self.assertEqual(set(), get_links(self.manager))
+
+        manager = Manager(connection=self.manager.connection)
+        manager.populate_ptms(ptms=self.data_paths['ptms'])
+
+        self.assertLess(0, len(expected))
+        self.assertEqual(expected, get_links(manager))
+        manager.session.close()
+
+    def test_idempotent(self):
+        """Test that linking again inserts no links."""
+        links = get_links(self.manager)
+        connection = self.manager.session.connection()
+
+        self.assertEqual(0, BulkLoader(connection).link_ptms())
+        self.assertEqual(0, self.manager.link_ptms())
+        self.assertEqual(links, get_links(self.manager))
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the query API of Bio2BEL OmniPath."""
+
+import unittest
+
+import sqlalchemy
+
+from bio2bel_omnipath import models
+from bio2bel_omnipath.lru import LruCache
+from tests.cases import TemporaryCacheClass
+
+
+class TestLruCache(unittest.TestCase):
+    """Test the least recently used cache."""
+
+    def test_evict_least_recently_used(self):
+        """Test that the least recently used item is evicted from a full cache."""
+        cache = LruCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.hits)
+
+    def test_clear(self):
+        """Test that clearing removes the items and resets the counters."""
+        cache = LruCache(2)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('b'))
+        cache.clear()
+
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.misses)
+
+
+class TestQueries(TemporaryCacheClass):
+    """Test the batched queries of the manager."""
+
+    def setUp(self):
+        """Clear the cache, and query at most 7 keys at once to test the chunking."""
+        super().setUp()
+        self.manager.clear_query_cache()
+        self.manager.query_chunk_size = 7
+        self.entities = self.manager.session.query(models.MolecularEntity).order_by(models.MolecularEntity.id).all()
+
+    def test_get_entities(self):
+        """Test retrieving entities by primary IDs, skipping the unknown ones."""
+        primary_ids = [entity.primary_id for entity in self.entities[:20]]
+        entities = self.manager.get_entities(primary_ids + ['NOTANID'])
+
+        self.assertEqual(primary_ids, list(entities))
+        self.assertEqual(self.entities[:20], list(entities.values()))
+
+    def test_get_interactions_of(self):
+        """Test that the interactions of entities are the same as by one query per entity."""
+        entity_ids = [entity.id for entity in self.entities[:30]]
+        interaction = models.Interaction
+
+        for direction, condition in (
+            ('out', lambda entity_id: interaction.source_id == entity_id),
+            ('in', lambda entity_id: interaction.target_id == entity_id),
+            ('both', lambda entity_id: sqlalchemy.or_(
+                interaction.source_id == entity_id,
+                interaction.target_id == entity_id,
+            )),
+        ):
+            with self.subTest(direction=direction):
+                interactions = self.manager.get_interactions_of(entity_ids, direction=direction)
+
+                self.assertEqual(entity_ids, list(interactions))
+
+                for entity_id in entity_ids:
+                    expected = self.manager.session.query(interaction).filter(condition(entity_id)).all()
+                    self.assertEqual(
+                        sorted(record.id for record in expected),
+                        sorted(record.id for record in interactions[entity_id]),
+                    )
+
+    def test_get_interactions_of_types(self):
+        """Test filtering the interactions by type."""
+        entity_ids = [entity.id for entity in self.entities[:30]]
+        interactions = self.manager.get_interactions_of(entity_ids, types=['PPI'])
+
+        self.assertTrue(any(interactions.values()))
+
+        for records in interactions.values():
+            for record in records:
+                self.assertEqual('PPI', record.type.interaction_type)
+
+    def test_get_interactions_of_direction(self):
+        """Test that an unknown direction is an error."""
+        with self.assertRaises(ValueError):
+            self.manager.get_interactions_of([1], direction='sideways')
+
+    def test_get_ptms_on(self):
+        """Test retrieving the PTMs on substrates."""
+        target_ids = [entity.id for entity in self.entities[:30]]
+        ptms = self.manager.get_ptms_on(target_ids)
+
+        self.assertEqual(
+            self.manager.session.query(models.Ptm).filter(models.Ptm.target_id.in_(target_ids)).count(),
+            sum(map(len, ptms.values())),
+        )
+
+        for target_id, records in ptms.items():
+            for record in records:
+                self.assertEqual(target_id, record.target_id)
+
+    def test_cache(self):
+        """Test that repeated queries are answered from the cache, and populating clears it."""
+        entity_ids = [entity.id for entity in self.entities[:10]]
+        first = self.manager.get_ptms_on(entity_ids)
+        cache = self.manager._get_query_cache()
+
+        self.assertEqual(10, len(cache))
+        self.assertEqual(0, cache.hits)
+
+        second = self.manager.get_ptms_on(entity_ids)
+
+        self.assertEqual(first, second)
+        self.assertEqual(10, cache.hits)
+
+        self.manager.populate_ptms(ptms=self.data_paths['ptms'])
+
+        self.assertEqual(0, len(cache))
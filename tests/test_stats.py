@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the statistics of Bio2BEL OmniPath."""
+
+import collections
+import os
+from unittest import mock
+
+import networkx as nx
+import pandas as pd
+
+from bio2bel_omnipath import constants, models, stats
+from tests.cases import TemporaryCacheClass
+from tests.synthetic import generate
+
+
+class TestStatistics(TemporaryCacheClass):
+    """Test the statistics against the records they are computed from."""
+
+    def setUp(self):
+        """Compute all statistics."""
+        super().setUp()
+        self.summary = self.manager.summarize(detailed=True)
+        self.connection = self.manager.session.connection()
+
+    def test_summary(self):
+        """Test that the summary is the same from the statistics and by counting the records."""
+        expected = {
+            'interactions': self.manager.count_interactions(),
+            'ptms': self.manager.count_ptms(),
+            'proteins': self.manager.count_proteins(),
+            'complexes': self.manager.count_complexes(),
+            'annotations': self.manager.count_annotations(),
+        }
+
+        self.assertEqual(expected, self.manager.summarize())
+        self.assertTrue(self.manager.is_populated())
+
+        stats.invalidate(self.connection)
+
+        self.assertEqual({}, stats.read(self.connection))
+        self.assertEqual(expected, self.manager.summarize())
+
+    def test_tables(self):
+        """Test the number of records of each table."""
+        for name, count in self.summary['tables'].items():
+            table = models.Base.metadata.tables[name]
+            with self.subTest(table=name):
+                self.assertEqual(self.manager.session.query(table).count(), count)
+
+        self.assertNotIn(models.STATISTIC_TABLE_NAME, self.summary['tables'])
+
+    def test_types(self):
+        """Test the number of interactions and PTMs by type, and of the records by resource."""
+        interaction_types = collections.Counter(
+            interaction.type.interaction_type
+            for interaction in self.manager._list_model(models.Interaction)
+        )
+        ptms = pd.read_table(self.data_paths['ptms'])
+
+        self.assertEqual(dict(interaction_types), self.summary['interaction_types'])
+        self.assertEqual(sum(self.summary['ptm_types'].values()), self.manager.count_ptms())
+        self.assertEqual(
+            self.manager.session.query(models.assoc_int_res).count(),
+            sum(self.summary['interaction_resources'].values()),
+        )
+        self.assertLessEqual(set(ptms['sources'].str.split(';').explode()), set(self.summary['ptm_resources']))
+
+    def test_taxons(self):
+        """Test the number of entities by taxon, with integer keys."""
+        expected = collections.Counter(
+            entity.taxon.ncbi_taxonomy_id
+            for entity in self.manager._list_model(models.MolecularEntity)
+        )
+
+        self.assertEqual(dict(expected), self.summary['taxons'])
+
+    def test_degrees(self):
+        """Test the degree distributions against the same graph in NetworkX."""
+        graph = nx.MultiDiGraph()
+        graph.add_nodes_from(entity_id for entity_id, in self.manager.session.query(models.MolecularEntity.id))
+        graph.add_edges_from(self.manager.session.query(models.Interaction.source_id, models.Interaction.target_id))
+
+        for category, degrees in (
+            ('degrees', graph.degree),
+            ('out_degrees', graph.out_degree),
+            ('in_degrees', graph.in_degree),
+        ):
+            with self.subTest(category=category):
+                expected = collections.Counter(degree for _, degree in degrees)
+                self.assertEqual(dict(expected), self.summary[category])
+
+    def test_incremental(self):
+        """Test that clearing and loading the PTMs again recomputes only the statistics depending on their tables."""
+        self.assertEqual([], stats.refresh(self.connection))
+
+        self.manager._clear(['ptms'])
+        self.manager.populate_ptms(ptms=self.data_paths['ptms'])
+        refreshed = stats.refresh(self.manager.session.connection())
+
+        self.assertIn('tables:%s' % models.PTM_TABLE_NAME, refreshed)
+        self.assertIn('ptm_types', refreshed)
+        self.assertNotIn('interaction_types', refreshed)
+        self.assertNotIn('degrees', refreshed)
+        self.assertEqual(self.summary, self.manager.summarize(detailed=True))
+
+
+class TestUpdateStatistics(TemporaryCacheClass):
+    """Test that updating the database keeps the statistics up to date."""
+
+    def test_update(self):
+        """Test that the statistics after an update are the same as computed from scratch."""
+        paths = generate(os.path.join(self.data_directory, 'update'), self.n_interactions, seed=1)
+
+        self.manager.summarize(detailed=True)
+
+        with mock.patch.dict(constants.URLS, paths):
+            self.manager.update()
+
+        connection = self.manager.session.connection()
+        computed = stats.read(connection)
+
+        self.assertEqual(len(stats.GROUPS), len(computed[stats.COMPUTED]))
+
+        stats.invalidate(connection)
+        stats.refresh(connection)
+
+        self.assertEqual(computed, stats.read(connection))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for updating the Bio2BEL OmniPath database to changed data."""
+
+import os
+import tempfile
+from unittest import mock
+
+import pandas as pd
+
+from bio2bel_omnipath import Manager, constants, models
+from tests.cases import TemporaryCacheClass, dump_tables
+from tests.synthetic import generate
+
+
+class TestUpdate(TemporaryCacheClass):
+    """Test that updating gives the same records as populating from scratch."""
+
+    def setUp(self):
+        """Populate all datasets, and write the interactions and PTMs with records removed, changed and added."""
+        super().setUp()
+
+        with mock.patch.dict(constants.URLS, self.data_paths):
+            self.manager.populate()
+
+        directory = os.path.join(self.data_directory, 'changed')
+        added = generate(os.path.join(directory, 'added'), 100, seed=1)
+        self.paths = dict(self.data_paths)
+
+        for query_type, n_removed, n_changed in (('interactions', 50, 50), ('ptms', 30, 30)):
+            df = pd.read_table(self.data_paths[query_type], dtype=str)
+            df = df.iloc[n_removed:].copy()
+            changed = df.index[:n_changed]
+            df.loc[changed, 'sources'] = 'NewResource'
+            df.loc[changed, 'references'] = '2000001;2000002'
+            df = pd.concat([df, pd.read_table(added[query_type], dtype=str)], ignore_index=True)
+
+            self.paths[query_type] = os.path.join(directory, '%s.tsv' % query_type)
+            df.to_csv(self.paths[query_type], sep='\t', index=False)
+
+    def test_update(self):
+        """Test that all tables, including the associations and the links of PTMs, are the same as populated anew."""
+        with mock.patch.dict(constants.URLS, self.paths):
+            changes = self.manager.update()
+
+            with tempfile.TemporaryDirectory() as directory:
+                fresh = Manager(connection='sqlite:///%s' % os.path.join(directory, 'fresh.db'))
+                fresh.populate(force=True)
+                expected = dump_tables(fresh)
+                fresh.session.close()
+
+        self.assertLess(0, sum(change['deleted'] for change in changes.values()))
+        self.assertLess(0, sum(change['inserted'] for change in changes.values()))
+
+        for name, records in dump_tables(self.manager).items():
+            with self.subTest(table=name):
+                self.assertEqual(expected[name], records)
+
+    def test_datasets(self):
+        """Test that updating only the PTMs keeps the interactions, and gives the PTMs as populated anew."""
+        paths = dict(self.data_paths, ptms=self.paths['ptms'])
+        fingerprint = self.manager.get_fingerprints()['interactions']
+
+        with mock.patch.dict(constants.URLS, self.paths):
+            changes = self.manager.update(datasets=['ptms'])
+
+        with mock.patch.dict(constants.URLS, paths), tempfile.TemporaryDirectory() as directory:
+            fresh = Manager(connection='sqlite:///%s' % os.path.join(directory, 'fresh.db'))
+            fresh.populate(force=True)
+            expected = dump_tables(fresh)
+            fresh.session.close()
+
+        self.assertLess(0, changes[models.PTM_TABLE_NAME]['deleted'])
+        self.assertNotIn(models.INTERACTION_TABLE_NAME, changes)
+        self.assertEqual(fingerprint, self.manager.get_fingerprints()['interactions'])
+
+        records = dump_tables(self.manager)
+
+        for name in models.PTM_TABLE_NAMES + (models.INTERACTION_TABLE_NAME,):
+            with self.subTest(table=name):
+                self.assertEqual(expected[name], records[name])